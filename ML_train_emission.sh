@@ -24,6 +24,13 @@ EM_STATE=2
 DELTA=0.06
 EPS=0.002
 WEIGHT="E3"
+JOBS=${JOBS:-1}         # 并行的训练规模数
+THREADS=${THREADS:-}    # 每个训练规模的 BLAS/OpenMP 线程数；空 = 核数/JOBS
+WEIGHTS=${WEIGHTS:-$WEIGHT}  # 额外一起计算的加权规则，如 "f,E,E3,E^2.5"（同一次核求和）
+KEEP_RATE=${KEEP_RATE:-1}  # 0 = 不写 emission-rate-ML.dat（谱直接由 E/f 计算）
+KAPPA=${KAPPA:-3.0}        # 核截断/网格外扩(×DELTA)
+FORCE=${FORCE:-0}          # 1 = 忽略 train/<N>/manifest.json，所有阶段重跑
+STORE=${STORE:-}           # 非空（如 spectra.store）时各 N 的谱另追加到该二进制谱库（键 ml/<N>）
 # ======================
 
 main_wd=$(pwd)
@@ -63,93 +70,11 @@ cd train
 train_wd=$(pwd)
 ln -snf "$data/x.dat" x.dat
 
-# 逐个训练规模
-while read -r train_set_num; do
-  cd "$train_wd"
-  mkdir -p "$train_set_num"
-  cd "$train_set_num"
-  train_num_wd=$(pwd)
-
-  # 切分 train/valid
-  cp "$data/itrain.dat" .
-  bash "$script/training_set_generator.sh" "$train_set_num"
-  train_number=$(wc -l < itrain.dat)
-  subtrain_number=$(wc -l < isubtrain.dat)
-  validate_number=$(wc -l < ivalidate.dat)
-  ln -snf "$data/x.dat" x.dat
-  mkdir -p E f all
-
-  ########## 训练 E ##########
-  cd "$train_num_wd/E"
-  mkdir -p "$EM_STATE"
-  cd "$EM_STATE"
-  ln -snf ../../itrain.dat itrain.dat
-  ln -snf ../../isubtrain.dat isubtrain.dat
-  ln -snf ../../ivalidate.dat ivalidate.dat
-  cp -d ../../x.dat x.dat
-  cp "$data/ml.E.inp" ml.inp
-  sed -i "s/E1/E${EM_STATE}/g" ml.inp
-  sed -i "s/subtrain_num/${subtrain_number}/g" ml.inp
-  sed -i "s/train_num/${train_number}/g" ml.inp
-  sed -i "s/validate_num/${validate_number}/g" ml.inp
-  python3 "$script/generate_y.E.py" "$data/state${EM_STATE}.index.E.f" "E${EM_STATE}"
-  $MLCMD ml.inp > ml.log
-  cp "E${EM_STATE}est.dat" ../../all/
-
-  ########## 训练 f ##########
-  cd "$train_num_wd/f"
-  mkdir -p "$EM_STATE"
-  cd "$EM_STATE"
-  ln -snf ../../itrain.dat itrain.dat
-  ln -snf ../../isubtrain.dat isubtrain.dat
-  ln -snf ../../ivalidate.dat ivalidate.dat
-  cp -d ../../x.dat x.dat
-  cp "$data/ml.f.inp" ml.inp
-  sed -i "s/f1/f${EM_STATE}/g" ml.inp
-  sed -i "s/subtrain_num/${subtrain_number}/g" ml.inp
-  sed -i "s/train_num/${train_number}/g" ml.inp
-  sed -i "s/validate_num/${validate_number}/g" ml.inp
-  python3 "$script/generate_y.f.py" "$data/state${EM_STATE}.index.E.f" "f${EM_STATE}"
-  $MLCMD ml.inp > ml.log
-  cp "f${EM_STATE}est.dat" ../../all/
-
-  ########## 混合 真值+预测 ##########
-  cd "$train_num_wd"
-  mv -f all all.ML.orig.data
-  mkdir -p all
-
-  python3 "$script/generate_y.E.mix.py" "$data/state${EM_STATE}.index.E.f" "E${EM_STATE}" "$train_set_num" "all.ML.orig.data/E${EM_STATE}est.dat"
-  awk '{print ($0<0?"0.0000":$0)}' "E${EM_STATE}.dat" > "all/E${EM_STATE}est.dat"
-  rm -f "E${EM_STATE}.dat"
-
-  python3 "$script/generate_y.f.mix.py" "$data/state${EM_STATE}.index.E.f" "f${EM_STATE}" "$train_set_num" "all.ML.orig.data/f${EM_STATE}est.dat"
-  awk '{print ($0<0?"0.0000":$0)}' "f${EM_STATE}.dat" > "all/f${EM_STATE}est.dat"
-  rm -f "f${EM_STATE}.dat"
-
-  ########## 由 E,f 生成发射谱 ##########
-  mkdir -p spectrum/emission
-  cd spectrum/emission
-
-  case "$WEIGHT" in
-    f)  AWK_W='r' ;;
-    E)  AWK_W='e*r' ;;
-    E3) AWK_W='e*e*e*r' ;;
-    *)  echo "[WARN] 未知 WEIGHT=${WEIGHT}，使用 E3"; AWK_W='e*e*e*r' ;;
-  esac
-
-  {
-    echo "DE/eV    lambda/nm    diff_rate        +/-error"
-    paste ../../all/E${EM_STATE}est.dat ../../all/f${EM_STATE}est.dat | \
-    awk -v w="$AWK_W" '{
-      e=$1; r=$2; lam=(e>1e-12)?1239.84193/e:0.0;
-      if(w=="r") diff=r; else if(w=="e*r") diff=e*r; else diff=e*e*e*r;
-      printf("%8.4f   %10.4E   %12.8E   0.00000\n", e, lam, diff);
-    }'
-  } > emission-rate-ML.dat
-
-  python3 "$script/emission_spectrum.py" emission-rate-ML.dat --delta "$DELTA" --eps "$EPS"
-  echo "[OK] train_set=${train_set_num} -> spectrum/emission/emission_spectrum_eV.dat"
-
-  cd "$train_wd/$train_set_num"
-done < "$TRAIN_FILE"
-
+# 逐个训练规模：各 N 互不依赖，交给 sweep.py 用有界进程池并行执行；
+# 每个 N 内按 manifest 增量执行（只改 DELTA/EPS/KAPPA/WEIGHT 时不会重新训练），中断后重跑即续上
+# JOBS: 同时运行的训练规模数；THREADS: 每个子任务的 BLAS/OpenMP 线程数（默认 核数/JOBS）
+# EMSPEC_PROFILE=1：各 N 的阶段耗时写入 train/<N>/profile.jsonl，扫描本身写入根目录 emspec_profile.jsonl
+[ "${EMSPEC_PROFILE:-}" = 1 ] && EMSPEC_PROFILE="$main_wd/emspec_profile.jsonl"
+export STATE_NUM EM_STATE DELTA EPS KAPPA WEIGHT WEIGHTS MLCMD KEEP_RATE FORCE EMSPEC_PROFILE
+python3 "$script/sweep.py" train --root "$main_wd" --nums "$TRAIN_FILE" \
+  --jobs "$JOBS" ${THREADS:+--threads "$THREADS"} ${STORE:+--store "$STORE"}
@@ -0,0 +1,128 @@
+#!/bin/bash
+# 单个训练规模：切分 → 训练 E/f → 混合真值+预测 → 速率表/出谱
+# 由 ML_train_emission.sh 经 sweep.py 在工程根目录下调用；参数通过环境变量传入，
+# 只在 train/<N> 内工作，不同 N 可并行执行。
+# 增量执行：各阶段的输入内容哈希与参数记在 train/<N>/manifest.json（emspec.manifest），
+# 未变且输出完好的阶段直接跳过，中断后重跑从未完成的阶段继续；FORCE=1 全部重跑。
+set -euo pipefail
+
+train_set_num=$1
+: "${EM_STATE:?}" "${DELTA:?}" "${EPS:?}" "${WEIGHT:?}" "${MLCMD:?}"
+main_wd=$(pwd)
+script="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+data="$main_wd/data"
+train_wd="$main_wd/train"
+state_file="$data/state${EM_STATE}.index.E.f"
+KAPPA=${KAPPA:-3.0}
+
+# EMSPEC_PROFILE 开启时，外部命令（MLatom、generate_y）也记入运行日志；
+# Python 入口脚本自身按阶段记录，无需包装
+prof() {
+  local name=$1; shift
+  if [ -n "${EMSPEC_PROFILE:-}" ] && [ "$EMSPEC_PROFILE" != 0 ]; then
+    PYTHONPATH="$script${PYTHONPATH:+:$PYTHONPATH}" python3 -m emspec.runlog run "$name" -- "$@"
+  else
+    "$@"
+  fi
+}
+
+manifest() { PYTHONPATH="$script${PYTHONPATH:+:$PYTHONPATH}" python3 -m emspec.manifest "$@"; }
+
+# run_stage <阶段> <函数> [--in 文件...] [--param K=V...] [--out 文件...]（路径相对 train/<N>）
+run_stage() {
+  local name=$1 fn=$2; shift 2
+  if [ "${FORCE:-0}" != 1 ] && manifest check "$train_num_wd" "$name" "$@"; then
+    echo "[skip] train_set=${train_set_num} ${name}: 输入未变"
+    return 0
+  fi
+  ( cd "$train_num_wd"; "$fn" )
+  manifest done "$train_num_wd" "$name" "$@"
+}
+
+cd "$train_wd"
+mkdir -p "$train_set_num"
+cd "$train_set_num"
+train_num_wd=$(pwd)
+mkdir -p E f all all.ML.orig.data
+ln -snf "$data/x.dat" x.dat
+
+# 切分 train/valid
+split_sets() {
+  cp "$data/itrain.dat" .
+  bash "$script/training_set_generator.sh" "$train_set_num"
+}
+run_stage split split_sets --in "$data/itrain.dat" --param "N=$train_set_num" \
+  --out itrain.dat isubtrain.dat ivalidate.dat
+train_number=$(wc -l < itrain.dat)
+subtrain_number=$(wc -l < isubtrain.dat)
+validate_number=$(wc -l < ivalidate.dat)
+
+########## 训练 E / f ##########
+# 预测写入 all.ML.orig.data/，供混合阶段使用
+train_target() {
+  local t=$1
+  mkdir -p "$t/$EM_STATE"
+  cd "$t/$EM_STATE"
+  ln -snf ../../itrain.dat itrain.dat
+  ln -snf ../../isubtrain.dat isubtrain.dat
+  ln -snf ../../ivalidate.dat ivalidate.dat
+  cp -d ../../x.dat x.dat
+  cp "$data/ml.$t.inp" ml.inp
+  sed -i "s/${t}1/${t}${EM_STATE}/g" ml.inp
+  sed -i "s/subtrain_num/${subtrain_number}/g" ml.inp
+  sed -i "s/train_num/${train_number}/g" ml.inp
+  sed -i "s/validate_num/${validate_number}/g" ml.inp
+  prof "labels-$t" python3 "$script/generate_y.$t.py" "$state_file" "${t}${EM_STATE}"
+  prof "mlatom-$t" $MLCMD ml.inp > ml.log
+  cp "${t}${EM_STATE}est.dat" ../../all.ML.orig.data/
+}
+train_E() { train_target E; }
+train_f() { train_target f; }
+for t in E f; do
+  run_stage "train-$t" "train_$t" \
+    --in "$data/x.dat" "$state_file" itrain.dat isubtrain.dat ivalidate.dat "$data/ml.$t.inp" \
+    --param "EM_STATE=$EM_STATE" \
+    --out "all.ML.orig.data/${t}${EM_STATE}est.dat"
+done
+
+########## 混合 真值+预测 ##########
+# 一次读入状态表，同时写出 E/f 的混合标签（训练位=真值，其它=ML 预测），负值置 0
+# 原流程调用驱动目录里的 generate_y.{E,f}.mix.py（不在本仓库）；这里改用 train_labels.py --mix，
+# 其输出与仓库内 mix_labels.py 逐字节一致（tests/test_labels.py）
+mix() {
+  python3 "$script/train_labels.py" "$state_file" itrain.dat --n_train "$train_set_num" \
+    --mix "{t}${EM_STATE}.dat" --pred-E "all.ML.orig.data/E${EM_STATE}est.dat" --pred-f "all.ML.orig.data/f${EM_STATE}est.dat"
+  for t in E f; do
+    awk '{print ($0<0?"0.0000":$0)}' "${t}${EM_STATE}.dat" > "all/${t}${EM_STATE}est.dat"
+    rm -f "${t}${EM_STATE}.dat"
+  done
+}
+run_stage mix mix \
+  --in "$state_file" itrain.dat "all.ML.orig.data/E${EM_STATE}est.dat" "all.ML.orig.data/f${EM_STATE}est.dat" \
+  --param "N=$train_set_num" \
+  --out "all/E${EM_STATE}est.dat" "all/f${EM_STATE}est.dat"
+
+########## 由 E,f 生成发射谱 ##########
+case "$WEIGHT" in
+  f|E|E3) ;;
+  *)  echo "[WARN] 未知 WEIGHT=${WEIGHT}，使用 E3"; WEIGHT=E3 ;;
+esac
+
+# E/f -> 速率 -> 谱在进程内一步完成；WEIGHTS 中的其它加权规则同一次核求和附带算出
+# （emission_spectrum_weights.dat）；KEEP_RATE=0 时不写 emission-rate-ML.dat
+# STORE 非空时谱另追加到二进制谱库（键 ml/<N> 与 ml/<N>/weights，多个 N 并发写入有文件锁）
+# 只改 DELTA/EPS/KAPPA/WEIGHT 时只有这一阶段重跑
+spectrum() {
+  mkdir -p spectrum/emission
+  cd spectrum/emission
+  python3 "$script/ml_rate_spectrum.py" ../../all/E${EM_STATE}est.dat ../../all/f${EM_STATE}est.dat \
+    --weights "${WEIGHTS:-$WEIGHT}" --primary "$WEIGHT" --delta "$DELTA" --eps "$EPS" --kappa "$KAPPA" \
+    $([ "${KEEP_RATE:-1}" = 1 ] && echo --rate-out emission-rate-ML.dat) \
+    ${STORE:+--store "$STORE" --key "ml/$train_set_num" --n-train "$train_set_num"}
+}
+run_stage spectrum spectrum \
+  --in "all/E${EM_STATE}est.dat" "all/f${EM_STATE}est.dat" \
+  --param "WEIGHT=$WEIGHT" "WEIGHTS=${WEIGHTS:-$WEIGHT}" "DELTA=$DELTA" "EPS=$EPS" "KAPPA=$KAPPA" "KEEP_RATE=${KEEP_RATE:-1}" "STORE=${STORE:-}" \
+  --out spectrum/emission/emission_spectrum_eV.dat spectrum/emission/emission_spectrum_weights.dat \
+        $([ "${KEEP_RATE:-1}" = 1 ] && echo spectrum/emission/emission-rate-ML.dat)
+echo "[OK] train_set=${train_set_num} -> spectrum/emission/emission_spectrum_eV.dat"
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""基准与等价性检查：合成系综上计时各卷积后端、对齐/指标、RIC 批量与标签工具。
+
+每个用例在独立的 spawn 子进程中运行（取 --repeat 次最小墙钟时间），
+峰值 RSS 为该子进程计时结束时的 ru_maxrss（含解释器与合成数据）；结果写成 JSON。
+
+等价性（与参考的最大相对偏差 max|ΔI|/max|I_ref|，超出容差则退出码为 1）：
+  window  vs 原始公式全核求和（N <= --exact-max）   容差 1e-6（截断 ±3δ: e^-18 ≈ 1.5e-8）
+  dense   vs 原始公式全核求和                        容差 1e-10
+  fft     vs window                                  容差 max((eps/oversample/δ)^2, 1e-5)
+  float32 vs window(float64)                         容差 1e-5
+  multi   (N, M) 权重矩阵 vs 逐列 window             容差 1e-10
+  stream  分块读表 vs 整表 window                    容差 1e-10
+  adaptive 自适应网格(tol=1e-4)插值回均匀网格 vs window  容差 3e-4（记录 Ng 与均匀网格点数）
+  align   emspec.metrics 一对 M 批量 RIC vs 旧 ML-RIC.sh heredoc ric()（候选格点落在参考网格上）
+                                                     容差 1e-9（相对各 RIC 的最大值）；候选网格错开半步时的偏差仅记录
+--threads 给出多个线程数时，window/dense/multi 对每个线程数各计时一次；threads > 1 的结果
+还须与 threads=1 逐位相同（bit_identical），否则判为失败。加速比看同一用例不同 threads 的 wall_s。
+另外记录旧版 emission_spectrum.py 用 x += eps 累加建网格相对 np.arange 的漂移（仅记录，不判定）。
+"""
+import argparse, json, os, platform, resource, sys, tempfile, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+TOL = {"window": 1e-6, "dense": 1e-10, "float32": 1e-5, "multi": 1e-10, "stream": 1e-10,
+       "adaptive": 3e-4, "align": 1e-9}
+
+def synth(N, seed=0):
+    """双峰能量分布 + gamma 振子强度，diff_rate = E^3 f"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    E = np.where(rng.random(N) < 0.7, rng.normal(2.5, 0.25, N), rng.normal(3.0, 0.15, N))
+    f = rng.gamma(2.0, 0.05, N)
+    return E, E ** 3 * f, f
+
+def exact_sum(grid, E, R, delta):
+    """原脚本的公式逐点全核求和（不截断），按块避免 (Ng, N) 全矩阵"""
+    import numpy as np
+    coeff = 1.0 / (delta * np.sqrt(np.pi / 2.0))
+    acc = np.zeros(grid.size)
+    for s in range(0, E.size, 2000):
+        acc += np.exp(-2.0 * ((grid[:, None] - E[None, s:s+2000]) / delta) ** 2) @ R[s:s+2000]
+    return coeff * acc / E.size
+
+def legacy_grid_drift(E, delta, eps, kappa=3.0):
+    """旧版 while x <= Emax: x += eps 的网格与 np.arange 网格的差异"""
+    import numpy as np
+    Emin, Emax = float(E.min()) - kappa*delta, float(E.max()) + kappa*delta
+    acc, x = [], Emin
+    while x <= Emax + 1e-12:
+        acc.append(x); x += eps
+    ref = np.arange(Emin, Emax + eps/2.0, eps)
+    n = min(len(acc), ref.size)
+    return {"legacy_points": len(acc), "arange_points": int(ref.size),
+            "max_abs_drift_eV": float(np.abs(np.array(acc[:n]) - ref[:n]).max())}
+
+def legacy_ric(refE, refI, mlE, mlI):
+    """旧 ML-RIC.sh 中 heredoc ric() 的逐点实现：ML 网格上取与 REF 重叠的点，线性插值 + 梯形积分"""
+    import bisect
+    refE, refI, mlE, mlI = (list(map(float, a)) for a in (refE, refI, mlE, mlI))
+
+    def interp(x, xp, yp):
+        if x < xp[0] or x > xp[-1]: return 0.0
+        j = bisect.bisect_right(xp, x)
+        if j == 0: return yp[0]
+        if j >= len(xp): return yp[-1]
+        x0, x1, y0, y1 = xp[j-1], xp[j], yp[j-1], yp[j]
+        return y0 if x1 == x0 else y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+    def trapz(y, x):
+        return sum(0.5 * (y[k] + y[k+1]) * (x[k+1] - x[k]) for k in range(len(x) - 1))
+
+    Eg = [e for e in mlE if refE[0] <= e <= refE[-1]]
+    if len(Eg) < 2:
+        Eg = [e for e in refE if mlE[0] <= e <= mlE[-1]]
+        if len(Eg) < 2:
+            return float("nan")
+    r = [interp(e, refE, refI) for e in Eg]
+    m = [interp(e, mlE, mlI) for e in Eg]
+    den = trapz(r, Eg)
+    return float("nan") if den == 0 else trapz([abs(a - b) for a, b in zip(m, r)], Eg) / den
+
+def _peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _timed(fn, repeat, rec):
+    """最小墙钟时间；峰值 RSS 取计时结束时（参考解的计算在其后，不计入）"""
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    rec["peak_rss_mb"] = _peak_mb()
+    return best, out
+
+def _rel(I, ref):
+    import numpy as np
+    from emspec.kernel import max_deviation
+    return max_deviation(np.asarray(I), np.asarray(ref))
+
+def run_case(case):
+    """子进程内执行一个用例，返回记录字典"""
+    import numpy as np
+    from emspec.kernel import convolve, make_grid
+    rss0 = _peak_mb()
+    stage, N, rep = case["stage"], case["N"], case["repeat"]
+    E, R, f = synth(N, case.get("seed", 0))
+    rec = dict(case)
+    rec.pop("repeat", None)
+
+    if stage == "convolve":
+        d, eps, b = case["delta"], case["eps"], case["backend"]
+        T = case.get("threads", 1)
+        grid = make_grid(E, d, eps)
+        rec["Ng"] = int(grid.size)
+        kw = {"window": dict(method="window", threads=T), "dense": dict(method="dense", threads=T),
+              "fft": dict(method="fft"), "float32": dict(method="window", dtype=np.float32)}
+        if b == "multi":
+            W = np.column_stack([R * (k + 1) ** 0.5 for k in range(case.get("M", 8))])
+            wall, I = _timed(lambda: convolve(grid, E, W, d, threads=T), rep, rec)
+            ref = np.column_stack([convolve(grid, E, W[:, k], d) for k in range(W.shape[1])])
+            rec["max_rel_err"], rec["ref"] = _rel(I, ref), "window per column"
+        elif b == "stream":
+            from emspec.stream import stream_broaden
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "rate.dat")
+                np.savetxt(path, np.column_stack([E, 1239.84193 / E, R, np.zeros(N)]),
+                           fmt="%.10f %.4E %.12e %.1f")
+                Ef, Rf = np.loadtxt(path, usecols=(0, 2), unpack=True)
+                wall, (g2, I) = _timed(lambda: stream_broaden(path, delta=d, eps=eps,
+                                                              rows=max(N // 8, 1000)), rep, rec)
+                ref = convolve(make_grid(Ef, d, eps), Ef, Rf, d)
+            rec["max_rel_err"], rec["ref"] = _rel(I, ref), "window on the parsed table"
+        elif b == "adaptive":
+            from emspec import adaptive
+            wall, (ga, I) = _timed(lambda: adaptive.broaden(E, R, delta=d, eps=eps, tol=1e-4), rep, rec)
+            rec["Ng_uniform"], rec["Ng"] = rec["Ng"], int(ga.size)
+            rec["max_rel_err"] = _rel(np.interp(grid, ga, I), convolve(grid, E, R, d))
+            rec["ref"] = "window on the uniform grid"
+        else:
+            wall, I = _timed(lambda: convolve(grid, E, R, d, **kw[b]), rep, rec)
+            if b in ("window", "dense"):
+                if N <= case["exact_max"]:
+                    rec["max_rel_err"], rec["ref"] = _rel(I, exact_sum(grid, E, R, d)), "exact formula"
+            else:
+                rec["max_rel_err"], rec["ref"] = _rel(I, convolve(grid, E, R, d)), "window"
+        rec["wall_s"] = wall
+        rec["throughput_geom_per_s"] = N / wall if wall > 0 else None
+        if b == "fft":
+            rec["tol"] = max((eps / 4 / d) ** 2, 1e-5)
+        elif "max_rel_err" in rec:
+            rec["tol"] = TOL[b]
+        if "tol" in rec:
+            rec["ok"] = bool(rec["max_rel_err"] <= rec["tol"])
+        if T > 1:
+            serial = convolve(grid, E, W, d) if b == "multi" else convolve(grid, E, R, d, **dict(kw[b], threads=1))
+            rec["bit_identical"] = bool(np.array_equal(I, serial))
+            rec["ok"] = rec.get("ok", True) and rec["bit_identical"]
+        if b == "window":
+            rec["legacy_grid"] = legacy_grid_drift(E, d, eps)
+
+    elif stage == "align_metrics":
+        # RIC 驱动实际使用的路径：emspec.metrics 一条参考 vs M 条候选（候选网格各自截去不同的左端）
+        from emspec.metrics import align, batch_metrics, compare
+        grid = make_grid(E, 0.06, 0.002)
+        A = convolve(grid, E, R, 0.06, method="fft")           # 输入谱的准备用 fft，少占内存
+        M = case.get("M", 8)
+        cuts = [max(N * (k + 1) // M, 1) for k in range(M)]
+        cands = [(grid[5 * k:], convolve(grid, E[:n], R[:n], 0.06, method="fft")[5 * k:])
+                 for k, n in enumerate(cuts)]
+        wall, res = _timed(lambda: batch_metrics(*align(grid, A, cands)), rep, rec)
+        legacy = np.array([legacy_ric(grid, A, Eg, Ig) for Eg, Ig in cands])
+        rec["max_rel_err"] = float(np.abs(res["Rel_change"] - legacy).max() / np.abs(legacy).max())
+        rec["tol"] = TOL["align"]
+        rec["ok"] = bool(rec["max_rel_err"] <= rec["tol"])
+        # 候选网格错开半步（ML 谱网格与参考不重合的常见情形）：公共网格上的插值误差，仅记录
+        half = [(Eg[:-1] + 0.001, 0.5 * (Ig[:-1] + Ig[1:])) for Eg, Ig in cands]
+        off = compare(grid, A, half)["Rel_change"]
+        leg = np.array([legacy_ric(grid, A, Eg, Ig) for Eg, Ig in half])
+        rec["offset_grid_rel_dev"] = float(np.abs(off - leg).max() / np.abs(leg).max())
+        rec.update(wall_s=wall, Ng=int(grid.size), M=M)
+
+    elif stage == "ric_batch":
+        from emspec.metrics import compare
+        grid = make_grid(E, 0.06, 0.002)
+        ref = convolve(grid, E, R, 0.06, method="fft")
+        M = case.get("M", 32)
+        cuts = [max(N * (k + 1) // M, 1) for k in range(M)]
+        cands = [(grid, convolve(grid, E[:n], R[:n], 0.06, method="fft")) for n in cuts]
+        wall, _ = _timed(lambda: compare(grid, ref, cands), rep, rec)
+        rec.update(wall_s=wall, Ng=int(grid.size))
+
+    elif stage == "labels":
+        from emspec.labels import full_column, label_columns, mix_column, subset_column, train_mask, write_lines
+        os.environ["EMSPEC_CACHE"] = "0"
+        with tempfile.TemporaryDirectory() as tmp:
+            st, it, pr = (os.path.join(tmp, x) for x in ("state.dat", "itrain.dat", "pred.dat"))
+            np.savetxt(st, np.column_stack([np.arange(1, N + 1), E, f]), fmt="%d %.6f %.8f",
+                       header="index E2 f2", comments="")
+            idx = np.random.default_rng(1).permutation(N)[: max(N // 10, 1)] + 1
+            np.savetxt(it, idx, fmt="%d")
+            np.savetxt(pr, E + 0.01, fmt="%.6f")
+
+            def job():
+                cols = label_columns(st)
+                mask = train_mask(idx, N)
+                for t in ("E", "f"):
+                    with open(os.path.join(tmp, f"y.{t}.train"), "wb") as fo:
+                        write_lines(fo, full_column(cols, t, mask))
+                    with open(os.path.join(tmp, f"{t}.sub"), "wb") as fo:
+                        write_lines(fo, subset_column(cols, t, idx))
+                    with open(os.path.join(tmp, f"y.{t}.em"), "wb") as fo:
+                        mix_column(fo, cols, t, pr, mask)
+            wall, _ = _timed(job, rep, rec)
+        rec.update(wall_s=wall, throughput_geom_per_s=N / wall if wall > 0 else None)
+
+    rec["base_rss_mb"] = rss0
+    return rec
+
+def plan(args):
+    sizes = [int(float(s)) for s in args.sizes.split(",")]
+    deltas = [float(x) for x in args.deltas.split(",")]
+    epss = [float(x) for x in args.eps.split(",")]
+    backends = args.backends.split(",")
+    threads = [int(t) for t in args.threads.split(",")]
+    base = {"repeat": args.repeat, "exact_max": args.exact_max}
+    cases = []
+    for N in sizes:
+        for d in deltas:
+            for e in epss:
+                for b in backends:
+                    if b == "dense" and N > args.dense_max:
+                        continue
+                    if b in ("multi", "stream") and N > args.dense_max * 10:
+                        continue
+                    for T in (threads if b in ("window", "dense", "multi") else [1]):
+                        cases.append(dict(base, stage="convolve", backend=b, N=N, delta=d, eps=e,
+                                          **({"threads": T} if T > 1 else {})))
+        if "align" in args.stages:
+            cases.append(dict(base, stage="align_metrics", N=N, M=8))
+        if "ric" in args.stages:
+            cases.append(dict(base, stage="ric_batch", N=N, M=32))
+        if "labels" in args.stages:
+            cases.append(dict(base, stage="labels", N=N))
+    return cases
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="卷积/对齐/RIC/标签各阶段基准 + 后端等价性检查（结果写 JSON）")
+    ap.add_argument("--sizes", default="1e3,1e4,1e5,1e6", help="系综规模列表（可到 1e7）")
+    ap.add_argument("--deltas", default="0.03,0.06", help="展宽列表(eV)")
+    ap.add_argument("--eps", default="0.001,0.002", help="步长列表(eV)")
+    ap.add_argument("--backends", default="window,dense,fft,float32,multi,stream,adaptive", help="卷积后端")
+    ap.add_argument("--threads", default="1", help="window/dense/multi 的线程数列表，如 1,2,4,8（测加速比与逐位一致）")
+    ap.add_argument("--stages", default="align,ric,labels", help="其它阶段：align,ric,labels")
+    ap.add_argument("--dense-max", type=int, default=100000, help="dense 只跑 N <= 此值")
+    ap.add_argument("--exact-max", type=int, default=20000, help="与原始公式逐点比较的最大 N")
+    ap.add_argument("--repeat", type=int, default=3, help="每个用例重复次数（取最小墙钟时间）")
+    ap.add_argument("--out", default="benchmark.json", help="输出 JSON")
+    args = ap.parse_args(argv)
+    args.stages = args.stages.split(",")
+
+    import numpy as np
+    results = []
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx, max_tasks_per_child=1) as ex:
+        for case in plan(args):
+            rec = ex.submit(run_case, case).result()
+            results.append(rec)
+            tag = rec.get("backend", "") + (f"×{rec['threads']}" if rec.get("threads") else "")
+            err = f"  err={rec['max_rel_err']:.2e}/{rec['tol']:.0e}" if "tol" in rec else ""
+            err += "  bit-identical" * rec.get("bit_identical", False)
+            err += f" {'OK' if rec['ok'] else 'FAIL'}" if "ok" in rec else ""
+            print(f"{rec['stage']:<14}{tag:<8} N={rec['N']:<9} "
+                  + (f"δ={rec['delta']:<5} ε={rec['eps']:<6}" if "delta" in rec else " " * 17)
+                  + f" {rec['wall_s']:9.4f}s  rss={rec['peak_rss_mb']:7.1f}MB{err}", flush=True)
+
+    meta = {"python": sys.version.split()[0], "numpy": np.__version__, "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "threads": {k: os.environ.get(k) for k in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS")}}
+    failed = [r for r in results if r.get("ok") is False]
+    with open(args.out, "w") as fo:
+        json.dump({"meta": meta, "tolerances": TOL, "results": results,
+                   "failed": len(failed)}, fo, indent=1)
+    print(f"写出: {args.out}（{len(results)} 个用例，等价性失败 {len(failed)} 个）")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""多条谱两两比较：一次读入 M 条谱，对齐到一个公共网格，向量化算出 M×M 指标矩阵。
+
+矩阵第 i 行以谱 i 为参考：RIC[i, j] = ∫|I_j - I_i| dE / ∫I_i dE（与 ric_batch 的方向一致）。
+公共网格覆盖全部谱的能量范围，各谱在自身范围外取 0（NEA 谱两端已外扩 kappa*delta，尾部≈0）。
+
+输出：
+  --out  .npz：labels, files, grid 以及 RIC / Cosine / Overlap / PeakShift_eV / RMSE 矩阵
+  --csv  每条谱一行的汇总：峰位、最近邻（RIC 最小）及其 RIC、对其它谱的平均 RIC、
+         给出 --ref 时还有相对参考谱的 RIC / Cosine / Overlap
+"""
+import argparse, csv, time
+import numpy as np
+from emspec.kernel import parse_mem
+from emspec.metrics import PAIR_KEYS, pairwise_metrics, stack_spectra, trapz_weights
+from emspec.tables import load_spectrum
+from emspec import runlog, store
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="M 条谱的两两差异矩阵（RIC/余弦/重叠/峰移），一次读入、向量化计算")
+    ap.add_argument("files", nargs="*", help="谱文件（两列 E I 或四列），如 train/*/spectrum/emission/emission_spectrum_eV.dat；"
+                    "也可为谱库记录 STORE::KEY")
+    ap.add_argument("--store", default=None, help="另取谱库中全部键以 --prefix 开头的谱（如 ml/）")
+    ap.add_argument("--prefix", default="", help="--store 的键前缀")
+    ap.add_argument("--labels", nargs="+", default=None, help="与文件一一对应的标签（默认文件名）")
+    ap.add_argument("--ref", default=None, help="参考谱；作为第 0 条（标签 ref）加入，汇总表给出各谱相对它的指标")
+    ap.add_argument("--eps", type=float, default=None, help="公共网格步长(eV)，默认取输入中最细的步长")
+    ap.add_argument("--norm", choices=["none","max","area"], default="max",
+                    help="比较前的归一化（默认 max，只比较形状）")
+    ap.add_argument("--max-mem", type=parse_mem, default=None, help="L1 广播块的内存预算（默认 256M）")
+    ap.add_argument("--out", default="disparity_matrix.npz", help="二进制矩阵输出")
+    ap.add_argument("--csv", default="disparity_matrix.csv", help="每条谱一行的汇总表")
+    args = ap.parse_args(argv)
+
+    labels = list(args.labels or args.files)
+    if len(labels) != len(args.files):
+        raise SystemExit("[ERROR] --labels 数量与谱文件数量不一致")
+    if args.store:
+        keys = [r["key"] for r in store.find(args.store, args.prefix)]
+        args.files += [f"{args.store}{store.SEP}{k}" for k in keys]
+        labels += keys
+    if not args.files:
+        raise SystemExit("[ERROR] 没有谱：给出谱文件或 --store")
+    files = ([args.ref] if args.ref else []) + args.files
+    labels = (["ref"] if args.ref else []) + labels
+
+    t0 = time.perf_counter()
+    with runlog.stage("read-spectra", rows=len(files)):
+        spectra = [load_spectrum(p, trim_zeros=False) for p in files]
+    grid, Y = stack_spectra(spectra, eps=args.eps)
+    if args.norm == "max":
+        Y /= np.where(Y.max(axis=1) > 0, Y.max(axis=1), 1.0)[:, None]
+    elif args.norm == "area":
+        a = Y @ trapz_weights(grid, np.ones((1, grid.size), dtype=bool))[0]
+        Y /= np.where(a > 0, a, 1.0)[:, None]
+    with runlog.stage("matrix", rows=len(files), Ng=grid.size):
+        res = pairwise_metrics(grid, Y, **({"max_mem": args.max_mem} if args.max_mem else {}))
+    dt = time.perf_counter() - t0
+
+    np.savez_compressed(args.out, labels=np.array(labels), files=np.array(files), grid=grid,
+                        **{k: res[k].astype(np.float32) for k in PAIR_KEYS})
+
+    M = len(labels)
+    R = res["RIC"].copy()
+    np.fill_diagonal(R, np.nan)
+    peak = grid[np.argmax(Y, axis=1)]
+    with open(args.csv, "w", newline="") as fo:
+        w = csv.writer(fo)
+        w.writerow(["label", "file", "peak_eV", "nearest", "RIC_nearest", "mean_RIC"]
+                   + (["RIC_vs_ref", "Cosine_vs_ref", "Overlap_vs_ref"] if args.ref else []))
+        for i in range(M):
+            j = int(np.nanargmin(R[i])) if M > 1 else i
+            row = [labels[i], files[i], f"{peak[i]:.6f}", labels[j],
+                   f"{R[i, j]:.6e}", f"{np.nanmean(R[i]) if M > 1 else np.nan:.6e}"]
+            if args.ref:
+                row += [f"{res[k][0, i]:.6e}" for k in ("RIC", "Cosine", "Overlap")]
+            w.writerow(row)
+    print(f"写出: {args.out}, {args.csv}（{M} 条谱，网格 {grid.size} 点，{M*(M-1)//2} 对，{dt:.2f} s）")
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,193 @@
 #!/usr/bin/env python3
-import numpy as np, argparse, math
-
-def read_emission_table(path):
-    E, R = [], []
-    with open(path) as f:
-        for i, line in enumerate(f):
-            s = line.strip()
-            if not s: continue
-            parts = s.split()
-            if i == 0 and ("DE/eV" in s or "lambda" in s):  # 跳过表头
-                continue
-            if len(parts) < 3: continue
-            try:
-                E.append(float(parts[0]))   # DE/eV
-                R.append(float(parts[2]))   # diff_rate
-            except ValueError:
-                pass
-    if not E:
-        raise SystemExit("未解析到数据，请检查 emission-rate.dat 的列顺序/空行。")
-    return np.array(E), np.array(R)
+import numpy as np, argparse
+from emspec.kernel import METHODS, broaden, convolve, make_grid, max_deviation, parse_mem
+from emspec.tables import CHUNK_ROWS, load_spectrum, read_emission_table
+from emspec.stream import stream_broaden
+from emspec.bootstrap import basic_interval, bootstrap_spectra, percentile_band
+from emspec.metrics import KEYS, align, batch_metrics, interp_rows
+from emspec import adaptive, deltascan, runlog, store
 
 def ev_to_nm(E):
     h_evs, c = 4.13566733e-15, 299792458
     with np.errstate(divide='ignore'):
         return (1e9 * h_evs * c) / E
 
-def gauss_matrix(grid, centers, delta):
-    coeff = 1.0 / (delta * math.sqrt(math.pi/2.0))  # 与你原脚本一致的归一化
-    d = (grid[:, None] - centers[None, :]) / delta
-    return coeff * np.exp(-2.0 * (d ** 2))
+# 各指标的取值范围（basic 区间截断用）
+METRIC_BOUNDS = {"L1_norm_area": (0.0, np.inf), "Rel_change": (0.0, np.inf), "RMSE": (0.0, np.inf),
+                 "Cosine": (-1.0, 1.0), "Overlap": (0.0, 1.0), "PeakShift_eV": (-np.inf, np.inf)}
 
-def main():
+def report_metric_ci(ref_path, grid, I, reps, ci):
+    """主谱与每个重采样谱（各自按最大值归一）对参考谱的差异指标：点估计、basic bootstrap 置信区间，
+    以及重采样谱自身指标的百分位范围（后者描述重采样谱的分布，不是指标的置信区间）"""
+    E_ref, I_ref = load_spectrum(ref_path, trim_zeros=False)
+    cg, A, B0, mask = align(E_ref, I_ref, [(grid, I / (I.max() or 1.0))])
+    Y = reps / np.where(reps.max(axis=0) > 0, reps.max(axis=0), 1.0)
+    Bb = interp_rows(cg, grid, Y)
+    point = batch_metrics(cg, A, B0, mask)
+    boot = batch_metrics(cg, A, Bb, np.broadcast_to(mask[0], Bb.shape))
+    print(f"Bootstrap {ci:g}% CI vs {ref_path} (B={reps.shape[1]}; basic interval; "
+          f"resampled = {ci:g}% range of the resampled spectra's own metric):")
+    for k in KEYS:
+        lo, hi = basic_interval(point[k][0], boot[k], ci=ci, bounds=METRIC_BOUNDS[k])
+        rlo, rhi = percentile_band(boot[k], ci=ci)
+        print(f"  {k:<13}= {point[k][0]:.6e}   CI [{lo:.6e}, {hi:.6e}]   resampled [{rlo:.6e}, {rhi:.6e}]")
+
+def run_delta_scan(args, E, R):
+    """一次沉积 + 逐 delta 乘核频谱；写 delta_scan.dat / emission_spectrum_family.dat，返回选定的 delta"""
+    deltas = deltascan.parse_deltas(args.delta_scan)
+    res = deltascan.scan(E, R, deltas, eps=args.eps, kappa=args.kappa,
+                         oversample=args.oversample, seed=args.seed or 0)
+    chosen = deltascan.select(deltas, res, args.select, noise_tol=args.noise_tol)
+
+    S = res["spectra"]
+    S = S / np.where(S.max(axis=0) > 0, S.max(axis=0), 1.0)
+    np.savetxt("emission_spectrum_family.dat", np.column_stack([res["grid"], S]),
+               fmt="%.6f" + " %.8e" * deltas.size,
+               header="DE/eV  " + "  ".join(f"d={d:g}" for d in deltas))
+    np.savetxt("delta_scan.dat", np.column_stack([deltas, res["lscv"], res["noise"]]),
+               fmt="%.6f %.8e %.8e", header="delta  LSCV  split_half_L1")
+    print(f"[delta-scan] {deltas.size} 个 delta；LSCV 最优 = {deltas[np.nanargmin(res['lscv'])]:.4f}，"
+          f"Silverman = {res['silverman']:.4f}；按 {args.select} 选定 delta = {chosen:.4f}")
+    return chosen
+
+def reference_broaden(args, E, R):
+    """按参数选择 流式 / 不展宽 / 常规卷积，返回 grid, I（未除最大值）"""
+    dtype = np.float32 if args.float32 else np.float64
+    if args.stream:
+        return stream_broaden(args.infile, delta=args.delta, eps=args.eps, kappa=args.kappa,
+                              method=args.method, Emin=args.emin, Emax=args.emax,
+                              rows=args.chunk, max_mem=args.max_mem, dtype=dtype,
+                              oversample=args.oversample, threads=args.threads)
+    if args.no_smooth or args.delta <= 0:
+        return E.copy(), R.copy()
+    if args.adaptive:
+        grid, I = adaptive.broaden(E, R, delta=args.delta, eps=args.eps, kappa=args.kappa,
+                                   tol=args.adaptive, method=args.method, h_max=args.max_step,
+                                   max_mem=args.max_mem, dtype=dtype, oversample=args.oversample,
+                                   threads=args.threads)
+        print(f"[adaptive] 网格 {grid.size} 点（均匀 eps 网格 {make_grid(E, args.delta, args.eps, args.kappa).size} 点）")
+    else:
+        grid, I = broaden(E, R, delta=args.delta, eps=args.eps,
+                          kappa=args.kappa, method=args.method, max_mem=args.max_mem,
+                          dtype=dtype, oversample=args.oversample, threads=args.threads)  # 按样本数归一
+    if args.check and args.method != "window":
+        I_ref = convolve(grid, E, R, args.delta, kappa=args.kappa,
+                         method="window", max_mem=args.max_mem, threads=args.threads)
+        print(f"[check] {args.method} vs window: max|ΔI|/max(I) = {max_deviation(I, I_ref):.3e}")
+    return grid, I
+
+def main(argv=None):
     ap = argparse.ArgumentParser()
-    ap.add_argument("infile", help="emission-rate.dat")
+    ap.add_argument("infile", help="emission-rate.dat（'-' 表示从 stdin 读取，自动启用 --stream）")
     ap.add_argument("--delta", type=float, default=0.06, help="高斯展宽(eV)")
     ap.add_argument("--eps",   type=float, default=0.002, help="能量步长(eV)")
     ap.add_argument("--kappa", type=float, default=3.0, help="边界外扩(×delta)")
+    ap.add_argument("--method", choices=METHODS, default="window",
+                    help="window: 截断核(±kappa*delta)；dense: 全矩阵精确求和；fft: 分箱+FFT（超大系综）")
+    ap.add_argument("--oversample", type=int, default=4, help="fft 细网格倍数（细步长 = eps/oversample）")
+    ap.add_argument("--check", action="store_true", help="同时跑精确核求和(window)，报告最坏相对偏差")
+    ap.add_argument("--max-mem", type=parse_mem, default=None,
+                    help="卷积分块的内存预算，如 512M / 2G（默认 256M）")
+    ap.add_argument("--float32", action="store_true", help="块内核用单精度计算（跨块累加仍为双精度）")
+    ap.add_argument("--threads", type=int, default=1,
+                    help="window/dense 几何分块的线程数；结果与线程数无关（逐位相同），内存约 threads × max-mem")
+    ap.add_argument("--bootstrap", type=int, default=0, metavar="B",
+                    help="B 组多项分布重采样，误差列写入置信区间半宽，并输出 emission_spectrum_band.dat")
+    ap.add_argument("--ci", type=float, default=95.0, help="bootstrap 置信水平(%%)")
+    ap.add_argument("--seed", type=int, default=None, help="bootstrap 随机种子")
+    ap.add_argument("--ref", default=None, help="参考谱；给出时报告各差异指标的 bootstrap 置信区间")
+    ap.add_argument("--delta-scan", default=None,
+                    help="扫描 delta 列表，如 '0.01:0.1:0.005' 或 '0.02,0.04,0.06'；自动选定后按该 delta 出谱")
+    ap.add_argument("--select", choices=deltascan.CRITERIA, default="lscv",
+                    help="delta 自动选择准则：lscv 交叉验证 / silverman / noise 对半拆分噪声阈值")
+    ap.add_argument("--noise-tol", type=float, default=0.05, help="--select noise 的相对 L1 噪声阈值")
+    ap.add_argument("--stream", action="store_true",
+                    help="分块读取、逐块累加，内存与行数无关（不支持 --bootstrap/--delta-scan/--check/--no-smooth/--adaptive）")
+    ap.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="--stream 每块行数")
+    ap.add_argument("--emin", type=float, default=None,
+                    help="--stream 数据能量窗口下限(eV)，网格再外扩 kappa*delta；给出 emin/emax 可省去范围预扫")
+    ap.add_argument("--emax", type=float, default=None, help="--stream 数据能量窗口上限(eV)")
+    ap.add_argument("--adaptive", type=float, nargs="?", const=adaptive.DEFAULT_TOL, default=None, metavar="TOL",
+                    help=f"自适应非均匀网格：线性插值误差 <= TOL*max(I)（默认 {adaptive.DEFAULT_TOL:g}），eps 为最细步长")
+    ap.add_argument("--max-step", type=float, default=None, help="--adaptive 最粗步长(eV)，默认 delta")
+    ap.add_argument("--store", default=None, help="同时追加到二进制谱库（emspec.store），列 I/err[/lo/hi]")
+    ap.add_argument("--key", default="ref", help="--store 中的键（默认 ref）")
+    ap.add_argument("--no-text", action="store_true", help="只写谱库，不写文本文件（需 --store）")
     ap.add_argument("--no-smooth", action="store_true", help="不卷积，直接用原网格")
     ap.add_argument("--no-norm",   action="store_true", help="不归一化最大值=1")
-    args = ap.parse_args()
-
-    E, R = read_emission_table(args.infile)
+    args = ap.parse_args(argv)
 
-    if args.no_smooth or args.delta <= 0:
-        grid, I = E.copy(), R.copy()
+    if args.no_text and not args.store:
+        raise SystemExit("[ERROR] --no-text 需要 --store")
+    if args.infile == "-":
+        args.stream = True
+    if args.stream:
+        if args.bootstrap or args.delta_scan or args.check or args.no_smooth or args.adaptive or args.delta <= 0:
+            raise SystemExit("[ERROR] --stream 不能与 --bootstrap/--delta-scan/--check/--no-smooth/--adaptive 同用，且需 delta > 0")
+        E = R = None
     else:
-        Emin = E.min() - args.kappa * args.delta
-        Emax = E.max() + args.kappa * args.delta
-        grid = np.arange(Emin, Emax + args.eps/2, args.eps)
-        K = gauss_matrix(grid, E, args.delta)         # (Ng, N)
-        I = (K @ R) / len(E)                          # 可比性：按样本数归一
+        with runlog.stage("read-table") as rec:
+            E, R = read_emission_table(args.infile)
+            rec["rows"] = E.size
+
+    if args.delta_scan:
+        args.delta = run_delta_scan(args, E, R)
+
+    with runlog.stage("reference", method=args.method, rows=None if E is None else E.size,
+                      threads=args.threads) as rec:
+        grid, I = reference_broaden(args, E, R)
+        rec["Ng"] = grid.size
+
+    reps = None
+    if args.bootstrap > 0 and not (args.no_smooth or args.delta <= 0):
+        with runlog.stage("bootstrap", method=args.method, rows=E.size, Ng=grid.size, B=args.bootstrap):
+            reps = bootstrap_spectra(grid, E, R, args.delta, B=args.bootstrap, kappa=args.kappa,
+                                     method=args.method, seed=args.seed, max_mem=args.max_mem,
+                                     dtype=np.float32 if args.float32 else np.float64,
+                                     oversample=args.oversample, threads=args.threads)   # (Ng, B)
 
     if not args.no_norm:
         m = I.max()
-        if m > 0: I = I / m
+        if m > 0:
+            I = I / m
+            if reps is not None: reps = reps / m   # 与主谱同一归一化因子
+
+    err = np.zeros_like(I)
+    band = {}
+    if reps is not None:
+        lo, hi = percentile_band(reps, ci=args.ci, axis=1)
+        err = 0.5 * (hi - lo)
+        band = {f"lo{args.ci:g}": lo, f"hi{args.ci:g}": hi}
+        if not args.no_text:
+            np.savetxt("emission_spectrum_band.dat", np.column_stack([grid, I, lo, hi]),
+                       fmt="%.6f %.8e %.8e %.8e",
+                       header=f"DE/eV  intensity  lo{args.ci:g}  hi{args.ci:g}  (bootstrap B={args.bootstrap})")
+        if args.ref:
+            report_metric_ci(args.ref, grid, I, reps, args.ci)
+
+    if args.store:
+        store.append(args.store, args.key, grid, np.column_stack([I, err] + list(band.values())),
+                     cols=["I", "err"] + list(band), params={
+                         "source": args.infile, "rows": None if E is None else int(E.size),
+                         "delta": args.delta, "eps": args.eps, "kappa": args.kappa, "method": args.method,
+                         "adaptive": args.adaptive, "bootstrap": args.bootstrap, "norm": not args.no_norm})
+    if args.no_text:
+        print(f"写出: {args.store}::{args.key}")
+        return
 
     np.savetxt("emission_spectrum_eV.dat",
                np.column_stack([grid, I]), fmt="%.6f %.8e")
 
+    # 与原逐行 f-string 输出逐字节相同；无 bootstrap 时误差列为字面 0.00000
     lam = ev_to_nm(grid)
-    with open("emission_spectrum_full.dat", "w") as fo:
-        fo.write("DE/eV    lambda/nm    intensity    +/-error\n")
-        for e, l, y in zip(grid, lam, I):
-            fo.write(f"{e:8.4f}   {l:10.4E}   {y:12.8E}   0.00000\n")
+    np.savetxt("emission_spectrum_full.dat",
+               np.column_stack([grid, lam, I] + ([err] if reps is not None else [])),
+               fmt="%8.4f   %10.4E   %12.8E   " + ("%12.8E" if reps is not None else "0.00000"),
+               header="DE/eV    lambda/nm    intensity    +/-error", comments="")
 
-    print("写出: emission_spectrum_eV.dat, emission_spectrum_full.dat")
+    print("写出: emission_spectrum_eV.dat, emission_spectrum_full.dat"
+          + (", emission_spectrum_band.dat" if reps is not None else "")
+          + (f", {args.store}::{args.key}" if args.store else ""))
 
 if __name__ == "__main__":
     main()
@@ -1,53 +1,97 @@
 #!/usr/bin/python3
-import math, sys
+import argparse
+import numpy as np
+from emspec.kernel import METHODS, broaden, make_grid, parse_mem
+from emspec.tables import CHUNK_ROWS, read_emission_table
+from emspec.speccache import reference_spectrum
+from emspec.stream import stream_broaden
+from emspec import adaptive, runlog, store
 
-def read_emission_table(path_file):
-    E, R = [], []
-    with open(path_file, "r") as f:
-        for i, line in enumerate(f):
-            if i == 0:  # skip header
-                continue
-            parts = line.split()
-            if len(parts) >= 3:
-                try:
-                    E.append(float(parts[0]))  # DE/eV
-                    R.append(float(parts[2]))  # diff_rate
-                except ValueError:
-                    pass
-    assert E, "No rows parsed from emission-rate.dat"
-    return E, R
+def emit_spectrum(E, R, delta=0.06, eps=0.002, kappa=3.0, method="window", max_mem=None,
+                  tol=None, max_step=None, threads=1):
+    if tol:
+        # non-uniform grid: eps is the finest step, coarser where the spectrum is flat
+        grid, I = adaptive.broaden(E, R, delta=delta, eps=eps, kappa=kappa, tol=tol,
+                                   method=method, h_max=max_step, max_mem=max_mem, threads=threads)
+    else:
+        grid, I = broaden(E, R, delta=delta, eps=eps, kappa=kappa, method=method, max_mem=max_mem,
+                          threads=threads)
+    # normalize to 1
+    m = I.max() if I.max() > 0 else 1.0
+    return grid, I / m
 
-def gauss_norm(x, mu, delta):
-    coeff = 1.0 / (delta * math.sqrt(math.pi/2.0))
-    return coeff * math.exp(-2.0 * ((x - mu)/delta)**2)
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="NEA convolution of an emission-rate table")
+    ap.add_argument("infile", help="emission-rate.dat ('-' = read stdin, implies --stream)")
+    ap.add_argument("--delta", type=float, default=0.06, help="Gaussian broadening (eV)")
+    ap.add_argument("--eps",   type=float, default=0.002, help="grid step (eV)")
+    ap.add_argument("--kappa", type=float, default=3.0, help="kernel cutoff / grid padding (x delta)")
+    ap.add_argument("--method", choices=METHODS, default="window",
+                    help="window: truncated kernel (default); dense: exact full sum; fft: binning + FFT")
+    ap.add_argument("--out", default="emission_spectrum_eV.dat", help="output file (E, normalized I)")
+    ap.add_argument("--store", default=None, help="also append the spectrum to a binary spectrum store (emspec.store)")
+    ap.add_argument("--key", default="spectrum", help="key in --store (e.g. ml/500)")
+    ap.add_argument("--no-text", action="store_true", help="write only to --store, skip the text file")
+    ap.add_argument("--cache", action="store_true",
+                    help="reuse/store the result in the content-addressed spectrum cache (for references)")
+    ap.add_argument("--stream", action="store_true",
+                    help="read the table in chunks and accumulate on the fly (memory independent of row count)")
+    ap.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="rows per chunk in --stream mode")
+    ap.add_argument("--emin", type=float, default=None,
+                    help="--stream: lower energy of the data window (grid adds kappa*delta); skips the range pre-pass")
+    ap.add_argument("--emax", type=float, default=None, help="--stream: upper energy of the data window")
+    ap.add_argument("--max-mem", type=parse_mem, default=None, help="per-block kernel memory budget, e.g. 512M")
+    ap.add_argument("--threads", type=int, default=1,
+                    help="worker threads for window/dense geometry blocks; output is bit-identical for any count "
+                         "(peak memory ~ threads x max-mem)")
+    ap.add_argument("--adaptive", type=float, nargs="?", const=adaptive.DEFAULT_TOL, default=None, metavar="TOL",
+                    help=f"non-uniform grid with linear-interpolation error <= TOL*max(I) (default {adaptive.DEFAULT_TOL:g}); "
+                         "eps becomes the finest step")
+    ap.add_argument("--max-step", type=float, default=None, help="--adaptive: coarsest step (eV, default delta)")
+    args = ap.parse_args(argv)
 
-def emit_spectrum(E, R, delta=0.06, eps=0.002, kappa=3.0):
-    Emin = min(E) - kappa*delta
-    Emax = max(E) + kappa*delta
-    grid, I = [], []
-    x = Emin
-    n = len(E)
-    while x <= Emax + 1e-12:
-        s = 0.0
-        for Ei, Ri in zip(E, R):
-            s += Ri * gauss_norm(x, Ei, delta)
-        s /= n
-        grid.append(x)
-        I.append(s)
-        x += eps
-    # normalize to 1
-    m = max(I) if max(I) > 0 else 1.0
-    I = [v/m for v in I]
-    return grid, I
+    if args.no_text and not args.store:
+        raise SystemExit("[ERROR] --no-text needs --store")
+    if args.infile == "-":
+        args.stream = True
+    if args.cache and args.stream:
+        raise SystemExit("[ERROR] --cache needs a rate-table file; drop --stream / stdin")
+    if args.adaptive and (args.stream or args.cache):
+        raise SystemExit("[ERROR] --adaptive needs the whole table in memory; drop --stream / --cache / stdin")
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python emission_spectrum.py emission-rate.dat")
-        sys.exit(1)
-    E, R = read_emission_table(sys.argv[1])
-    grid, I = emit_spectrum(E, R, delta=0.06, eps=0.002, kappa=3.0)
-    with open("emission_spectrum_eV.dat", "w") as fo:
-        for x, y in zip(grid, I):
-            fo.write(f"{x:.6f} {y:.8e}\n")
-    print("Done: emission_spectrum_eV.dat")
+    if args.stream:
+        with runlog.stage("convolve", method=args.method, mode="stream") as rec:
+            grid, I = stream_broaden(args.infile, delta=args.delta, eps=args.eps, kappa=args.kappa,
+                                     method=args.method, Emin=args.emin, Emax=args.emax,
+                                     rows=args.chunk, max_mem=args.max_mem, threads=args.threads)
+            rec["Ng"] = grid.size
+        I = I / (I.max() if I.max() > 0 else 1.0)
+    elif args.cache:
+        with runlog.stage("convolve", method=args.method, mode="cache") as rec:
+            grid, I = reference_spectrum(args.infile, delta=args.delta, eps=args.eps,
+                                         kappa=args.kappa, method=args.method)
+            rec["Ng"] = grid.size
+        I = I / (I.max() if I.max() > 0 else 1.0)
+    else:
+        with runlog.stage("read-table") as rec:
+            E, R = read_emission_table(args.infile)
+            rec["rows"] = E.size
+        with runlog.stage("convolve", method=args.method, rows=E.size, threads=args.threads,
+                          mode="adaptive" if args.adaptive else None) as rec:
+            grid, I = emit_spectrum(E, R, delta=args.delta, eps=args.eps,
+                                    kappa=args.kappa, method=args.method, max_mem=args.max_mem,
+                                    tol=args.adaptive, max_step=args.max_step, threads=args.threads)
+            rec["Ng"] = grid.size
+        if args.adaptive:
+            print(f"adaptive grid: {grid.size} points (uniform eps grid: {make_grid(E, args.delta, args.eps, args.kappa).size})")
+    if args.store:
+        store.append(args.store, args.key, grid, I, params={
+            "source": args.infile, "delta": args.delta, "eps": args.eps, "kappa": args.kappa,
+            "method": args.method, "adaptive": args.adaptive, "norm": True})
+    if not args.no_text:
+        np.savetxt(args.out, np.column_stack([grid, I]), fmt="%.6f %.8e")
+    print("Done: " + ", ".join(([] if args.no_text else [args.out])
+                               + ([f"{args.store}::{args.key}"] if args.store else [])))
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""emspec：NEA/ML 发射谱流程的共享实现（卷积、读写、指标等）。
+
+各脚本按需导入子模块；此处不做任何预导入，保持命令行启动轻量。
+"""
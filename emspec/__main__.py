@@ -0,0 +1,4 @@
+import sys
+from emspec.cli import main
+
+sys.exit(main())
@@ -0,0 +1,60 @@
+"""自适应非均匀能量网格：曲率大处加密、平坦尾部放粗，线性插值误差不超过 tol·max(I)。
+
+步长 h 上分段线性插值的误差约 h^2 |I''| / 8，令其等于 tol·max(I)：
+    h(x) = sqrt(8 tol max(I) / |I''(x)|)，限制在 [eps, h_max] 内
+I'' 在步长 max(eps, delta/8) 的均匀试算网格上用 fft 卷积 + 二阶差分估计
+（O(N + Ng log Ng)），再按点密度 1/h(x) 等分布放点。
+网格端点与均匀网格 make_grid 相同，因此 eps 是最细步长，网格点数不会多于均匀网格。
+非均匀网格只能配合 window / dense（fft 需要均匀网格）。
+"""
+import math
+import numpy as np
+from emspec.kernel import convolve, make_grid
+
+DEFAULT_TOL = 1e-4
+
+
+def point_density(x, I, tol, h_min, h_max):
+    """每 eV 的格点数 1/h(x)"""
+    d2 = np.abs(np.gradient(np.gradient(I, x), x))
+    d2[1:-1] = np.maximum(d2[1:-1], np.maximum(d2[:-2], d2[2:]))  # 相邻取大，拐点附近不欠采样
+    scale = 8.0 * tol * max(float(np.abs(I).max()), 1e-300)
+    return np.clip(np.sqrt(d2 / scale), 1.0 / h_max, 1.0 / h_min)
+
+
+def adaptive_grid(E, R, delta, tol=DEFAULT_TOL, eps=0.002, kappa=3.0, Emin=None, Emax=None,
+                  h_max=None, oversample=4):
+    """返回升序非均匀网格；R 为 (N,) 或 (N, M)（多列时按各列之和估计曲率）"""
+    E = np.asarray(E, dtype=float)
+    R = np.asarray(R, dtype=float)
+    if R.ndim == 2:
+        R = R.sum(axis=1)
+    uni = make_grid(E, delta, eps, kappa=kappa, Emin=Emin, Emax=Emax)
+    if uni.size < 3:
+        return uni
+    a, b = uni[0], uni[-1]
+    h_max = max(h_max or delta, eps)
+    n_pilot = int(math.ceil((b - a) / max(eps, delta / 8.0))) + 1
+    if n_pilot >= uni.size:
+        return uni
+    x = np.linspace(a, b, n_pilot)
+    I = convolve(x, E, R, delta, kappa=kappa, method="fft", oversample=oversample)
+    rho = point_density(x, I, tol, eps, h_max)
+    cum = np.concatenate([[0.0], np.cumsum(0.5 * (rho[1:] + rho[:-1]) * np.diff(x))])
+    n = min(int(math.ceil(cum[-1])) + 1, uni.size)
+    grid = np.interp(np.linspace(0.0, cum[-1], n), cum, x)
+    grid[0], grid[-1] = a, b
+    return grid
+
+
+def broaden(E, R, delta=0.06, eps=0.002, kappa=3.0, tol=DEFAULT_TOL, method="window",
+            Emin=None, Emax=None, h_max=None, max_mem=None, dtype=np.float64, oversample=4,
+            threads=1):
+    """自适应网格 + 卷积，返回 grid, I（未归一化）；与 kernel.broaden 对应"""
+    if method == "fft":
+        raise SystemExit("[ERROR] 自适应网格不支持 fft 方法（需均匀网格），请用 window 或 dense")
+    E = np.asarray(E, dtype=float)
+    grid = adaptive_grid(E, R, delta, tol=tol, eps=eps, kappa=kappa, Emin=Emin, Emax=Emax,
+                         h_max=h_max, oversample=oversample)
+    return grid, convolve(grid, E, R, delta, kappa=kappa, method=method,
+                          max_mem=max_mem, dtype=dtype, threads=threads)
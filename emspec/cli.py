@@ -0,0 +1,110 @@
+"""统一命令行入口：python -m emspec <子命令> [参数]（或 emspec_cli.py）。
+
+子命令直接调用对应脚本的 main(argv)，参数与单独运行脚本完全相同：
+    convolve  emission_spectrum.py      速率表 -> 归一化 eV 谱
+    ric       ric_batch.py              一条参考 vs 多条候选的 RIC/指标表
+    metrics   disparity_emission.py     两条谱对齐后的差异指标（emspec.metrics 的外壳，M=1）
+    matrix    disparity_matrix.py       M 条谱两两差异矩阵（npz + CSV 汇总）
+    labels    train_labels.py           E/f 全长/子集/混合标签
+    select    select_train_points.py    按谱影响排序未标注几何，扩展 itrain（主动学习）
+    plot      plot_emission_compare.py  ML vs 参考 作图
+    sweep     sweep.py                  训练规模扫描（多个阶段可同进程执行）
+    bench     benchmark.py              各阶段基准与后端等价性检查（JSON）
+    profile   emspec.runlog             汇总阶段运行日志：profile summary [files]
+    store     emspec.store              二进制谱库：ls / export / import / compact
+    startup   测量各子命令的冷启动时间（新解释器中 import 到可运行为止）
+
+全局选项 --profile FILE（须在子命令之前）等价于 EMSPEC_PROFILE=FILE：
+各阶段的墙钟/CPU/峰值内存/行数/网格/方法追加到 FILE（JSONL）。
+
+本模块只依赖标准库；子命令的模块在分派时才导入，
+因此 labels 不会加载卷积/指标/matplotlib，help 也不导入 numpy。
+"""
+import importlib, os, subprocess, sys, time
+
+COMMANDS = {
+    "convolve": ("emission_spectrum", "速率表卷积出谱（同 emission_spectrum.py）"),
+    "ric":      ("ric_batch", "批量 RIC 与差异指标（同 ric_batch.py）"),
+    "metrics":  ("disparity_emission", "两条谱的差异指标（emspec.metrics，同 disparity_emission.py）"),
+    "matrix":   ("disparity_matrix", "M 条谱两两差异矩阵（同 disparity_matrix.py）"),
+    "labels":   ("train_labels", "E/f 训练标签（同 train_labels.py）"),
+    "select":   ("select_train_points", "主动学习选点（同 select_train_points.py）"),
+    "plot":     ("plot_emission_compare", "ML vs 参考 作图（同 plot_emission_compare.py）"),
+    "sweep":    ("sweep", "训练规模扫描（同 sweep.py）"),
+    "bench":    ("benchmark", "基准与等价性检查（同 benchmark.py）"),
+    "profile":  ("emspec.runlog", "阶段运行日志汇总：profile summary [files]"),
+    "store":    ("emspec.store", "二进制谱库：store ls|export|import|compact <库> ..."),
+}
+
+# 各脚本与 emspec 包位于同一目录（README 中的 script/）
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(name):
+    """导入子命令对应的脚本模块，返回其 main"""
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    return importlib.import_module(COMMANDS[name][0]).main
+
+
+def usage():
+    lines = ["用法: python -m emspec [--profile FILE] <子命令> [参数]   （子命令 -h 查看各自参数）", ""]
+    lines += [f"  {k:<9} {v[1]}" for k, v in COMMANDS.items()]
+    lines += [f"  {'startup':<9} 测量各子命令冷启动时间：startup [子命令 ...] [--repeat K]"]
+    return "\n".join(lines)
+
+
+def startup(argv):
+    """每个子命令在新解释器中 import + 取 main 的墙钟时间（取 K 次最小值）"""
+    repeat = 5
+    if "--repeat" in argv:
+        k = argv.index("--repeat")
+        repeat = int(argv[k + 1]); argv = argv[:k] + argv[k+2:]
+    names = argv or list(COMMANDS)
+    heavy = ("numpy", "emspec.kernel", "emspec.metrics", "matplotlib")
+    code = ("import sys, time; t = time.perf_counter(); sys.path.insert(0, {d!r}); "
+            "import emspec.cli as c; c.load({n!r}); "
+            f"heavy = [m for m in {heavy!r} if m in sys.modules]; "
+            "print(time.perf_counter() - t, ','.join(heavy) or '-')")
+    base = min(_run([sys.executable, "-c", "pass"]) for _ in range(repeat))
+    print(f"{'command':<10}{'cold/s':>10}{'import/s':>10}  loaded")
+    print(f"{'(python)':<10}{base:>10.3f}{0.0:>10.3f}  -")
+    for n in names:
+        if n not in COMMANDS:
+            raise SystemExit(f"[ERROR] 未知子命令: {n}")
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", code.format(d=SCRIPT_DIR, n=n)],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            wall = time.perf_counter() - t0
+            if best is None or wall < best[0]:
+                best = (wall, float(out[0]), out[1])
+        print(f"{n:<10}{best[0]:>10.3f}{best[1]:>10.3f}  {best[2]}")
+    return 0
+
+
+def _run(cmd):
+    t0 = time.perf_counter()
+    subprocess.run(cmd, check=True)
+    return time.perf_counter() - t0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    if argv[0] == "--profile":
+        if len(argv) < 3:
+            raise SystemExit("[ERROR] 用法: --profile FILE <子命令> ...")
+        os.environ["EMSPEC_PROFILE"] = argv[1]   # 子进程（如 sweep train）一并继承
+        argv = argv[2:]
+    name, rest = argv[0], argv[1:]
+    if name == "startup":
+        return startup(rest)
+    if name not in COMMANDS:
+        print(usage(), file=sys.stderr)
+        raise SystemExit(f"[ERROR] 未知子命令: {name}")
+    sys.argv = [f"emspec {name}"] + rest      # argparse 的 prog 显示为子命令
+    return load(name)(rest) or 0
@@ -0,0 +1,44 @@
+"""学习曲线：按 itrain 顺序增量累加核贡献，一次卷积得到所有前缀子集的谱。
+
+前缀 n 的谱 I_n = sum_{i<n} R_i g(E_i) / n；相邻请求点之间只卷积新增的几何，
+总代价等于对 max(n) 个几何做一次卷积。各段互不依赖，可交给进程池并行，
+再按顺序做累加。
+"""
+import numpy as np
+from emspec.kernel import convolve
+
+
+def _segment_sum(args):
+    grid, E, R, delta, kappa, method, max_mem = args
+    return convolve(grid, E, R, delta, kappa=kappa, method=method, max_mem=max_mem) * E.size
+
+
+def prefix_spectra(E, R, order, ns, grid, delta, kappa=3.0, method="window", max_mem=None,
+                   executor=None):
+    """按 order 顺序逐段累加，依次 yield (n, I_n)；ns 会被排序去重并截断到 len(order)。
+    executor 不为 None 时各段卷积并行提交，累加仍按 n 顺序进行（结果与串行一致）。"""
+    E = np.asarray(E, dtype=float)
+    R = np.asarray(R, dtype=float)
+    order = np.asarray(order, dtype=np.intp)
+    ns = sorted({min(int(n), order.size) for n in ns} - {0})
+    bounds = list(zip([0] + ns[:-1], ns))
+    segs = ((grid, E[order[a:b]], R[order[a:b]], delta, kappa, method, max_mem)
+            for a, b in bounds)
+    parts = map(_segment_sum, segs) if executor is None else executor.map(_segment_sum, segs)
+    acc = np.zeros(grid.size)
+    for n, part in zip(ns, parts):
+        acc += part
+        yield n, acc / n
+
+
+def prefix_ranges(E, order):
+    """前缀 n 的能量范围 (min, max)，返回两个按 n-1 索引的累积数组"""
+    Eo = np.asarray(E, dtype=float)[np.asarray(order, dtype=np.intp)]
+    return np.minimum.accumulate(Eo), np.maximum.accumulate(Eo)
+
+
+def first_occurrence(idx):
+    """去掉重复索引，保留首次出现的顺序（与 awk 建子集时按集合取行一致）"""
+    idx = np.asarray(idx)
+    _, first = np.unique(idx, return_index=True)
+    return idx[np.sort(first)]
@@ -0,0 +1,97 @@
+"""展宽宽度 delta 扫描与自动选择。
+
+整个 delta 列表共用一个网格（按最大 delta 外扩）和一次 CIC 沉积 + rfft，
+每个 delta 只多一次核频谱乘法与 irfft，代价约等于一两次卷积。
+
+选择准则（线形 g 是 sigma = delta/2 的归一化高斯，谱即以 R_i 为权的核密度估计）：
+  lscv       加权最小二乘交叉验证 ∫f^2 - 2 sum_i w_i f_{-i}(E_i)，取最小者
+  silverman  sigma = 0.9 min(sd, IQR/1.34) n_eff^(-1/5)，delta = 2 sigma
+  noise      随机对半拆分系综，两半谱的相对 L1 差 <= noise_tol 的最小 delta
+"""
+import numpy as np
+from emspec.kernel import fft_apply, fft_prepare, gauss_coeff, make_grid
+
+CRITERIA = ("lscv", "silverman", "noise")
+
+
+def parse_deltas(spec):
+    """'0.01:0.1:0.005'（含端点）或 '0.02,0.04,0.06'；返回升序去重，全部 > 0"""
+    try:
+        if ":" in spec:
+            a, b, step = (float(x) for x in spec.split(":"))
+            if step <= 0 or a > b:
+                raise SystemExit(f"[ERROR] delta 范围需为 起点:终点:步长，起点 <= 终点且步长 > 0: {spec}")
+            d = np.unique(np.arange(a, b + step/2, step))
+        else:
+            d = np.unique([float(x) for x in spec.split(",") if x.strip()])
+    except ValueError:
+        raise SystemExit(f"[ERROR] 无法解析 delta 列表: {spec}")
+    if d.size == 0 or d[0] <= 0:
+        raise SystemExit(f"[ERROR] delta 列表需非空且全部 > 0: {spec}")
+    return d
+
+
+def _weighted_quantile(x, w, q):
+    srt = np.argsort(x)
+    cw = np.cumsum(w[srt])
+    return np.interp(np.asarray(q) * cw[-1], cw, x[srt])
+
+
+def silverman_delta(E, R):
+    w = np.clip(np.asarray(R, dtype=float), 0.0, None)
+    mu = np.average(E, weights=w)
+    sd = np.sqrt(np.average((E - mu) ** 2, weights=w))
+    q1, q3 = _weighted_quantile(E, w, [0.25, 0.75])
+    n_eff = w.sum() ** 2 / (w ** 2).sum()
+    spread = min(sd, (q3 - q1) / 1.34) or sd
+    return 2.0 * 0.9 * spread * n_eff ** (-0.2)
+
+
+def scan(E, R, deltas, eps=0.002, kappa=3.0, oversample=4, seed=0):
+    """
+    返回 dict:
+      grid (Ng,), spectra (Ng, K)（按 N 归一，与 convolve 同尺度），
+      lscv (K,), noise (K,)（对半拆分的相对 L1 差）, silverman (标量)
+    """
+    E = np.asarray(E, dtype=float)
+    R = np.asarray(R, dtype=float)
+    deltas = np.asarray(deltas, dtype=float)
+    N = E.size
+    grid = make_grid(E, deltas.max(), eps, kappa=kappa)
+
+    half = np.random.default_rng(seed).permutation(N) < N // 2
+    W = np.column_stack([R, R * half, R * ~half])        # 全体 + 两半，一次沉积
+    prep = fft_prepare(grid, E, W, kappa * deltas.max(), oversample)
+
+    total = R.sum()
+    w = R / total if total > 0 else np.full(N, 1.0 / max(N, 1))
+    dx = np.diff(grid)
+    spectra = np.empty((grid.size, deltas.size))
+    lscv = np.empty(deltas.size)
+    noise = np.empty(deltas.size)
+    for k, d in enumerate(deltas):
+        S = fft_apply(prep, d, kappa)                  # (Ng, 3)
+        spectra[:, k] = S[:, 0] / N
+        f = S[:, 0] / total if total > 0 else S[:, 0] / N   # 归一化密度 sum_i w_i g(E_i)
+        int_f2 = np.sum(0.5 * (f[1:] ** 2 + f[:-1] ** 2) * dx)
+        f_i = np.interp(E, grid, f)
+        loo = (f_i - w * gauss_coeff(d)) / np.clip(1.0 - w, 1e-12, None)
+        lscv[k] = int_f2 - 2.0 * np.sum(w * loo)
+        a = S[:, 1] / max(half.sum(), 1); b = S[:, 2] / max((~half).sum(), 1)
+        num = np.sum(0.5 * (np.abs(a - b)[1:] + np.abs(a - b)[:-1]) * dx)
+        den = np.sum(0.5 * ((a + b)[1:] + (a + b)[:-1]) * dx) / 2.0
+        noise[k] = num / den if den > 0 else np.nan
+    return {"grid": grid, "spectra": spectra, "lscv": lscv, "noise": noise,
+            "silverman": silverman_delta(E, R)}
+
+
+def select(deltas, res, criterion="lscv", noise_tol=0.05):
+    deltas = np.asarray(deltas, dtype=float)
+    if criterion == "lscv":
+        return float(deltas[np.nanargmin(res["lscv"])])
+    if criterion == "silverman":
+        return float(res["silverman"])
+    if criterion == "noise":
+        ok = res["noise"] <= noise_tol     # deltas 不要求有序
+        return float(deltas[ok].min() if ok.any() else deltas.max())
+    raise SystemExit(f"[ERROR] 未知选择准则: {criterion}")
@@ -0,0 +1,273 @@
+"""NEA 高斯展宽卷积引擎。
+
+线形与原脚本保持一致：
+    g(x; mu) = 1/(delta*sqrt(pi/2)) * exp(-2*((x-mu)/delta)^2)
+    I(x)     = sum_i R_i * g(x; E_i) / N
+
+method:
+    window  每个几何只累加 |x-E_i| <= kappa*delta 内的格点（截断核，默认）
+    dense   全核精确求和，与旧版 (Ng, N) gauss_matrix 结果等价
+    fft     线性(CIC)沉积到 eps/oversample 细网格后做一次 FFT 卷积，
+            O(N + Ng log Ng)，仅适用于均匀网格；误差 ~ (eps/oversample/delta)^2
+
+window/dense 都按 max_mem（字节）把几何分块流式累加，峰值内存与 N 无关；
+dtype=np.float32 时块内核计算用单精度，跨块累加仍为 float64。
+
+threads > 1 时各几何块在线程池中并行计算（numpy 的 exp/索引/bincount/matmul 释放 GIL），
+每块得到私有的部分和，再按块顺序累加。块划分只取决于 N 与 max_mem、与线程数无关，
+所以任意线程数的结果逐位相同。同时在途的块不超过 2 × threads（滑动窗口，按顺序取回），
+峰值内存约为 threads × max_mem 加上至多 2 × threads 个待累加的部分和。
+fft 只有一次 O(N) 沉积和一次 FFT，不分线程。
+
+R 可以是 (N,) 或 (N, M) 权重矩阵（多种权重/bootstrap 重采样一次算完），
+结果相应为 (Ng,) 或 (Ng, M)。多列时 window 按能量排序后分块做带状 K_blk @ R_blk。
+"""
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+METHODS = ("window", "dense", "fft")
+
+# 默认每块临时数组的内存预算
+DEFAULT_MAX_MEM = 256 * 1024**2
+# 大系综至少切成这么多块，供线程并行；与线程数无关，保证结果可复现
+MIN_BLOCKS = 64
+MIN_BLOCK_ROWS = 2048
+
+
+def parse_mem(s):
+    """'512M' / '2G' / '1048576' -> 字节数"""
+    s = str(s).strip().upper().rstrip("B")
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    if s and s[-1] in units:
+        return int(float(s[:-1]) * units[s[-1]])
+    return int(float(s))
+
+
+def _block_size(per_item_bytes, max_mem, n=None):
+    """每块几何数：受内存预算限制；给出 n 时再限制为 max(n/MIN_BLOCKS, MIN_BLOCK_ROWS)"""
+    block = max(1, int((max_mem or DEFAULT_MAX_MEM) // max(per_item_bytes, 1)))
+    if n is not None:
+        block = min(block, max(-(-n // MIN_BLOCKS), MIN_BLOCK_ROWS))
+    return block
+
+
+def _ordered_add(acc, part, items, threads=1):
+    """acc[sl] += p，其中 (sl, p) = part(item)，严格按 items 顺序累加。
+    threads > 1 时 part 在线程池中并行执行，累加顺序不变，结果与串行逐位相同；
+    至多提交 2*threads 个块，最早的块取回累加后再补交，已算完的部分和不会无限堆积。"""
+    items = list(items)
+    if (threads or 1) <= 1 or len(items) < 2:
+        for it in items:
+            sl, p = part(it)
+            acc[sl] += p
+        return acc
+    window = 2 * int(threads)
+    with ThreadPoolExecutor(max_workers=int(threads)) as ex:
+        pending = deque()
+        for it in items:
+            if len(pending) >= window:
+                sl, p = pending.popleft().result()
+                acc[sl] += p
+            pending.append(ex.submit(part, it))
+        while pending:
+            sl, p = pending.popleft().result()
+            acc[sl] += p
+    return acc
+
+
+def gauss_coeff(delta):
+    return 1.0 / (delta * math.sqrt(math.pi/2.0))
+
+
+def make_grid(E, delta, eps, kappa=3.0, Emin=None, Emax=None):
+    """均匀能量网格：[min(E)-kappa*delta, max(E)+kappa*delta]，步长 eps"""
+    if Emin is None: Emin = float(np.min(E)) - kappa*delta
+    if Emax is None: Emax = float(np.max(E)) + kappa*delta
+    return np.arange(Emin, Emax + eps/2.0, eps)
+
+
+def _dense_sum(grid, E, R, delta, max_mem=None, dtype=np.float64, threads=1):
+    """全核求和：按列块计算 K_blk @ R_blk，块内原地运算只占一个 (Ng, blk) 数组"""
+    Ng = grid.size
+    itemsize = np.dtype(dtype).itemsize
+    block = _block_size(2 * Ng * itemsize, max_mem, E.size)
+    g = grid.astype(dtype, copy=False)
+    acc = np.zeros((Ng,) + R.shape[1:])
+
+    def part(s):
+        d = np.subtract.outer(g, E[s:s+block].astype(dtype))
+        d /= dtype(delta)
+        np.square(d, out=d)
+        d *= dtype(-2.0)
+        np.exp(d, out=d)
+        return slice(None), d @ R[s:s+block].astype(dtype)
+    _ordered_add(acc, part, range(0, E.size, block), threads)
+    return gauss_coeff(delta) * acc
+
+
+def _window_sum(grid, E, R, delta, kappa, max_mem=None, dtype=np.float64, threads=1):
+    """截断核：按能量窗口 [E_i-kappa*delta, E_i+kappa*delta] 做 scatter-add"""
+    Ng = grid.size
+    half = kappa * delta
+    acc = np.zeros(Ng)
+    lo_all = np.searchsorted(grid, E - half, side="left")
+    hi_all = np.searchsorted(grid, E + half, side="right")
+    width = int((hi_all - lo_all).max(initial=0))
+    if width == 0:
+        return acc
+    offs = np.arange(width)
+    # 每个窗口元素的临时量: 两份 idx(int64) + valid(bool) + bincount 的 float64 权重
+    # + 约 5 个 dtype 中间数组 (d, d*d, exp, w ...)
+    block = _block_size(width * (25 + 5 * np.dtype(dtype).itemsize), max_mem, E.size)
+    g = grid.astype(dtype, copy=False)
+
+    def part(s):
+        e, r = E[s:s+block].astype(dtype), R[s:s+block].astype(dtype)
+        lo, hi = lo_all[s:s+block], hi_all[s:s+block]
+        idx = lo[:, None] + offs[None, :]
+        valid = idx < hi[:, None]
+        idx = np.minimum(idx, Ng - 1)
+        d = (g[idx] - e[:, None]) / dtype(delta)
+        w = np.where(valid, r[:, None] * np.exp(dtype(-2.0) * d * d), dtype(0.0))
+        return slice(None), np.bincount(idx.ravel(), weights=w.ravel(), minlength=Ng)
+    _ordered_add(acc, part, range(0, E.size, block), threads)
+    return gauss_coeff(delta) * acc
+
+
+def _window_sum_multi(grid, E, R, delta, kappa, max_mem=None, dtype=np.float64, threads=1):
+    """多列权重的截断核：几何按能量排序后分块，每块只在其覆盖的格点带上做 GEMM"""
+    Ng, M = grid.size, R.shape[1]
+    half = kappa * delta
+    acc = np.zeros((Ng, M))
+    srt = np.argsort(E, kind="stable")
+    E, R = E[srt], R[srt]
+    lo_all = np.searchsorted(grid, E - half, side="left")
+    hi_all = np.searchsorted(grid, E + half, side="right")
+    width = max(int((hi_all - lo_all).max(initial=0)), 1)
+    itemsize = np.dtype(dtype).itemsize
+    elems = _block_size(3 * itemsize + 1, max_mem)   # 带状块 d/K/掩码 的元素上限
+    g = grid.astype(dtype, copy=False)
+    spans, s = [], 0                                  # 先确定块划分，再（并行）计算
+    while s < E.size:
+        end = min(E.size, s + max(1, elems // width))
+        while end - s > 1 and (hi_all[end-1] - lo_all[s]) * (end - s) > elems:
+            end = s + (end - s) // 2
+        if hi_all[s:end].max() > lo_all[s]:
+            spans.append((s, end))
+        s = end
+
+    def part(span):
+        s, end = span
+        gl, gh = lo_all[s], hi_all[s:end].max()
+        rows = np.arange(gl, gh)[:, None]
+        d = np.subtract.outer(g[gl:gh], E[s:end].astype(dtype)) / dtype(delta)
+        K = np.where((rows >= lo_all[None, s:end]) & (rows < hi_all[None, s:end]),
+                     np.exp(dtype(-2.0) * d * d), dtype(0.0))
+        return slice(gl, gh), K @ R[s:end].astype(dtype)
+    _ordered_add(acc, part, spans, threads)
+    return gauss_coeff(delta) * acc
+
+
+def fft_layout(grid, half, oversample=4):
+    """fft 细网格布局：步长 eps/oversample，两侧各外扩核半宽 half(eV)"""
+    Ng = grid.size
+    step = (grid[-1] - grid[0]) / (Ng - 1)
+    if np.abs(np.diff(grid) - step).max() > 1e-6 * step:
+        raise SystemExit("[ERROR] fft 方法需要均匀能量网格")
+    oversample = max(int(oversample), 1)
+    h = step / oversample
+    m = int(math.ceil(half / h))                  # 核半宽（细网格步数）
+    n = (Ng - 1) * oversample + 1 + 2 * m         # 细网格覆盖 [grid0-m*h, gridN+m*h]
+    return {"x0": grid[0] - m * h, "h": h, "m": m, "n": n, "Ng": Ng,
+            "oversample": oversample, "L": 1 << int(math.ceil(math.log2(n + 2 * m)))}
+
+
+def fft_deposit(lay, E, R, hist=None):
+    """CIC 线性沉积到细网格，累加进 hist (n, M)；可对分块数据反复调用"""
+    n = lay["n"]
+    u = (E - lay["x0"]) / lay["h"]
+    j = np.floor(u).astype(np.intp)
+    frac = u - j
+    keep = (j >= 0) & (j < n - 1)                 # 超出核半宽的几何对网格无贡献
+    j, frac, r = j[keep], frac[keep], R[keep]
+    cols = r.reshape(r.shape[0], -1)
+    if hist is None:
+        hist = np.zeros((n, cols.shape[1]))
+    for c in range(cols.shape[1]):
+        hist[:, c] += (np.bincount(j, weights=cols[:, c] * (1.0 - frac), minlength=n)
+                       + np.bincount(j + 1, weights=cols[:, c] * frac, minlength=n))
+    return hist
+
+
+def fft_transform(lay, hist, shape=()):
+    """沉积结果做 rfft，供 fft_apply 使用；shape 为权重的列形状"""
+    return dict(lay, H=np.fft.rfft(hist, lay["L"], axis=0), shape=tuple(shape))
+
+
+def fft_prepare(grid, E, R, half, oversample=4):
+    """CIC 沉积到 eps/oversample 细网格并做 rfft；half 为所需最大核半宽(eV)"""
+    lay = fft_layout(grid, half, oversample)
+    return fft_transform(lay, fft_deposit(lay, E, R), R.shape[1:])
+
+
+def fft_apply(prep, delta, kappa):
+    """对已沉积的系综乘以 delta 对应的高斯核频谱，取回粗网格上的值"""
+    m, h, L = prep["m"], prep["h"], prep["L"]
+    md = min(m, int(math.ceil(kappa * delta / h)))
+    t = np.arange(-m, m + 1) * h / delta
+    kern = gauss_coeff(delta) * np.exp(-2.0 * t * t)
+    kern[np.abs(np.arange(-m, m + 1)) > md] = 0.0
+    conv = np.fft.irfft(prep["H"] * np.fft.rfft(kern, L)[:, None], L, axis=0)
+    conv = conv.reshape((L,) + prep["shape"])
+    # 格点 k 对应细网格 m + k*oversample，线性卷积输出再偏移核半宽 m
+    return conv[2 * m + prep["oversample"] * np.arange(prep["Ng"])]
+
+
+def _fft_sum(grid, E, R, delta, kappa, oversample=4):
+    """直方图沉积 + FFT：核截断在 ±kappa*delta，与 window 同一线形"""
+    if grid.size < 2:
+        return _window_sum(grid, E, R, delta, kappa)
+    return fft_apply(fft_prepare(grid, E, R, kappa * delta, oversample), delta, kappa)
+
+
+def max_deviation(I, I_ref):
+    """最坏相对偏差 max|I - I_ref| / max|I_ref|"""
+    scale = np.abs(I_ref).max()
+    return float(np.abs(I - I_ref).max() / scale) if scale > 0 else 0.0
+
+
+def kernel_sum(grid, E, R, delta, kappa=3.0, method="window",
+               max_mem=None, dtype=np.float64, oversample=4, threads=1):
+    """sum_i R_i g(grid; E_i)（未除以 N）；可对分块数据逐块累加"""
+    grid = np.asarray(grid, dtype=float)
+    E = np.asarray(E, dtype=float)
+    R = np.asarray(R, dtype=float)
+    dtype = np.dtype(dtype).type
+    if method == "window" and R.ndim == 2:
+        return _window_sum_multi(grid, E, R, delta, kappa, max_mem=max_mem, dtype=dtype, threads=threads)
+    if method == "window":
+        return _window_sum(grid, E, R, delta, kappa, max_mem=max_mem, dtype=dtype, threads=threads)
+    if method == "dense":
+        return _dense_sum(grid, E, R, delta, max_mem=max_mem, dtype=dtype, threads=threads)
+    if method == "fft":
+        return _fft_sum(grid, E, R, delta, kappa, oversample=oversample)
+    raise SystemExit(f"[ERROR] 未知卷积方法: {method}")
+
+
+def convolve(grid, E, R, delta, kappa=3.0, method="window",
+             max_mem=None, dtype=np.float64, oversample=4, threads=1):
+    """在给定网格上计算 sum_i R_i g(grid; E_i) / N；R 为 (N,) 或 (N, M)"""
+    I = kernel_sum(grid, E, R, delta, kappa=kappa, method=method,
+                   max_mem=max_mem, dtype=dtype, oversample=oversample, threads=threads)
+    return I / max(np.size(E), 1)
+
+
+def broaden(E, R, delta=0.06, eps=0.002, kappa=3.0, method="window",
+            Emin=None, Emax=None, max_mem=None, dtype=np.float64, oversample=4, threads=1):
+    """建网格并卷积，返回 grid, I（未归一化）"""
+    E = np.asarray(E, dtype=float)
+    grid = make_grid(E, delta, eps, kappa=kappa, Emin=Emin, Emax=Emax)
+    return grid, convolve(grid, E, R, delta, kappa=kappa, method=method,
+                          max_mem=max_mem, dtype=dtype, oversample=oversample, threads=threads)
@@ -0,0 +1,118 @@
+"""训练标签工具的数组实现（make_train_labels / extract_train_labels / mix_labels / train_labels）。
+
+状态表读成按几何索引直接寻址的定长字节串数组（保留原文本精度），
+训练集为布尔掩码；预测文件按块流式读取，输出整块拼接后一次写出。
+索引一律 1-based。
+"""
+import itertools
+import numpy as np
+from emspec.tables import CHUNK_ROWS, cached, load_state_table
+
+
+def _parse_indices(path):
+    """每行一个整数；空行/非整数行跳过，保持原顺序"""
+    try:
+        idx = np.loadtxt(path, dtype=np.int64, ndmin=1, comments=None)
+        if idx.ndim == 1:
+            return idx
+    except ValueError:
+        pass
+    out = []
+    with open(path) as f:
+        for ln in f:
+            try: out.append(int(ln.strip()))
+            except ValueError: pass
+    return np.array(out, dtype=np.int64)
+
+
+def load_indices(path, n_use=None):
+    """索引文件 -> int64 数组（原顺序，可含重复）；n_use 只取前 n_use 个"""
+    idx = cached(path, "index", _parse_indices)
+    return np.asarray(idx if n_use is None else idx[:int(n_use)])
+
+
+def label_columns(path):
+    """
+    stateN.index.E.f -> {"E": (M+1,) 字节串, "f": ..., "has": (M+1,) bool}，M 为最大索引；
+    col[i] 为索引 i 的原始文本（同一索引出现多次时取最后一次）
+    """
+    S = load_state_table(path)
+    S = S[S["index"] >= 0]
+    M = int(S["index"].max()) if S.size else 0
+    cols = {"has": np.zeros(M + 1, dtype=bool)}
+    cols["has"][S["index"]] = True
+    for t, key in (("E", "E_str"), ("f", "f_str")):
+        cols[t] = np.zeros(M + 1, dtype=S[key].dtype)
+        cols[t][S["index"]] = S[key]
+    return cols
+
+
+def lookup(cols, t, idx):
+    """按索引取值：返回 (值, 是否有真值)；越界视为无真值"""
+    idx = np.asarray(idx, dtype=np.int64)
+    ok = (idx >= 0) & (idx < cols["has"].size)
+    safe = np.where(ok, idx, 0)
+    return cols[t][safe], ok & cols["has"][safe]
+
+
+def train_mask(idx, N):
+    """1..N 的训练掩码，mask[i-1] 对应索引 i"""
+    idx = np.asarray(idx, dtype=np.int64)
+    mask = np.zeros(N, dtype=bool)
+    mask[idx[(idx >= 1) & (idx <= N)] - 1] = True
+    return mask
+
+
+def write_lines(fo, arr, chunk=CHUNK_ROWS):
+    """字节串数组按块拼接写出，每项一行"""
+    for s in range(0, len(arr), chunk):
+        part = arr[s:s+chunk]
+        fo.write(b"\n".join(part.tolist() if isinstance(part, np.ndarray) else part) + b"\n")
+
+
+def full_column(cols, t, mask, fill=b"nan"):
+    """全长 1..N：训练位写真值（无真值写 nan），其它写 fill"""
+    vals, has = lookup(cols, t, np.arange(1, mask.size + 1))
+    out = np.full(mask.size, fill, dtype=f"S{max(vals.dtype.itemsize, 3, len(fill))}")
+    out[mask] = np.where(has[mask], vals[mask], b"nan")
+    return out
+
+
+def subset_column(cols, t, idx):
+    """只取训练索引（原顺序）中有真值的项"""
+    vals, has = lookup(cols, t, idx)
+    return vals[has]
+
+
+def pred_chunks(path, rows=CHUNK_ROWS):
+    """预测文件按块读取非空行（去首尾空白的字节串列表）"""
+    with open(path, "rb") as f:
+        while True:
+            lines = list(itertools.islice(f, rows))
+            if not lines:
+                break
+            yield [s for s in (ln.strip() for ln in lines) if s]
+
+
+def mix_column(fo, cols, t, pred_path, mask, N=None, rows=CHUNK_ROWS):
+    """
+    流式混合：第 i 行 = 训练位且有真值 ? 真值 : 预测第 i 行；N 为 None 时取预测行数。
+    mask 为 train_mask(idx, M)，超出 M 的位置视为非训练位。返回 (写出行数, 预测文件非空行数)
+    """
+    written = total = 0
+    for chunk in pred_chunks(pred_path, rows):
+        total += len(chunk)
+        k = len(chunk) if N is None else max(0, min(len(chunk), N - written))
+        if k == 0:
+            continue
+        ids = np.arange(written + 1, written + k + 1)
+        vals, has = lookup(cols, t, ids)
+        use = np.zeros(k, dtype=bool)
+        inside = ids[ids <= mask.size]
+        use[:inside.size] = mask[inside - 1]
+        use &= has
+        out = np.array(chunk[:k], dtype=object)
+        out[use] = vals[use]
+        write_lines(fo, out.tolist())
+        written += k
+    return written, total
@@ -0,0 +1,157 @@
+"""train/<N> 的增量清单：每个阶段记录输入文件的内容哈希、参数和输出，
+输入与参数都未变且输出完好时跳过该阶段；中断的扫描重跑时从未完成的阶段继续。
+
+<dir>/manifest.json：
+  files   {相对路径: [size, mtime_ns, sha256]}   哈希缓存，大小和 mtime 未变时不重读文件
+  stages  {阶段: {key, inputs {路径: sha256}, params {名: 值}, outputs {路径: [size, mtime_ns]}, ts}}
+key = sha256(输入哈希 + 参数)；输出被删除或改动（大小/mtime 不同）也视为过期。
+阶段成功结束后才写入记录（原子替换），失败或中断的阶段下次必然重跑。
+相对路径一律相对 <dir> 解析。
+
+命令行（ML_train_one.sh 用）：
+  python -m emspec.manifest check <dir> <stage> [--in F ...] [--param K=V ...] [--out F ...]   最新则退出码 0
+  python -m emspec.manifest done  <dir> <stage> [同上]                                        记录完成
+  python -m emspec.manifest status <dir> ...                                                  各阶段状态
+"""
+import argparse, hashlib, json, os, sys, time
+
+NAME = "manifest.json"
+
+
+def _path(root, p):
+    return os.path.normpath(os.path.join(root, p))
+
+
+def _rel(root, p):
+    return os.path.relpath(_path(root, p), root)
+
+
+def load(root):
+    try:
+        with open(os.path.join(root, NAME)) as f:
+            m = json.load(f)
+    except (OSError, ValueError):
+        m = {}
+    m.setdefault("files", {}); m.setdefault("stages", {})
+    return m
+
+
+def save(root, m):
+    tmp = os.path.join(root, f".{NAME}.{os.getpid()}")
+    with open(tmp, "w") as fo:
+        json.dump(m, fo, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(root, NAME))
+
+
+def _stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def file_hash(root, m, p):
+    """内容 sha256；大小与 mtime 同缓存一致时直接取缓存。文件不存在返回 None"""
+    full, rel = _path(root, p), _rel(root, p)
+    try:
+        st = _stat(full)
+    except OSError:
+        return None
+    hit = m["files"].get(rel)
+    if hit and hit[:2] == st:
+        return hit[2]
+    h = hashlib.sha256()
+    with open(full, "rb") as f:
+        for blk in iter(lambda: f.read(1 << 20), b""):
+            h.update(blk)
+    m["files"][rel] = st + [h.hexdigest()]
+    return h.hexdigest()
+
+
+def stage_key(root, m, inputs=(), params=None):
+    hashes = {_rel(root, p): file_hash(root, m, p) for p in inputs}
+    params = {k: str(v) for k, v in (params or {}).items()}
+    key = hashlib.sha256(json.dumps([sorted(hashes.items()), sorted(params.items())]).encode()).hexdigest()
+    return key, hashes, params
+
+
+def _outputs_intact(root, rec):
+    for p, st in rec.get("outputs", {}).items():
+        try:
+            if _stat(_path(root, p)) != st:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def fresh(root, stage, inputs=(), params=None, outputs=()):
+    """该阶段上次成功时的输入/参数与现在相同，且输出都在、未被改动"""
+    m = load(root)
+    rec = m["stages"].get(stage)
+    key, _, _ = stage_key(root, m, inputs, params)
+    ok = (rec is not None and rec["key"] == key and _outputs_intact(root, rec)
+          and all(_rel(root, p) in rec["outputs"] for p in outputs))
+    save(root, m)                              # 保存新算的哈希缓存
+    return ok
+
+
+def record(root, stage, inputs=(), params=None, outputs=()):
+    m = load(root)
+    key, hashes, params = stage_key(root, m, inputs, params)
+    missing = [p for p in outputs if not os.path.exists(_path(root, p))]
+    if missing:
+        raise SystemExit(f"[ERROR] 阶段 {stage} 的输出不存在: {', '.join(missing)}")
+    m["stages"][stage] = {"key": key, "inputs": hashes, "params": params,
+                          "outputs": {_rel(root, p): _stat(_path(root, p)) for p in outputs},
+                          "ts": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    save(root, m)
+
+
+def verified(root, stage):
+    """按记录的输入重新核对（不需要知道当初的参数），仍然有效则返回记录，否则 None"""
+    m = load(root)
+    rec = m["stages"].get(stage)
+    if rec is None or not _outputs_intact(root, rec):
+        return None
+    if any(file_hash(root, m, p) != h for p, h in rec["inputs"].items()):
+        return None
+    return rec
+
+
+def status(root, out=sys.stdout):
+    m = load(root)
+    out.write(f"{root}\n")
+    for name, rec in m["stages"].items():
+        ok = verified(root, name) is not None
+        out.write(f"  {name:<12} {'ok   ' if ok else 'stale'} {rec['ts']}  "
+                  + " ".join(f"{k}={v}" for k, v in rec["params"].items()) + "\n")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="train/<N> 阶段清单：输入未变则跳过")
+    ap.add_argument("cmd", choices=["check", "done", "status"])
+    ap.add_argument("dir", help="清单所在目录（如 train/500）")
+    ap.add_argument("stage", nargs="*", help="阶段名（status 时为更多目录）")
+    ap.add_argument("--in", dest="inputs", nargs="*", default=[], help="输入文件（内容哈希）")
+    ap.add_argument("--param", nargs="*", default=[], help="参数 K=V")
+    ap.add_argument("--out", dest="outputs", nargs="*", default=[], help="输出文件")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "status":
+        for d in [args.dir] + args.stage:
+            status(os.path.abspath(d))
+        return 0
+    if len(args.stage) != 1:
+        raise SystemExit("[ERROR] check/done 需要恰好一个阶段名")
+    bad = [p for p in args.param if "=" not in p]
+    if bad:
+        raise SystemExit(f"[ERROR] --param 需为 K=V: {' '.join(bad)}")
+    params = dict(p.split("=", 1) for p in args.param)
+    root, stage = os.path.abspath(args.dir), args.stage[0]
+    if args.cmd == "check":
+        return 0 if fresh(root, stage, args.inputs, params, args.outputs) else 1
+    record(root, stage, args.inputs, params, args.outputs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""批量光谱差异指标：一条参考谱 vs M 条候选谱，一次向量化计算。
+
+唯一的对齐/指标实现，RIC 驱动（ric_batch、td_ric_curve、sweep ml-ric）、
+disparity_emission（M=1）与 benchmark 都走这里：
+  - 公共网格取参考谱能量范围（从 E_ref[0] 起），步长 eps；eps=None 时取参考与全部候选
+    网格中位间距的最小值（下限 1e-4）；
+    若有输入为非均匀网格（如 emspec.adaptive）且 eps=None，公共网格取
+    各输入格点的并集，分段线性谱在其上插值无损；
+  - 候选谱线性插值到公共网格，区间外为 0；
+  - 每条候选只在与参考重叠的区间内积分（逐行掩码 + 梯形权重），
+    网格可以非均匀；非均匀网格上 RMSE / Cosine 也按梯形权重计算（均匀网格上与逐点相同）。
+
+返回 {指标: 长度 M 的数组}，键见 KEYS；
+"Rel_change" 即 RIC = ∫|B-A| dE / ∫A dE。
+"""
+import numpy as np
+
+KEYS = ["L1_norm_area", "Rel_change", "RMSE", "Cosine", "Overlap", "PeakShift_eV"]
+
+
+def median_step(E):
+    d = np.diff(E)
+    d = d[(d > 0) & np.isfinite(d)]
+    return float(np.median(d)) if d.size else (E[-1]-E[0])/max(len(E)-1, 1)
+
+
+def is_uniform(E, rtol=1e-2, atol=2.5e-6):
+    """步长变化不超过 max(rtol*步长, atol)；atol 对应文本输出 %.6f 的舍入
+    （相邻差最多抖动 2e-6），细网格（eps < 2e-4）也不会因此被判为非均匀"""
+    d = np.diff(E)
+    return d.size < 2 or float(np.ptp(d)) <= max(rtol * float(np.median(d)), atol)
+
+
+def union_grid(E_ref, cand_E):
+    """参考谱范围内所有输入格点的并集"""
+    lo, hi = E_ref[0], E_ref[-1]
+    pts = [E_ref] + [E[(E > lo) & (E < hi)] for E in cand_E]
+    return np.unique(np.concatenate(pts))
+
+
+def common_grid(E_ref, cand_E, eps=None):
+    if eps is None and not all(is_uniform(E) for E in [E_ref] + list(cand_E)):
+        grid = union_grid(E_ref, cand_E)
+        return grid, median_step(grid)
+    if eps is None:
+        eps = min([median_step(E_ref)] + [median_step(E) for E in cand_E])
+        eps = float(max(eps, 1e-4))
+    return np.arange(E_ref[0], E_ref[-1] + eps/2, eps), eps
+
+
+def align(E_ref, I_ref, cands, eps=None, grid=None):
+    """
+    cands: [(E, I), ...]，E 需升序。
+    返回 grid(G,), A(G,), B(M, G), mask(M, G)；mask 为各候选与参考的重叠区间。
+    """
+    E_ref = np.asarray(E_ref, dtype=float)
+    if grid is None:
+        grid, _ = common_grid(E_ref, [np.asarray(E) for E, _ in cands], eps=eps)
+    A = np.interp(grid, E_ref, I_ref, left=0.0, right=0.0)
+    B = np.zeros((len(cands), grid.size))
+    lo = np.empty(len(cands)); hi = np.empty(len(cands))
+    for k, (E, I) in enumerate(cands):
+        B[k] = np.interp(grid, E, I, left=0.0, right=0.0)
+        lo[k], hi[k] = E[0], E[-1]
+    lo = np.maximum(lo, E_ref[0]); hi = np.minimum(hi, E_ref[-1])
+    mask = (grid[None, :] >= lo[:, None]) & (grid[None, :] <= hi[:, None])
+    return grid, A, B, mask
+
+
+def interp_rows(x_new, x, Y):
+    """共享横坐标的多条曲线一次插值：Y 为 (len(x), M)，返回 (M, len(x_new))，区间外为 0"""
+    j = np.clip(np.searchsorted(x, x_new, side="right") - 1, 0, x.size - 2)
+    t = (x_new - x[j]) / (x[j+1] - x[j])
+    out = (Y[j] * (1.0 - t)[:, None] + Y[j+1] * t[:, None]).T
+    out[:, (x_new < x[0]) | (x_new > x[-1])] = 0.0
+    return out
+
+
+def trapz_weights(grid, mask):
+    """(M, G) 梯形积分权重：只累加两端都在掩码内的区间"""
+    dx = np.diff(grid)
+    pair = mask[:, :-1] & mask[:, 1:]
+    W = np.zeros(mask.shape)
+    W[:, :-1] += pair * (0.5 * dx)
+    W[:, 1:] += pair * (0.5 * dx)
+    return W
+
+
+def normalize_rows(Y, W, mask, mode):
+    if mode == "none":
+        return Y
+    if mode == "max":
+        s = np.where(mask, Y, -np.inf).max(axis=1, keepdims=True)
+    elif mode == "area":
+        s = (W * Y).sum(axis=1, keepdims=True)
+    else:
+        raise SystemExit(f"[ERROR] 未知归一化方式: {mode}")
+    return Y / np.where(s > 0, s, 1.0)
+
+
+def normalized(grid, A, B, mask, norm="none"):
+    """按重叠区间归一化并把区间外置 0：返回 W (M, G)、A (M, G)、B (M, G)"""
+    W = trapz_weights(grid, mask)
+    A = normalize_rows(np.broadcast_to(A, B.shape), W, mask, norm)
+    B = normalize_rows(B, W, mask, norm)
+    return W, np.where(mask, A, 0.0), np.where(mask, B, 0.0)
+
+
+def batch_metrics(grid, A, B, mask, norm="none", tiny=1e-20):
+    """A: 参考 (G,)；B: 候选 (M, G)。返回 {指标: (M,) 数组}"""
+    W, A, B = normalized(grid, A, B, mask, norm)
+
+    D = np.abs(A - B)
+    l1_area = (W * D).sum(axis=1)
+    span = W.sum(axis=1)
+    area_A = (W * A).sum(axis=1)
+    P = mask if is_uniform(grid) else W       # 逐点平均 / 积分平均
+    cnt = np.maximum(P.sum(axis=1), tiny)
+
+    nA = np.sqrt((P * A * A).sum(axis=1)); nB = np.sqrt((P * B * B).sum(axis=1))
+    cos = (P * A * B).sum(axis=1) / (np.maximum(nA, tiny) * np.maximum(nB, tiny))
+    overlap = (W * np.minimum(A, B)).sum(axis=1) / np.maximum((W * np.maximum(A, B)).sum(axis=1), tiny)
+
+    neg = np.where(mask, 0.0, -np.inf)
+    peak = grid[np.argmax(B + neg, axis=1)] - grid[np.argmax(A + neg, axis=1)]
+
+    res = {
+        "L1_norm_area": l1_area / np.maximum(span, tiny),
+        "Rel_change": np.where(area_A > 0, l1_area / np.maximum(area_A, tiny), np.nan),
+        "RMSE": np.sqrt((P * D * D).sum(axis=1) / cnt),
+        "Cosine": cos,
+        "Overlap": overlap,
+        "PeakShift_eV": peak,
+    }
+    empty = mask.sum(axis=1) < 2  # 无重叠区间
+    return {k: np.where(empty, np.nan, v) for k, v in res.items()}
+
+
+def compare(E_ref, I_ref, cands, eps=None, norm="none"):
+    """对齐 + 批量指标的便捷入口"""
+    grid, A, B, mask = align(E_ref, I_ref, cands, eps=eps)
+    return batch_metrics(grid, A, B, mask, norm=norm)
+
+
+PAIR_KEYS = ["RIC", "Cosine", "Overlap", "PeakShift_eV", "RMSE"]
+
+
+def stack_spectra(spectra, eps=None):
+    """M 条谱插值到一个公共均匀网格（各谱范围的并集，区间外为 0），返回 grid, Y (M, G)。
+    eps=None 时取各输入的最细间距：均匀网格取中位步长，非均匀网格取最小步长（下限 1e-4）"""
+    Es = [np.asarray(E, dtype=float) for E, _ in spectra]
+    if eps is None:
+        steps = [median_step(E) if is_uniform(E) else float(np.diff(E)[np.diff(E) > 0].min()) for E in Es]
+        eps = float(max(min(steps), 1e-4))
+    lo = min(E[0] for E in Es); hi = max(E[-1] for E in Es)
+    grid = np.arange(lo, hi + eps/2, eps)
+    Y = np.empty((len(spectra), grid.size))
+    for k, (E, (_, I)) in enumerate(zip(Es, spectra)):
+        Y[k] = np.interp(grid, E, I, left=0.0, right=0.0)
+    return grid, Y
+
+
+def pairwise_metrics(grid, Y, max_mem=256 * 1024**2, tiny=1e-20):
+    """全部 M×M 对的指标矩阵；第 i 行以谱 i 为参考：RIC[i, j] = ∫|Y_j - Y_i| dE / ∫Y_i dE。
+    Cosine/RMSE 由 Gram 矩阵得到；∫min/∫max 由 (面积和 ∓ L1)/2 得到，L1 按行块广播、只算上三角。"""
+    M, G = Y.shape
+    w = trapz_weights(grid, np.ones((1, G), dtype=bool))[0]
+    area = Y @ w
+    Gram = Y @ Y.T
+    nrm = np.sqrt(np.maximum(np.diag(Gram), 0.0))
+    L1 = np.zeros((M, M))
+    block = max(1, int(max_mem // (8 * M * G)))
+    for s in range(0, M, block):
+        e = min(M, s + block)
+        D = np.abs(Y[s:e, None, :] - Y[None, s:, :])        # (b, M-s, G)
+        L1[s:e, s:] = D @ w
+        L1[s:, s:e] = L1[s:e, s:].T
+    asum = area[:, None] + area[None, :]
+    peak = grid[np.argmax(Y, axis=1)]
+    sq = np.maximum(nrm[:, None]**2 + nrm[None, :]**2 - 2.0 * Gram, 0.0)
+    return {
+        "RIC": np.where(area[:, None] > 0, L1 / np.maximum(area[:, None], tiny), np.nan),
+        "Cosine": Gram / np.maximum(np.outer(nrm, nrm), tiny),
+        "Overlap": (asum - L1) / np.maximum(asum + L1, tiny),
+        "PeakShift_eV": peak[None, :] - peak[:, None],
+        "RMSE": np.sqrt(sq / G),
+    }
+
+
+def write_table(path, labels, res, keys=KEYS):
+    with open(path, "w") as fo:
+        fo.write("# label  " + "  ".join(keys) + "\n")
+        for k, lab in enumerate(labels):
+            fo.write(f"{lab}  " + "  ".join(f"{res[key][k]:.6e}" for key in keys) + "\n")
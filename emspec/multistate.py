@@ -0,0 +1,56 @@
+"""多激发态一次卷积：各态共用一个能量网格，一次批量核求和。
+
+各态的 (E_s, R_s) 拼成一个系综，权重矩阵 (N_tot, S) 的第 s 列只在该态的行上非零，
+取值 R_s / N_s，因此第 s 列结果与单独对该态做 convolve 相同；总谱为各列之和。
+"""
+import os, re
+import numpy as np
+from emspec.kernel import kernel_sum, make_grid
+from emspec.tables import load_state_table, read_emission_table
+
+
+def state_label(path):
+    """state3.index.E.f -> "state3"；其它文件用去扩展名的文件名"""
+    name = os.path.basename(path)
+    m = re.match(r"state(\d+)\.", name)
+    return f"state{m.group(1)}" if m else os.path.splitext(name)[0]
+
+
+def state_rates(path, exp=3.0):
+    """stateN.index.E.f -> (E, E^exp * f)"""
+    S = load_state_table(path)
+    if S.size == 0:
+        raise SystemExit(f"[ERROR] 未解析到数据: {path}")
+    E, f = np.asarray(S["E"]), np.asarray(S["f"])
+    return E, (f if exp == 0 else f * E ** exp)
+
+
+def block_weights(parts):
+    """[(E_s, R_s), ...] -> E (N_tot,), W (N_tot, S)，W[:, s] = R_s / N_s（仅本态行）"""
+    sizes = [E.size for E, _ in parts]
+    E = np.concatenate([np.asarray(E, dtype=float) for E, _ in parts])
+    W = np.zeros((E.size, len(parts)))
+    off = 0
+    for s, ((_, R), n) in enumerate(zip(parts, sizes)):
+        W[off:off+n, s] = np.asarray(R, dtype=float) / max(n, 1)
+        off += n
+    return E, W
+
+
+def multi_state_spectra(parts, delta=0.06, eps=0.002, kappa=3.0, method="window",
+                        max_mem=None, dtype=np.float64, oversample=4):
+    """返回 grid, I (Ng, S)：每列为一个态的谱（按该态几何数归一，未归一化最大值）"""
+    E, W = block_weights(parts)
+    grid = make_grid(E, delta, eps, kappa=kappa)
+    return grid, kernel_sum(grid, E, W, delta, kappa=kappa, method=method,
+                            max_mem=max_mem, dtype=dtype, oversample=oversample)
+
+
+def load_parts(states=(), rates=(), exp=3.0):
+    """状态标签文件按 E^exp*f 加权，速率表直接取第3列；返回 labels, parts"""
+    labels, parts = [], []
+    for p in states:
+        labels.append(state_label(p)); parts.append(state_rates(p, exp))
+    for p in rates:
+        labels.append(state_label(p)); parts.append(read_emission_table(p))
+    return labels, parts
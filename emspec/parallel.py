@@ -0,0 +1,52 @@
+"""有界进程池 + 子进程线程数固定，避免 jobs × BLAS 线程 超订核数。"""
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+               "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+
+def default_threads(jobs):
+    return max(1, (os.cpu_count() or 1) // max(int(jobs), 1))
+
+
+def pinned_env(threads, base=None):
+    """返回把各 BLAS/OpenMP 线程数固定为 threads 的环境变量副本"""
+    env = dict(os.environ if base is None else base)
+    env.update({k: str(int(threads)) for k in THREAD_VARS})
+    return env
+
+
+class _PinnedProcess(mp.context.SpawnProcess):
+    """启动子进程的那一刻才把线程数写进环境变量，随即复原父进程的 os.environ"""
+    pin = {}
+
+    def start(self):
+        saved = {k: os.environ.get(k) for k in self.pin}
+        os.environ.update(self.pin)
+        try:
+            super().start()
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+
+class _PinnedContext(mp.context.SpawnContext):
+    def __init__(self, threads):
+        super().__init__()
+        self.pin = {k: str(int(threads)) for k in THREAD_VARS}
+
+    def Process(self, *args, **kwargs):
+        p = _PinnedProcess(*args, **kwargs)
+        p.pin = self.pin
+        return p
+
+
+def process_pool(jobs, threads=None):
+    """spawn 方式的进程池；子进程在导入 numpy 前就继承固定后的线程数，调用方的环境不受影响"""
+    threads = threads or default_threads(jobs)
+    return ProcessPoolExecutor(max_workers=max(int(jobs), 1), mp_context=_PinnedContext(threads))
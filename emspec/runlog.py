@@ -0,0 +1,161 @@
+"""按阶段计时的运行日志（可选开启）。
+
+开启：环境变量 EMSPEC_PROFILE=<路径>（=1 时写到当前目录 emspec_profile.jsonl），
+或 emspec_cli.py --profile <路径> <子命令> ...；未开启时 stage() 不写任何东西。
+每个阶段追加一行 JSON：
+  stage, N（来自 EMSPEC_RUN_N）, script, wall_s, cpu_s（本进程 + 已结束子进程）,
+  peak_rss_mb（本进程/子进程历史峰值的较大者）, 以及调用方填入的 rows / Ng / method 等。
+sweep.py 为每个训练规模把日志指向 train/<N>/profile.jsonl。
+
+命令行：
+  python -m emspec.runlog run <stage> -- cmd ...      运行外部命令并记一行（ML_train_one.sh 用）
+  python -m emspec.runlog summary [files ...]         按阶段 × N 汇总，并拟合 wall ∝ n^b
+"""
+import argparse, contextlib, glob, json, math, os, resource, socket, subprocess, sys, time
+
+DEFAULT_LOG = "emspec_profile.jsonl"
+
+
+def log_path():
+    """未开启时返回 None"""
+    v = os.environ.get("EMSPEC_PROFILE", "")
+    if v in ("", "0"):
+        return None
+    return os.path.abspath(DEFAULT_LOG if v == "1" else v)
+
+
+def enabled():
+    return log_path() is not None
+
+
+def _usage():
+    s, c = (resource.getrusage(k) for k in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return (s.ru_utime + s.ru_stime + c.ru_utime + c.ru_stime,
+            max(s.ru_maxrss, c.ru_maxrss) / 1024)
+
+
+def write(rec, path=None):
+    path = path or log_path()
+    if path is None:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as fo:                  # 单行追加，并发写入不会交错
+        fo.write(json.dumps(rec, default=float) + "\n")
+
+
+@contextlib.contextmanager
+def stage(name, **info):
+    """with stage("convolve", method=m) as rec: ...; rec["rows"] = N —— 退出时追加一行"""
+    rec = dict(info)
+    if not enabled():
+        yield rec
+        return
+    cpu0, _ = _usage()
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except BaseException as e:             # 失败的阶段也记一行，标出异常
+        rec["error"] = type(e).__name__
+        raise
+    finally:
+        cpu1, peak = _usage()
+        record(name, time.perf_counter() - t0, cpu_s=cpu1 - cpu0, peak_rss_mb=peak, **rec)
+
+
+def record(name, wall, path=None, **info):
+    """直接追加一条记录（如 sweep 在父进程里记各 N 任务的墙钟）"""
+    out = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "stage": name,
+           "N": _run_n(), "script": os.path.basename(sys.argv[0]), "wall_s": wall,
+           "host": socket.gethostname(), "pid": os.getpid()}
+    out.update(info)
+    write(out, path)
+
+
+def _run_n():
+    n = os.environ.get("EMSPEC_RUN_N")
+    return int(n) if n and n.isdigit() else None
+
+
+def run(name, cmd):
+    """运行外部命令（stdout/stderr 直通），记录墙钟、子进程 CPU 与峰值 RSS，返回退出码"""
+    with stage(name, cmd=" ".join(cmd)) as rec:
+        rc = subprocess.call(cmd)
+        rec["returncode"] = rc
+    return rc
+
+
+def load(paths):
+    recs = []
+    for p in paths:
+        with open(p) as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        recs.append(json.loads(line))
+                    except ValueError:
+                        pass
+    return recs
+
+
+def scaling_exponent(xs, ys):
+    """log y = a + b log x 的最小二乘斜率 b；点数不足返回 None"""
+    pts = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x and y and x > 0 and y > 0]
+    if len({p[0] for p in pts}) < 2:
+        return None
+    mx = sum(p[0] for p in pts) / len(pts); my = sum(p[1] for p in pts) / len(pts)
+    sxx = sum((p[0] - mx) ** 2 for p in pts)
+    return sum((p[0] - mx) * (p[1] - my) for p in pts) / sxx
+
+
+def summary(recs, out=sys.stdout):
+    """阶段 × N 的墙钟/CPU/峰值内存表，及各阶段 wall 对规模的幂律指数"""
+    stages = {}
+    for r in recs:
+        stages.setdefault(r["stage"], []).append(r)
+    out.write(f"{'stage':<18}{'N':>9}{'runs':>6}{'wall/s':>11}{'cpu/s':>11}{'rss/MB':>9}"
+              f"{'rows':>11}{'Ng':>8}  method\n")
+    total = 0.0
+    for name, rs in stages.items():
+        byN = {}
+        for r in rs:
+            byN.setdefault(r.get("N"), []).append(r)
+        xs, ys = [], []
+        for n in sorted(byN, key=lambda v: (v is None, v or 0)):
+            g = byN[n]
+            wall = sum(r["wall_s"] for r in g); cpu = sum(r.get("cpu_s") or 0 for r in g)
+            rss = max(r.get("peak_rss_mb") or 0 for r in g)
+            rows = max((r.get("rows") or 0) for r in g) or None
+            Ng = max((r.get("Ng") or 0) for r in g) or None
+            method = ",".join(sorted({str(r["method"]) for r in g if r.get("method")})) or "-"
+            total += wall
+            out.write(f"{name:<18}{'-' if n is None else n:>9}{len(g):>6}{wall:>11.3f}{cpu:>11.3f}"
+                      f"{rss:>9.0f}{rows or '-':>11}{Ng or '-':>8}  {method}\n")
+            if n is not None:                  # 只用带 N 的记录拟合规模指数
+                xs.append(rows or n); ys.append(wall / len(g))
+        b = scaling_exponent(xs, ys)
+        if b is not None:
+            kind = "~常数" if b < 0.3 else "~线性" if b < 1.3 else "~n log n/超线性" if b < 1.7 else "~二次或更高"
+            out.write(f"{'':<18}{'scaling':>9}  wall ∝ n^{b:.2f}  ({kind})\n")
+    out.write(f"合计 wall = {total:.3f} s（{len(recs)} 条记录）\n")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["run"]:
+        if "--" not in argv or argv.index("--") != 2:
+            raise SystemExit("[ERROR] 用法: python -m emspec.runlog run <stage> -- cmd ...")
+        return run(argv[1], argv[3:])
+    ap = argparse.ArgumentParser(description="阶段运行日志汇总（跨训练规模 N）")
+    ap.add_argument("cmd", choices=["summary"])
+    ap.add_argument("files", nargs="*", help="JSONL 日志；默认 ./emspec_profile.jsonl 与 train/*/profile.jsonl")
+    args = ap.parse_args(argv)
+    files = args.files or [p for p in [DEFAULT_LOG] + sorted(glob.glob("train/*/profile.jsonl"))
+                           if os.path.isfile(p)]
+    if not files:
+        raise SystemExit("[ERROR] 未找到运行日志（先用 EMSPEC_PROFILE=1 运行）")
+    summary(load(files))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
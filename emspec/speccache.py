@@ -0,0 +1,72 @@
+"""按内容寻址的卷积谱缓存（参考谱只卷积一次）。
+
+键 = 速率表内容 sha256 + 展宽参数 (delta, eps, kappa, method[, oversample])；
+值 = (2, Ng) 的 .npy（grid, 未归一化强度），存于 $EMSPEC_CACHE_DIR/spectra。
+命中时刷新 mtime，写入后按 mtime 做 LRU 淘汰，总大小不超过
+$EMSPEC_SPECTRA_CAP（字节，可写 512M/2G，默认 512M）。EMSPEC_CACHE=0 关闭。
+"""
+import hashlib, json, os
+import numpy as np
+from emspec.kernel import broaden, parse_mem
+from emspec.tables import cache_dir, cache_enabled, evict_lru, read_emission_table
+
+DEFAULT_CAP = 512 * 1024**2
+
+
+def content_hash(path, bufsize=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(bufsize), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def spectrum_key(path, delta, eps, kappa, method, oversample=4):
+    params = {"delta": float(delta), "eps": float(eps), "kappa": float(kappa), "method": method}
+    if method == "fft":
+        params["oversample"] = int(oversample)
+    blob = json.dumps([content_hash(path), params], sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+def _spectra_dir():
+    return os.path.join(cache_dir(), "spectra")
+
+
+def evict(cap=None):
+    """按 mtime 从旧到新删除，直到总大小 <= cap"""
+    if cap is None:
+        cap = parse_mem(os.environ.get("EMSPEC_SPECTRA_CAP", DEFAULT_CAP))
+    evict_lru(_spectra_dir(), cap)
+
+
+def reference_spectrum(path, delta=0.06, eps=0.002, kappa=3.0, method="window",
+                       oversample=4, max_mem=None):
+    """速率表 -> (grid, I)（未归一化）；相同内容 + 参数只卷积一次"""
+    def compute():
+        E, R = read_emission_table(path)
+        return broaden(E, R, delta=delta, eps=eps, kappa=kappa, method=method,
+                       max_mem=max_mem, oversample=oversample)
+
+    if not cache_enabled():
+        return compute()
+    fn = os.path.join(_spectra_dir(),
+                      spectrum_key(path, delta, eps, kappa, method, oversample) + ".npy")
+    if os.path.exists(fn):
+        try:
+            arr = np.load(fn)
+            os.utime(fn)  # LRU: 记录最近使用
+            return arr[0], arr[1]
+        except (OSError, ValueError):
+            pass
+    grid, I = compute()
+    try:
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        tmp = f"{fn}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fo:
+            np.save(fo, np.vstack([grid, I]))
+        os.replace(tmp, fn)
+        evict()
+    except OSError:
+        pass
+    return grid, I
@@ -0,0 +1,202 @@
+"""追加式二进制谱库：一次扫描的全部谱存在一个目录里，按键 O(1) 随机读取（mmap，不复制）。
+
+<store>/
+  data.bin     float64 连续追加；每条记录是一个 (1 + C, Ng) 块：第 0 行能量网格，其后 C 列强度
+  index.jsonl  每条记录一行 {key, offset, shape, cols, params, ts}；同一键以最后一条为准
+写入（append / append_many）持 <store>/lock 排它锁，先写数据、再写索引行：中断时最多在
+data.bin 尾部留下无主字节、index.jsonl 尾部留下半行（读取时跳过，下次追加前先补换行），
+不会有索引指向不完整的数据。append_many 把多条记录拼成一次写入。
+读取时索引载入为 dict（按 index.jsonl 的大小/mtime 缓存），get 返回 data.bin 的 memmap 切片。
+compact 重写数据文件，去掉被覆盖的旧记录。
+
+其它脚本的谱文件参数都可写成 'STORE::KEY'（可加 '#列名' 取指定强度列），
+经 tables.load_spectrum 直接从库中读取；export 把任意键导出为文本视图。
+键约定：ref、ml/<N>、ml/<N>/weights、td/<N>、aligned/<名称>。
+
+命令行：
+  python -m emspec.store ls      STORE [前缀]            列出键、列、点数与参数
+  python -m emspec.store export  STORE KEY [-o 文件]     文本视图（E 与各列，%.6f %.8e）
+  python -m emspec.store import  STORE FILE ... --keys K ...    导入已有的文本谱
+  python -m emspec.store compact STORE
+"""
+import argparse, contextlib, fcntl, json, os, sys, time
+import numpy as np
+
+SEP = "::"
+DATA, INDEX, LOCK = "data.bin", "index.jsonl", "lock"
+
+_index_cache = {}
+
+
+def split_spec(spec):
+    """'STORE::KEY[#列]' -> (STORE, KEY, 列或 None)；不是库路径时返回 None"""
+    spec = str(spec)
+    if SEP not in spec:
+        return None
+    root, key = spec.split(SEP, 1)
+    key, _, col = key.partition("#")
+    return root, key, col or None
+
+
+@contextlib.contextmanager
+def _locked(root):
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK), "a") as lk:
+        fcntl.flock(lk, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lk, fcntl.LOCK_UN)
+
+
+def index(root):
+    """{键: 记录}；index.jsonl 未变时直接返回缓存"""
+    path = os.path.join(root, INDEX)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    tag = (st.st_size, st.st_mtime_ns)
+    hit = _index_cache.get(path)
+    if hit and hit[0] == tag:
+        return hit[1]
+    idx = {}
+    with open(path) as f:
+        for ln in f:
+            try:
+                rec = json.loads(ln)
+            except ValueError:                 # 中断留下的半行
+                continue
+            idx[rec["key"]] = rec
+    _index_cache[path] = (tag, idx)
+    return idx
+
+
+def _block(grid, I, cols):
+    I = np.asarray(I, dtype=float)
+    I = I[:, None] if I.ndim == 1 else I
+    grid = np.asarray(grid, dtype=float)
+    if I.shape[0] != grid.size:
+        raise SystemExit(f"[ERROR] 谱长度 {I.shape[0]} 与网格点数 {grid.size} 不一致")
+    cols = list(cols) if cols is not None else (["I"] if I.shape[1] == 1 else [f"I{k}" for k in range(I.shape[1])])
+    if len(cols) != I.shape[1]:
+        raise SystemExit(f"[ERROR] 列名 {cols} 与强度列数 {I.shape[1]} 不一致")
+    return np.vstack([grid, I.T]), cols
+
+
+def append_many(root, items):
+    """items: [(key, grid, I, params, cols), ...]；I 为 (Ng,) 或 (Ng, C)，cols 可为 None。
+    全部记录拼成一个缓冲区一次写入，再一次写入对应的索引行"""
+    blocks = [(key, *_block(grid, I, cols), params or {}) for key, grid, I, params, cols in items]
+    if not blocks:
+        return
+    with _locked(root):
+        data = os.path.join(root, DATA)
+        with open(data, "ab") as fo:
+            off = -(-fo.seek(0, os.SEEK_END) // 8) * 8          # 按 8 字节对齐（越过中断留下的尾部）
+            fo.truncate(off)
+            fo.seek(off)
+            fo.write(b"".join(np.ascontiguousarray(B).tobytes() for _, B, _, _ in blocks))
+        ts = time.strftime("%Y-%m-%dT%H:%M:%S")
+        lines = []
+        for key, B, cols, params in blocks:
+            lines.append(json.dumps({"key": key, "offset": off, "shape": list(B.shape), "cols": cols,
+                                     "params": params, "ts": ts}, default=float))
+            off += B.nbytes
+        with open(os.path.join(root, INDEX), "ab+") as fo:
+            if fo.seek(0, os.SEEK_END):               # 中断留下的半行先补上换行，不吞掉新记录
+                fo.seek(-1, os.SEEK_END)
+                if fo.read(1) != b"\n":
+                    lines.insert(0, "")
+            fo.write(("\n".join(lines) + "\n").encode())
+
+
+def append(root, key, grid, I, params=None, cols=None):
+    append_many(root, [(key, grid, I, params, cols)])
+
+
+def get(root, key):
+    """(记录, (1 + C, Ng) 只读 memmap)；键不存在时报错"""
+    rec = index(root).get(key)
+    if rec is None:
+        raise SystemExit(f"[ERROR] 谱库 {root} 中没有键 {key}")
+    arr = np.memmap(os.path.join(root, DATA), dtype=float, mode="r",
+                    offset=rec["offset"], shape=tuple(rec["shape"]))
+    return rec, arr
+
+
+def load(spec, cols=None):
+    """'STORE::KEY[#列]' -> E, I；cols=(e_row, i_row) 按块内行号取（0 为网格，与两列文本一致）"""
+    root, key, col = split_spec(spec)
+    rec, arr = get(root, key)
+    if col is not None:
+        if col not in rec["cols"]:
+            raise SystemExit(f"[ERROR] {key} 没有列 {col}（可用: {', '.join(rec['cols'])}）")
+        cols = (0, 1 + rec["cols"].index(col))
+    e_row, i_row = cols or (0, 1)
+    return arr[e_row], arr[i_row]
+
+
+def find(root, prefix=""):
+    """键以 prefix 开头的记录，按键排序"""
+    return [rec for key, rec in sorted(index(root).items()) if key.startswith(prefix)]
+
+
+def export(root, key, path):
+    rec, arr = get(root, key)
+    np.savetxt(path, arr.T, fmt="%.6f" + " %.8e" * len(rec["cols"]),
+               header="DE/eV  " + "  ".join(rec["cols"]))
+
+
+def compact(root):
+    """只保留每个键的最新记录，重写 data.bin 与 index.jsonl"""
+    with _locked(root):
+        idx = index(root)
+        src = np.memmap(os.path.join(root, DATA), dtype=np.uint8, mode="r") if idx else None
+        tmp_d, tmp_i = (os.path.join(root, f".{n}.{os.getpid()}") for n in (DATA, INDEX))
+        off = 0
+        with open(tmp_d, "wb") as fd, open(tmp_i, "w") as fi:
+            for key, rec in idx.items():
+                n = 8 * int(np.prod(rec["shape"]))
+                fd.write(src[rec["offset"]:rec["offset"] + n].tobytes())
+                fi.write(json.dumps(dict(rec, offset=off), default=float) + "\n")
+                off += n
+        os.replace(tmp_d, os.path.join(root, DATA))
+        os.replace(tmp_i, os.path.join(root, INDEX))
+    return len(idx)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="追加式二进制谱库：列出 / 导出文本 / 导入文本 / 压缩")
+    ap.add_argument("cmd", choices=["ls", "export", "import", "compact"])
+    ap.add_argument("store", help="谱库目录，如 spectra.store")
+    ap.add_argument("args", nargs="*", help="ls: 键前缀；export: 键；import: 文本谱文件")
+    ap.add_argument("--keys", nargs="+", default=None, help="import: 与文件一一对应的键")
+    ap.add_argument("-o", "--out", default=None, help="export 输出文件（默认 stdout）")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "ls":
+        for rec in find(args.store, args.args[0] if args.args else ""):
+            print(f"{rec['key']:<24} {','.join(rec['cols']):<16} Ng={rec['shape'][1]:<7} "
+                  + " ".join(f"{k}={v}" for k, v in rec["params"].items() if not isinstance(v, dict)))
+    elif args.cmd == "export":
+        if len(args.args) != 1:
+            raise SystemExit("[ERROR] export 需要恰好一个键")
+        export(args.store, args.args[0], args.out or sys.stdout.buffer)
+    elif args.cmd == "import":
+        from emspec.tables import load_spectrum
+        if not args.keys or len(args.keys) != len(args.args):
+            raise SystemExit("[ERROR] import 需要 --keys，且与文件一一对应")
+        items = []
+        for key, path in zip(args.keys, args.args):
+            E, I = load_spectrum(path, trim_zeros=False)
+            items.append((key, E, I, {"source": os.path.abspath(path)}, None))
+        append_many(args.store, items)
+        print(f"导入 {len(items)} 条谱 -> {args.store}")
+    else:
+        print(f"保留 {compact(args.store)} 条记录")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
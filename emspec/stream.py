@@ -0,0 +1,98 @@
+"""速率表流式卷积：超出内存的系综逐块读取、逐块累加到网格，峰值内存与行数无关。
+
+谱是对几何的求和，因此可以边读边算：
+  - 网格边界取 [Emin-kappa*delta, Emax+kappa*delta]，与整表 broaden 相同；
+    Emin/Emax 未给出时先扫一遍文件求能量范围（只保留两个数）；
+  - 输入为 stdin ('-') 且没给能量窗口时，首遍把 (E, R) 以 float64 二进制
+    暂存到临时文件（每行 16 字节），第二遍再按块读回；
+  - window/dense 每块直接累加 kernel_sum；fft 把各块沉积到同一细网格直方图，
+    最后只做一次 FFT。
+"""
+import os, tempfile
+import numpy as np
+from emspec.kernel import fft_apply, fft_deposit, fft_layout, fft_transform, kernel_sum, make_grid
+from emspec.tables import CHUNK_ROWS, iter_table_chunks
+
+
+def rate_chunks(src, rows=CHUNK_ROWS):
+    """emission-rate 表逐块产出 (E, R)：第1列 E(eV)，第3列 diff_rate"""
+    for A in iter_table_chunks(src, rows):
+        if A.shape[1] < 3:
+            raise SystemExit(f"[ERROR] 未解析到数据，请检查 {src} 的列顺序/空行。")
+        yield A[:, 0].copy(), A[:, 2].copy()
+
+
+def energy_range(chunks):
+    """遍历 (E, R) 块，返回 (Emin, Emax, N)"""
+    lo, hi, n = np.inf, -np.inf, 0
+    for E, _ in chunks:
+        lo, hi, n = min(lo, E.min()), max(hi, E.max()), n + E.size
+    return lo, hi, n
+
+
+def _spool(chunks, fo):
+    """首遍：块写入二进制临时文件，同时记录能量范围"""
+    lo, hi, n = np.inf, -np.inf, 0
+    for E, R in chunks:
+        np.column_stack([E, R]).tofile(fo)
+        lo, hi, n = min(lo, E.min()), max(hi, E.max()), n + E.size
+    fo.flush()
+    return lo, hi, n
+
+
+def _spooled_chunks(path, rows=CHUNK_ROWS):
+    with open(path, "rb") as f:
+        while True:
+            A = np.fromfile(f, dtype=float, count=2 * rows)
+            if A.size == 0:
+                break
+            A = A.reshape(-1, 2)
+            yield A[:, 0], A[:, 1]
+
+
+def stream_broaden(src, delta=0.06, eps=0.002, kappa=3.0, method="window",
+                   Emin=None, Emax=None, rows=CHUNK_ROWS, max_mem=None,
+                   dtype=np.float64, oversample=4, threads=1):
+    """
+    src: 速率表路径或 '-'(stdin)；Emin/Emax 为数据能量窗口（网格再外扩 kappa*delta），
+    窗口外的几何仍按截断核贡献到网格边缘。返回 grid, I（按 N 归一、未归一化最大值）
+    """
+    spool = None
+    try:
+        if Emin is None or Emax is None:
+            if src == "-":
+                spool = tempfile.NamedTemporaryFile(prefix="emspec-", suffix=".bin", delete=False)
+                lo, hi, n = _spool(rate_chunks(src, rows), spool)
+                spool.close()
+            else:
+                lo, hi, n = energy_range(rate_chunks(src, rows))
+            if n == 0:
+                raise SystemExit(f"[ERROR] 未解析到数据，请检查 {src} 的列顺序/空行。")
+            Emin = lo if Emin is None else Emin
+            Emax = hi if Emax is None else Emax
+        grid = make_grid(np.array([Emin, Emax]), delta, eps, kappa=kappa)
+        chunks = _spooled_chunks(spool.name, rows) if spool else rate_chunks(src, rows)
+
+        use_fft = method == "fft" and grid.size > 1
+        if use_fft:
+            lay = fft_layout(grid, kappa * delta, oversample)
+            hist = None
+        else:
+            acc = np.zeros(grid.size)
+        N = 0
+        for E, R in chunks:
+            N += E.size
+            if use_fft:
+                hist = fft_deposit(lay, E, R, hist)
+            else:
+                acc += kernel_sum(grid, E, R, delta, kappa=kappa, method=method,
+                                  max_mem=max_mem, dtype=dtype, threads=threads)
+        if N == 0:
+            raise SystemExit(f"[ERROR] 未解析到数据，请检查 {src} 的列顺序/空行。")
+        if use_fft:
+            acc = fft_apply(fft_transform(lay, hist), delta, kappa)
+        return grid, acc / N
+    finally:
+        if spool is not None:
+            spool.close()
+            os.unlink(spool.name)
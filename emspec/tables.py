@@ -0,0 +1,230 @@
+"""文本表格读取 + 二进制列式缓存。
+
+emission-rate.dat / 光谱文件 / stateN.index.E.f 首次解析后写成 .npy
+（可 mmap），缓存键为 源文件绝对路径 + mtime + size；源文件变动后自动重建。
+
+缓存目录: $EMSPEC_CACHE_DIR，默认 ~/.cache/emspec；EMSPEC_CACHE=0 关闭缓存。
+目录不可写时静默退回直接解析。命中时刷新 mtime，写入后按 mtime 做 LRU 淘汰，
+表格缓存总大小不超过 $EMSPEC_TABLES_CAP（字节，可写 512M/2G，默认 2G）。
+
+文本按 CHUNK_ROWS 行一块解析（整块 loadtxt，遇表头等再逐行过滤），
+iter_table_chunks 也可直接用于流式处理（路径或 '-' = stdin）。
+"""
+import glob, hashlib, itertools, os, sys
+import numpy as np
+from emspec.kernel import parse_mem
+
+CHUNK_ROWS = 1 << 18
+DEFAULT_TABLES_CAP = 2 * 1024**3
+
+
+def _try_float(x):
+    try:
+        return float(x)
+    except ValueError:
+        return None
+
+
+def cache_enabled():
+    return os.environ.get("EMSPEC_CACHE", "1") != "0"
+
+
+def cache_dir():
+    return (os.environ.get("EMSPEC_CACHE_DIR")
+            or os.path.join(os.path.expanduser("~"), ".cache", "emspec"))
+
+
+def evict_lru(d, cap):
+    """目录 d 下的 .npy 按 mtime 从旧到新删除，直到总大小 <= cap（不进入子目录）"""
+    if not os.path.isdir(d):
+        return
+    files = []
+    for name in os.listdir(d):
+        p = os.path.join(d, name)
+        if name.endswith(".npy") and os.path.isfile(p):
+            st = os.stat(p)
+            files.append((st.st_mtime, st.st_size, p))
+    total = sum(f[1] for f in files)
+    for _, size, p in sorted(files):
+        if total <= cap:
+            break
+        try:
+            os.remove(p)
+            total -= size
+        except OSError:
+            pass
+
+
+def _cache_paths(path, kind):
+    src = os.path.abspath(path)
+    st = os.stat(src)
+    tag = hashlib.sha1(src.encode()).hexdigest()[:12]
+    key = hashlib.sha1(f"{st.st_mtime_ns}:{st.st_size}".encode()).hexdigest()[:12]
+    base = os.path.join(cache_dir(), f"{os.path.basename(src)}.{kind}.{tag}")
+    return f"{base}.{key}.npy", base
+
+
+def _readonly(arr):
+    arr.setflags(write=False)
+    return arr
+
+
+def cached(path, kind, parse):
+    """按 (路径, mtime, size) 缓存 parse(path) 的数组结果。
+    命中与未命中都返回缓存文件的只读 memmap（同一类型、同样不可写）；
+    缓存关闭或写不进去时返回只读的解析结果"""
+    if not cache_enabled() or not os.path.isfile(path):
+        return _readonly(parse(path))
+    fn, base = _cache_paths(path, kind)
+    if os.path.exists(fn):
+        try:
+            arr = np.load(fn, mmap_mode="r")
+            os.utime(fn)  # LRU: 记录最近使用
+            return arr
+        except (OSError, ValueError):
+            pass
+    arr = parse(path)
+    try:
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        for old in glob.glob(glob.escape(base) + ".*.npy"):  # 同一源文件的旧版本
+            os.remove(old)
+        tmp = f"{fn}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fo:
+            np.save(fo, arr)
+        os.replace(tmp, fn)
+        evict_lru(cache_dir(), parse_mem(os.environ.get("EMSPEC_TABLES_CAP", DEFAULT_TABLES_CAP)))
+        return np.load(fn, mmap_mode="r")
+    except (OSError, ValueError):
+        return _readonly(arr)
+
+
+def _parse_lines(lines, ncols):
+    """一块文本行 -> (k, ncols) 数组；表头/含非数值的行跳过，列数以首个数值行为准"""
+    if ncols is not None:
+        try:
+            A = np.loadtxt(lines, ndmin=2, comments=None)
+            if A.shape[1] >= ncols:
+                return A[:, :ncols], ncols
+        except ValueError:  # 块内有表头、空列或列数不齐，逐行处理
+            pass
+    rows = []
+    for line in lines:
+        parts = line.split()
+        if not parts or parts[0].startswith("#"):
+            continue
+        nums = [_try_float(tok) for tok in parts]
+        if None in nums:
+            continue
+        if ncols is None:
+            ncols = len(nums)
+        if len(nums) < ncols:
+            continue
+        rows.append(nums[:ncols])
+    if not rows:                     # 整块都是表头/非数值行
+        return np.empty((0, ncols or 0)), ncols
+    return np.array(rows, dtype=float), ncols
+
+
+def iter_table_chunks(src, rows=CHUNK_ROWS):
+    """逐块读取数值表（路径，或 '-' 表示 stdin），产出 (k, ncols) 数组；内存只与块大小有关"""
+    f = sys.stdin if src == "-" else open(src, "r", encoding="utf-8", errors="ignore")
+    ncols = None
+    try:
+        while True:
+            lines = list(itertools.islice(f, rows))
+            if not lines:
+                break
+            A, ncols = _parse_lines(lines, ncols)
+            if A.shape[0]:
+                yield A
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _parse_numeric(path):
+    """数值行 -> (ncols, nrows) 列式数组"""
+    chunks = list(iter_table_chunks(path))
+    if not chunks:
+        return np.empty((0, 0))
+    return np.ascontiguousarray(np.concatenate(chunks).T)
+
+
+def load_table(path):
+    """数值列表格 -> (ncols, nrows) 数组（缓存）"""
+    return cached(path, "table", _parse_numeric)
+
+
+def read_emission_table(path):
+    """emission-rate.dat：第1列 E(eV)，第3列 diff_rate"""
+    T = load_table(path)
+    if T.shape[0] < 3 or T.shape[1] == 0:
+        raise SystemExit(f"[ERROR] 未解析到数据，请检查 {path} 的列顺序/空行。")
+    return T[0], T[2]
+
+
+def load_spectrum(path, cols=None, trim_zeros=True):
+    """
+    读取光谱文件。支持两种常见格式：
+      1) 两列:  E   I
+      2) 四列:  E   lambda   I(or sigma)   err
+    也可以是谱库记录 'STORE::KEY[#列]'（emspec.store），默认取网格与第一列强度。
+    参数:
+      cols: (e_col, i_col)  可手动指定列索引；不指定时自动猜测。
+      trim_zeros: 去掉首尾强度全为0的区段
+    返回:
+      E(sorted), I(sorted)
+    """
+    from emspec import store
+    if store.split_spec(path):
+        E, I = store.load(path, cols)
+        return _sort_trim(np.asarray(E, dtype=float), np.asarray(I, dtype=float), trim_zeros)
+    T = load_table(path)  # (ncols, nrows)，表头/非数值行已跳过，走二进制缓存
+    if cols is not None:
+        e_col, i_col = cols
+    else:
+        # 自动猜：>=3列 -> 取第0列能量、第2列强度；否则取第0/1列
+        e_col, i_col = (0, 2) if T.shape[0] >= 3 else (0, 1)
+
+    if T.shape[1] == 0 or max(e_col, i_col) >= T.shape[0]:
+        raise SystemExit(f"[ERROR] 解析失败：{path}")
+
+    return _sort_trim(np.asarray(T[e_col], dtype=float), np.asarray(T[i_col], dtype=float), trim_zeros)
+
+def _sort_trim(E, I, trim_zeros):
+    # 按能量排序
+    idx = np.argsort(E)
+    E, I = E[idx], I[idx]
+
+    # 去除首尾全0
+    if trim_zeros:
+        nz = np.nonzero(I)[0]
+        if nz.size > 0:
+            E = E[nz[0]:nz[-1]+1]
+            I = I[nz[0]:nz[-1]+1]
+
+    return E, I
+
+def _parse_state(path):
+    idx, E, f, Es, fs = [], [], [], [], []
+    with open(path) as fobj:
+        for line in fobj:
+            parts = line.split()
+            if len(parts) < 3: continue
+            try:
+                i, e, v = int(parts[0]), float(parts[1]), float(parts[2])
+            except ValueError:  # 表头或非数值行
+                continue
+            idx.append(i); E.append(e); f.append(v)
+            Es.append(parts[1]); fs.append(parts[2])
+    w = max([len(s) for s in Es + fs] or [1])
+    arr = np.empty(len(idx), dtype=[("index", "i8"), ("E", "f8"), ("f", "f8"),
+                                    ("E_str", f"S{w}"), ("f_str", f"S{w}")])
+    arr["index"], arr["E"], arr["f"] = idx, E, f
+    arr["E_str"], arr["f_str"] = Es, fs
+    return arr
+
+
+def load_state_table(path):
+    """stateN.index.E.f -> 结构化数组 (index, E, f, E_str, f_str)；*_str 保留原始文本精度"""
+    return cached(path, "state", _parse_state)
@@ -0,0 +1,56 @@
+"""发射速率的加权规则：diff_rate = E^p * f。
+
+规则名（与 ML_train_emission.sh 的 WEIGHT 一致，另支持任意指数）：
+    f          p = 0
+    E, E*r     p = 1
+    E3         p = 3
+    E^p / Ep   任意实数指数，如 E^2.5、E2
+多个规则堆成 (N, W) 权重矩阵，一次核求和得到 W 条谱。
+"""
+import numpy as np
+from emspec.tables import load_table
+
+NAMED = {"f": 0.0, "E": 1.0, "E*r": 1.0, "E*f": 1.0, "Ef": 1.0, "E3": 3.0}
+
+
+def parse_rule(name):
+    name = name.strip()
+    if name in NAMED:
+        return NAMED[name]
+    if name.startswith("E"):
+        try:
+            return float(name[1:].lstrip("^"))
+        except ValueError:
+            pass
+    raise SystemExit(f"[ERROR] 未知加权规则: {name}（可用 f / E / E3 / E^p）")
+
+
+def parse_rules(spec):
+    """'f,E,E3,E^2.5' -> [(名称, 指数), ...]，保持顺序、去重"""
+    out = []
+    for name in spec.split(","):
+        if name.strip() and name.strip() not in [n for n, _ in out]:
+            out.append((name.strip(), parse_rule(name)))
+    return out
+
+
+def load_column(path):
+    """单列预测文件（E2est.dat / f2est.dat）-> (N,)；经二进制缓存，命中时为 mmap"""
+    T = load_table(path)
+    if T.shape[0] < 1 or T.shape[1] == 0:
+        raise SystemExit(f"[ERROR] 未解析到数据: {path}")
+    return T[0]
+
+
+def clamp(x):
+    """负值置 0（对应原 awk '$0<0 ? 0 : $0'）"""
+    return np.clip(x, 0.0, None)
+
+
+def weight_matrix(E, f, exps):
+    """(N, W)：第 k 列为 E^p_k * f"""
+    E = np.asarray(E, dtype=float); f = np.asarray(f, dtype=float)
+    W = np.empty((E.size, len(exps)))
+    for k, p in enumerate(exps):
+        W[:, k] = f if p == 0 else f * E ** p
+    return W
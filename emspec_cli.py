@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+"""统一入口（等价于 python -m emspec）：emspec_cli.py <convolve|ric|metrics|labels|plot|sweep|startup> ..."""
+import sys
+from emspec.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
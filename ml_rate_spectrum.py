@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""ML 预测 E/f -> 速率 -> 发射谱，进程内一步完成，多种加权规则一次核求和。
+
+取代 paste | awk 生成 emission-rate-ML.dat 再由 emission_spectrum.py 读回的流程：
+E/f 列经二进制缓存读入，负值置 0（同原 awk），按规则堆成 (N, W) 权重矩阵，
+在公共网格上一次卷积得到 W 条谱（各自按最大值归一）。
+
+输出（当前目录）：
+  emission_spectrum_eV.dat       --primary 规则的谱（与 emission_spectrum.py 相同格式）
+  emission_spectrum_weights.dat  E 及每个规则一列
+  emission-rate-ML.dat           仅在 --rate-out 时写出（--primary 规则，原 awk 格式）
+  --store 时另追加到谱库：<key>（--primary 规则）与 <key>/weights（每个规则一列）
+"""
+import argparse
+import numpy as np
+from emspec.kernel import METHODS, broaden, parse_mem
+from emspec.weights import clamp, load_column, parse_rule, parse_rules, weight_matrix
+from emspec.speccache import content_hash
+from emspec import runlog, store
+
+def write_rate_table(path, E, R):
+    with np.errstate(divide="ignore"):
+        lam = np.where(E > 1e-12, 1239.84193 / np.where(E > 1e-12, E, 1.0), 0.0)
+    np.savetxt(path, np.column_stack([E, lam, R]), fmt="%8.4f   %10.4E   %12.8E   0.00000",
+               header="DE/eV    lambda/nm    diff_rate        +/-error", comments="")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ML E/f 预测 -> 多加权规则发射谱（单次核求和）")
+    ap.add_argument("E_file", help="能量预测，如 all/E2est.dat（每行一个，eV）")
+    ap.add_argument("f_file", help="振子强度预测，如 all/f2est.dat")
+    ap.add_argument("--weights", default="E3", help="加权规则列表，如 'f,E,E3,E^2.5'")
+    ap.add_argument("--primary", default=None, help="写入 emission_spectrum_eV.dat 的规则（默认列表第一个）")
+    ap.add_argument("--delta", type=float, default=0.06, help="高斯展宽(eV)")
+    ap.add_argument("--eps",   type=float, default=0.002, help="能量步长(eV)")
+    ap.add_argument("--kappa", type=float, default=3.0, help="核截断/边界外扩(×delta)")
+    ap.add_argument("--method", choices=METHODS, default="window", help="卷积方法")
+    ap.add_argument("--max-mem", type=parse_mem, default=None, help="卷积分块内存预算")
+    ap.add_argument("--store", default=None, help="同时追加到二进制谱库（emspec.store）")
+    ap.add_argument("--key", default="ml", help="--store 中的键，如 ml/500（另写 <key>/weights）")
+    ap.add_argument("--n-train", type=int, default=None, help="记入谱库参数的训练规模 N")
+    ap.add_argument("--rate-out", default=None, help="另写出 --primary 规则的速率表（如 emission-rate-ML.dat）")
+    args = ap.parse_args(argv)
+
+    with runlog.stage("read-ef") as rec:
+        E, f = clamp(load_column(args.E_file)), clamp(load_column(args.f_file))
+        rec["rows"] = E.size
+    if E.size != f.size:
+        print(f"[warn] E 行数={E.size} 与 f 行数={f.size} 不一致，按较小者计算。")
+        n = min(E.size, f.size); E, f = E[:n], f[:n]
+
+    rules = parse_rules(args.weights)
+    primary = args.primary or rules[0][0]
+    if primary not in [n for n, _ in rules]:
+        rules.append((primary, parse_rule(primary)))
+    names = [n for n, _ in rules]
+    W = weight_matrix(E, f, [p for _, p in rules])
+
+    with runlog.stage("convolve", method=args.method, rows=E.size, weights=len(names)) as rec:
+        # 单个规则时按 1-D 权重走单列核求和（比多列路径快数倍），结果仍整理成 (Ng, 1)
+        grid, I = broaden(E, W[:, 0] if W.shape[1] == 1 else W, delta=args.delta, eps=args.eps,
+                          kappa=args.kappa, method=args.method, max_mem=args.max_mem)
+        I = I.reshape(grid.size, -1)                                          # (Ng, W)
+        rec["Ng"] = grid.size
+    I = I / np.where(I.max(axis=0) > 0, I.max(axis=0), 1.0)
+
+    k = names.index(primary)
+    np.savetxt("emission_spectrum_eV.dat", np.column_stack([grid, I[:, k]]), fmt="%.6f %.8e")
+    np.savetxt("emission_spectrum_weights.dat", np.column_stack([grid, I]),
+               fmt="%.6f" + " %.8e" * len(names), header="DE/eV  " + "  ".join(names))
+    if args.rate_out:
+        write_rate_table(args.rate_out, E, W[:, k])
+    if args.store:
+        # 输入内容哈希：sweep ml-ric 据此判断库中的谱是否仍对应 train/N 当前的预测
+        params = {"N": args.n_train, "rows": int(E.size), "delta": args.delta, "eps": args.eps,
+                  "kappa": args.kappa, "method": args.method, "norm": True,
+                  "inputs": {p: content_hash(p) for p in (args.E_file, args.f_file)}}
+        store.append_many(args.store, [
+            (args.key, grid, I[:, k], dict(params, weight=primary), None),
+            (f"{args.key}/weights", grid, I, dict(params, weight=",".join(names)), names)])
+    print(f"写出: emission_spectrum_eV.dat ({primary}), emission_spectrum_weights.dat ({', '.join(names)})"
+          + (f", {args.rate_out}" if args.rate_out else "")
+          + (f", {args.store}::{args.key}" if args.store else ""))
+
+if __name__ == "__main__":
+    main()
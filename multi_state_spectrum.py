@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""多个激发态一次出谱：公共网格 + 一次批量核求和，输出各态谱与总谱。
+
+输入可以是状态标签文件 stateN.index.E.f（按 --weight 规则由 E/f 得速率）
+或 emission-rate.dat 格式的速率表（第1列 E，第3列 diff_rate），两者可混用。
+每个态按自身几何数归一；默认整体除以总谱最大值（相对强度保持不变）。
+"""
+import argparse
+import numpy as np
+from emspec.kernel import METHODS, parse_mem
+from emspec.multistate import load_parts, multi_state_spectra
+from emspec.weights import parse_rule
+from emspec import runlog
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="多激发态批量卷积（各态谱 + 总谱写入一个文件）")
+    ap.add_argument("--states", nargs="+", default=[], help="状态标签文件，如 data/state2.index.E.f data/state3.index.E.f")
+    ap.add_argument("--rates", nargs="+", default=[], help="速率表（emission-rate.dat 格式）")
+    ap.add_argument("--weight", default="E3", help="状态标签文件的加权规则：f / E / E3 / E^p")
+    ap.add_argument("--delta", type=float, default=0.06, help="高斯展宽(eV)")
+    ap.add_argument("--eps",   type=float, default=0.002, help="能量步长(eV)")
+    ap.add_argument("--kappa", type=float, default=3.0, help="核截断/边界外扩(×delta)")
+    ap.add_argument("--method", choices=METHODS, default="window", help="卷积方法")
+    ap.add_argument("--oversample", type=int, default=4, help="fft 细网格倍数")
+    ap.add_argument("--max-mem", type=parse_mem, default=None, help="卷积分块内存预算")
+    ap.add_argument("--no-norm", action="store_true", help="不除以总谱最大值")
+    ap.add_argument("--out", default="emission_spectrum_states.dat", help="输出文件：E 总谱 各态")
+    args = ap.parse_args(argv)
+
+    if not args.states and not args.rates:
+        raise SystemExit("[ERROR] 需要至少一个 --states 或 --rates 文件")
+    with runlog.stage("read-states") as rec:
+        labels, parts = load_parts(args.states, args.rates, exp=parse_rule(args.weight))
+        rec["rows"] = sum(E.size for E, _ in parts)
+    with runlog.stage("multi-state", method=args.method, rows=rec["rows"], states=len(parts)) as rec:
+        grid, I = multi_state_spectra(parts, delta=args.delta, eps=args.eps, kappa=args.kappa,
+                                      method=args.method, max_mem=args.max_mem,
+                                      oversample=args.oversample)          # (Ng, S)
+        rec["Ng"] = grid.size
+    total = I.sum(axis=1)
+    if not args.no_norm and total.max() > 0:
+        I = I / total.max(); total = total / total.max()
+
+    np.savetxt(args.out, np.column_stack([grid, total, I]),
+               fmt="%.6f" + " %.8e" * (1 + len(labels)),
+               header="DE/eV  total  " + "  ".join(labels))
+    print(f"写出: {args.out}（{len(labels)} 个态: {', '.join(labels)}，网格 {grid.size} 点）")
+
+if __name__ == "__main__":
+    main()
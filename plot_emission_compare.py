@@ -1,86 +1,177 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import argparse, numpy as np
+"""ML 发射谱 vs 参考谱作图（能量域 + 波长域）。
+
+一次可给多条 ML 谱（文件、谱库记录 STORE::KEY 或通配符如 'train/*/spectrum/emission/emission_spectrum_eV.dat'），
+参考谱只读/卷积一次，所有图在同一进程（或 --jobs 个进程）中画完：
+  --layout single   每条 ML 谱各一对图（只有一条时仍为 compare_eV.png / compare_nm.png）
+  --layout overlay  所有 N 叠在一张图上：compare_overlay_eV.png / compare_overlay_nm.png
+  --layout grid     小多图，每个 N 一格：compare_grid_eV.png / compare_grid_nm.png
+画之前把每条曲线按像素列抽稀：每列只保留最小/最大值点，峰形与线宽在图上不变。
+"""
+import argparse, glob, math, os, re, numpy as np
 import matplotlib
 matplotlib.use("Agg")  # 无图形界面时保存到文件
 import matplotlib.pyplot as plt
+from emspec.tables import load_table
+from emspec.speccache import reference_spectrum
+from emspec import store
 
 def load_spectrum_eV(path, skip_header=False):
-    """读取两列能量域谱: E(eV) I"""
-    arr = np.loadtxt(path, skiprows=1 if skip_header else 0)
-    E, I = arr[:,0], arr[:,1]
-    return E, I
-
-def load_rate_table(path):
-    """读取 emission-rate.dat：第1列E、第3列diff_rate"""
-    arr = np.loadtxt(path, skiprows=1)
-    E, R = arr[:,0], arr[:,2]
-    return E, R
-
-def gaussian_broaden(E_centers, weights, delta, Emin=None, Emax=None, eps=0.002, kappa=3.0):
-    """与你脚本一致的高斯：coeff=1/(delta*sqrt(pi/2)), exp=-2*((x-mu)/delta)^2"""
-    if Emin is None: Emin = E_centers.min() - kappa*delta
-    if Emax is None: Emax = E_centers.max() + kappa*delta
-    grid = np.arange(Emin, Emax + eps/2.0, eps)
-    coeff = 1.0 / (delta * np.sqrt(np.pi/2.0))
-    d = (grid[:,None] - E_centers[None,:]) / delta
-    I = (coeff * np.exp(-2.0 * d**2) @ weights) / max(len(E_centers), 1)
-    return grid, I
+    """读取两列能量域谱: E(eV) I（表头自动跳过，skip_header 仅为兼容保留）；也可为谱库记录 STORE::KEY"""
+    if store.split_spec(path):
+        return store.load(path)
+    T = load_table(path)
+    return T[0], T[1]
 
 def nm_from_e(E):
     with np.errstate(divide='ignore'):
         return 1239.84193 / E
 
-def main():
-    ap = argparse.ArgumentParser(description="对比 ML 发射谱与参考谱（能量/波长域）")
-    ap.add_argument("--ml-ev", required=True, help="ML 能量域谱，例如 train/.../emission_spectrum_eV.dat")
+def decimate(x, y, bins):
+    """按 x 等宽分成 bins 段（约等于像素列数），每段保留最小/最大值点，保持原顺序；点数 <= 2*bins"""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    ok = np.isfinite(x) & np.isfinite(y)
+    x, y = x[ok], y[ok]
+    if x.size <= 2 * bins:
+        return x, y
+    b = np.minimum(((x - x.min()) / (np.ptp(x) or 1.0) * bins).astype(np.intp), bins - 1)
+    o = np.lexsort((y, b))                                   # 段内按 y 升序
+    first = np.r_[True, b[o][1:] != b[o][:-1]]
+    last = np.r_[first[1:], True]
+    keep = np.unique(np.r_[o[first], o[last]])
+    return x[keep], y[keep]
+
+def expand_inputs(specs):
+    """通配符展开（按路径中的 N 排序）；谱库记录与普通文件原样保留"""
+    out = []
+    for s in specs:
+        if not store.split_spec(s) and any(c in s for c in "*?["):
+            hits = glob.glob(s)
+            if not hits:
+                raise SystemExit(f"[ERROR] 没有匹配的谱文件: {s}")
+            out += sorted(hits, key=_n_key)
+        else:
+            out.append(s)
+    return out
+
+def _n_key(path):
+    lab = label_for(path)
+    return (int(lab[2:]), path) if lab.startswith("N=") else (math.inf, path)
+
+def label_for(path):
+    """train/<N>/... 或谱库键 ml/<N> -> 'N=<N>'，否则文件名"""
+    m = re.search(r"(?:^|/)(?:train|ml|td)/(\d+)(?:/|$)", str(path).split(store.SEP)[-1])
+    return f"N={m.group(1)}" if m else os.path.basename(str(path))
+
+def render(task):
+    """画一张图（可在子进程中执行）：task 含 out, xlabel, invert, dpi, size, panels=[(标题, [(标签, x, y, 样式)])]"""
+    panels = task["panels"]
+    ncols = task.get("ncols", 1)
+    nrows = math.ceil(len(panels) / ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=task["size"], sharex=True, sharey=True, squeeze=False)
+    for k, (ax, (title, curves)) in enumerate(zip(axes.flat, panels)):
+        ax.grid(True)
+        for label, x, y, style in curves:
+            ax.plot(x, y, label=label, **style)
+        if title:
+            ax.set_title(title, fontsize="small")
+        if k == 0:                         # 小多图的图例只画在第一格
+            ax.legend(fontsize="small" if len(curves) < 8 else "x-small", ncol=1 if len(curves) < 12 else 2)
+    for ax in axes.flat[len(panels):]:
+        ax.set_visible(False)
+    for j in range(min(ncols, len(panels))):   # 每列最下面的可见子图：末行不满时在上一行
+        ax = axes[(len(panels) - 1 - j) // ncols, j]
+        ax.xaxis.set_tick_params(labelbottom=True)
+        ax.set_xlabel(task["xlabel"])
+    for ax in axes[:, 0]:
+        ax.set_ylabel("Normalized intensity")
+    if task["invert"]:
+        axes[0, 0].invert_xaxis()          # 共享 x 轴，全部反转：红在右、蓝在左
+    fig.tight_layout()
+    fig.savefig(task["out"], dpi=task["dpi"])
+    plt.close(fig)
+    return task["out"]
+
+def build_tasks(ml, ref, layout, outdir, dpi, width):
+    """ml: [(标签, E, I)]，ref: (E, I) -> 待画的图（曲线已按像素抽稀）"""
+    domains = [("eV", "Energy (eV)", lambda E: E, False), ("nm", "Wavelength (nm)", nm_from_e, True)]
+    if layout == "grid":
+        ncols = min(len(ml), max(1, math.ceil(math.sqrt(len(ml)))))
+        nrows = math.ceil(len(ml) / ncols)
+        size = (width, max(3.0, 2.6 * nrows) if nrows > 1 else 6.0)
+    else:
+        ncols, size = 1, (width, 6.0)
+    bins = int(size[0] * dpi / ncols)
+    ref_style = {"color": "black", "lw": 1.8} if layout == "overlay" else {}
+    colors = plt.get_cmap("viridis")(np.linspace(0.0, 0.9, len(ml))) if layout == "overlay" else [None] * len(ml)
+
+    tasks = []
+    for tag, xlabel, conv, invert in domains:
+        R = ("REF", *decimate(conv(ref[0]), ref[1], bins), ref_style)
+        curves = [(lab, *decimate(conv(E), I, bins), {"color": c} if c is not None else {})
+                  for (lab, E, I), c in zip(ml, colors)]
+        base = dict(xlabel=xlabel, invert=invert, dpi=dpi, size=size)
+        if layout == "overlay":
+            tasks.append(dict(base, out=os.path.join(outdir, f"compare_overlay_{tag}.png"),
+                              panels=[(None, curves + [R])]))
+        elif layout == "grid":
+            tasks.append(dict(base, out=os.path.join(outdir, f"compare_grid_{tag}.png"), ncols=ncols,
+                              panels=[(c[0], [(("ML",) + c[1:]), R]) for c in curves]))
+        else:
+            for c in curves:
+                name = "compare" if len(ml) == 1 else "compare_" + re.sub(r"[^\w.=-]+", "_", c[0])
+                tasks.append(dict(base, out=os.path.join(outdir, f"{name}_{tag}.png"),
+                                  panels=[(None, [(("ML",) + c[1:]), (("REF",) + R[1:])])]))
+    return tasks
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="对比 ML 发射谱与参考谱（能量/波长域），可一次画多条")
+    ap.add_argument("--ml-ev", required=True, nargs="+",
+                    help="ML 能量域谱，例如 train/.../emission_spectrum_eV.dat 或 STORE::ml/500；"
+                         "可给多个或通配符 'train/*/spectrum/emission/emission_spectrum_eV.dat'")
+    ap.add_argument("--labels", nargs="+", default=None, help="与 ML 谱一一对应的标签（默认由路径取 N=...）")
     group = ap.add_mutually_exclusive_group(required=True)
-    group.add_argument("--ref-ev", help="参考 能量域谱（两列 E I），如 emission_spectrum_ref_eV.dat")
+    group.add_argument("--ref-ev", help="参考 能量域谱（两列 E I），如 emission_spectrum_ref_eV.dat 或 STORE::ref")
     group.add_argument("--ref-rate", help="参考 emission-rate.dat（第1列E、第3列diff_rate）")
     ap.add_argument("--delta", type=float, default=0.06, help="卷积展宽eV（当 --ref-rate 时生效）")
     ap.add_argument("--eps",   type=float, default=0.002, help="能量步长eV（当 --ref-rate 时生效）")
-    args = ap.parse_args()
+    ap.add_argument("--layout", choices=["single", "overlay", "grid"], default="single",
+                    help="single: 每条一对图；overlay: 全部叠加；grid: 小多图")
+    ap.add_argument("--outdir", default=".", help="图片输出目录")
+    ap.add_argument("--dpi", type=int, default=180, help="分辨率")
+    ap.add_argument("--width", type=float, default=10.0, help="图宽（英寸）；抽稀到 宽×dpi 个像素列")
+    ap.add_argument("--jobs", type=int, default=1, help="并行作图的进程数")
+    args = ap.parse_args(argv)
+
+    files = expand_inputs(args.ml_ev)
+    labels = args.labels or [label_for(p) for p in files]
+    if len(labels) != len(files):
+        raise SystemExit("[ERROR] --labels 数量与 ML 谱数量不一致")
 
     # 读 ML 能量域谱
-    E_ml, I_ml = load_spectrum_eV(args.ml_ev, skip_header=False)
-    I_ml = I_ml / (I_ml.max() if I_ml.max()>0 else 1.0)
+    ml = []
+    for lab, path in zip(labels, files):
+        E_ml, I_ml = load_spectrum_eV(path, skip_header=False)
+        ml.append((lab, E_ml, I_ml / (I_ml.max() if I_ml.max()>0 else 1.0)))
 
-    # 参考谱：直接读 or 从 emission-rate 卷积
+    # 参考谱：直接读 or 从 emission-rate 卷积（只做一次）
     if args.ref_ev:
         E_ref, I_ref = load_spectrum_eV(args.ref_ev, skip_header=False)
     else:
-        E_rate, R_rate = load_rate_table(args.ref_rate)
-        E_ref, I_ref = gaussian_broaden(E_rate, R_rate, delta=args.delta, eps=args.eps)
+        # 参考谱走内容寻址缓存，与 ML-RIC.sh / TD-RIC.sh 共用同一份卷积结果
+        E_ref, I_ref = reference_spectrum(args.ref_rate, delta=args.delta, eps=args.eps)
     I_ref = I_ref / (I_ref.max() if I_ref.max()>0 else 1.0)
 
-    # 画能量域
-    plt.figure(figsize=(10,6))
-    plt.grid(True)
-    plt.xlabel("Energy (eV)")
-    plt.ylabel("Normalized intensity")
-    plt.plot(E_ml,  I_ml,  label="ML")
-    plt.plot(E_ref, I_ref, label="REF")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig("compare_eV.png", dpi=180)
-
-    # 画波长域（各自单独转换）
-    lam_ml  = nm_from_e(E_ml)
-    lam_ref = nm_from_e(E_ref)
-    plt.figure(figsize=(10,6))
-    plt.grid(True)
-    plt.xlabel("Wavelength (nm)")
-    plt.ylabel("Normalized intensity")
-    plt.plot(lam_ml,  I_ml,  label="ML")
-    plt.plot(lam_ref, I_ref, label="REF")
-    # 如需红在右、蓝在左：反转x轴
-    plt.gca().invert_xaxis()
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig("compare_nm.png", dpi=180)
-
-    print("Wrote: compare_eV.png, compare_nm.png")
+    os.makedirs(args.outdir, exist_ok=True)
+    tasks = build_tasks(ml, (E_ref, I_ref), args.layout, args.outdir, args.dpi, args.width)
+    if args.jobs > 1 and len(tasks) > 1:
+        from emspec.parallel import process_pool
+        with process_pool(min(args.jobs, len(tasks)), 1) as pool:
+            outs = list(pool.map(render, tasks))
+    else:
+        outs = [render(t) for t in tasks]
+    print("Wrote: " + ", ".join(os.path.relpath(o) if args.outdir != "." else os.path.basename(o) for o in outs))
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import argparse
+import numpy as np
+from emspec.metrics import KEYS, compare, write_table
+from emspec.tables import load_spectrum
+from emspec import runlog
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="一条参考谱 vs 多条候选谱：批量计算 RIC 及其它指标")
+    ap.add_argument("ref", help="参考谱（两列 E I 或四列，或谱库记录 STORE::KEY）")
+    ap.add_argument("cands", nargs="+", help="候选谱文件（如各 N 的 emission_spectrum_eV.dat，或 STORE::ml/500）")
+    ap.add_argument("--labels", nargs="+", default=None, help="与候选一一对应的标签（如训练规模 N）")
+    ap.add_argument("--eps", type=float, default=None, help="公共网格步长(eV)，默认自动")
+    ap.add_argument("--norm", choices=["none","max","area"], default="none",
+                    help="比较前的归一化（RIC 驱动默认 none：绝对强度对比）")
+    ap.add_argument("--out", default=None, help="每行一个 RIC（按候选顺序）")
+    ap.add_argument("--table", default=None, help="输出全部指标表")
+    args = ap.parse_args(argv)
+
+    labels = args.labels or args.cands
+    if len(labels) != len(args.cands):
+        raise SystemExit("[ERROR] --labels 数量与候选谱数量不一致")
+
+    E_ref, I_ref = load_spectrum(args.ref, trim_zeros=False)
+    cands, ok = [], []
+    for path in args.cands:
+        try:
+            cands.append(load_spectrum(path, trim_zeros=False)); ok.append(True)
+        except (SystemExit, OSError, ValueError):   # 解析失败 / 文件缺失 / 非数值内容
+            print(f"[warn] 无法读取 {path}，记为 nan")
+            ok.append(False)
+
+    res = {k: np.full(len(ok), np.nan) for k in KEYS}
+    if cands:
+        with runlog.stage("ric", rows=E_ref.size, spectra=len(cands)):
+            sub = compare(E_ref, I_ref, cands, eps=args.eps, norm=args.norm)
+        for k in KEYS:
+            res[k][np.array(ok)] = sub[k]
+
+    ric = res["Rel_change"]
+    if args.out:
+        with open(args.out, "w") as fo:
+            for v in ric:
+                fo.write("nan\n" if np.isnan(v) else f"{v:.6e}\n")
+    if args.table:
+        write_table(args.table, labels, res)
+    for lab, v in zip(labels, ric):
+        print(f"[OK] N={lab} -> RIC={v:.6e}")
+
+if __name__ == "__main__":
+    main()
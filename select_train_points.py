@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""主动学习选点：按对 ML 谱的边际影响给未标注几何排序，写出扩展后的 itrain。
+
+委员会为两组以上 (E, f) 全体几何预测，例如相邻训练规模的模型：
+    --models train/500 train/1000   读 <dir>/all.ML.orig.data/E<state>est.dat、f<state>est.dat
+    --pred E.dat f.dat              直接给出预测文件（可重复）
+几何 i（预测文件第 i 行，1-based，与 itrain 索引一致）的得分为各模型下其核贡献的分歧
+占平均谱面积的比例（emspec.active），两模型谱之间的 RIC 不超过全部得分之和。
+
+输出：
+  --out     itrain 的前 n_train 个（已标注）+ 得分最高的 --add 个新几何；--keep-rest 时再接上
+            原 itrain 中其余未选中的索引，使更大的训练规模仍可用 head -n 取
+  --scores  全部候选的 排名 索引 得分 累计份额
+"""
+import argparse
+import numpy as np
+from emspec.active import rank, spectral_impact
+from emspec.kernel import broaden, parse_mem
+from emspec.labels import load_indices, train_mask
+from emspec.metrics import compare
+from emspec.tables import load_spectrum
+from emspec.weights import clamp, load_column, parse_rule
+from emspec import runlog
+
+def read_committee(pairs, rule):
+    """[(E 文件, f 文件), ...] -> E, R (N, M)；行数不一致时按最短截断"""
+    cols = [(clamp(load_column(e)), clamp(load_column(f))) for e, f in pairs]
+    n = min(min(E.size, f.size) for E, f in cols)
+    if any(E.size != n or f.size != n for E, f in cols):
+        print(f"[warn] 各预测文件行数不一致，按最短的 {n} 行计算。")
+    p = parse_rule(rule)
+    E = np.column_stack([E[:n] for E, _ in cols])
+    f = np.column_stack([f[:n] for _, f in cols])
+    return E, f * E ** p
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="按谱影响（委员会核贡献分歧）排序未标注几何，扩展 itrain")
+    ap.add_argument("--models", nargs="+", default=[], help="训练目录，如 train/500 train/1000")
+    ap.add_argument("--pred", nargs=2, action="append", default=[], metavar=("E_FILE", "F_FILE"),
+                    help="一组全体几何的 E/f 预测（可重复）")
+    ap.add_argument("--state", default="2", help="--models 的激发态编号（E<state>est.dat）")
+    ap.add_argument("--weight", default="E3", help="速率加权规则 f / E / E3 / E^p")
+    ap.add_argument("--itrain", default="data/itrain.dat", help="现有训练索引（按使用顺序）")
+    ap.add_argument("--n-train", type=int, default=None, help="已标注的个数（itrain 前 n 个，默认全部）")
+    ap.add_argument("--add", type=int, default=100, help="新增几何数")
+    ap.add_argument("--keep-rest", action="store_true", help="新增几何之后接上原 itrain 中其余索引")
+    ap.add_argument("--delta", type=float, default=0.06, help="高斯展宽(eV)")
+    ap.add_argument("--kappa", type=float, default=3.0, help="核截断(×delta)")
+    ap.add_argument("--max-mem", type=parse_mem, default=None, help="分块内存预算（默认 256M）")
+    ap.add_argument("--ref", default=None, help="参考谱；给出时报告各模型谱相对它的 RIC")
+    ap.add_argument("--out", default="itrain.next.dat", help="扩展后的 itrain")
+    ap.add_argument("--scores", default="active_scores.dat", help="候选得分表")
+    args = ap.parse_args(argv)
+
+    pairs = [(f"{d}/all.ML.orig.data/E{args.state}est.dat", f"{d}/all.ML.orig.data/f{args.state}est.dat")
+             for d in args.models] + [tuple(p) for p in args.pred]
+    if len(pairs) < 2:
+        raise SystemExit("[ERROR] 至少需要两组预测（--models / --pred）")
+    with runlog.stage("read-committee", models=len(pairs)) as rec:
+        E, R = read_committee(pairs, args.weight)
+        rec["rows"] = E.shape[0]
+    N = E.shape[0]
+    itrain = load_indices(args.itrain)
+    labelled = itrain[:args.n_train] if args.n_train is not None else itrain
+    mask = train_mask(labelled, N)
+
+    with runlog.stage("impact", rows=N, models=len(pairs)):
+        s = spectral_impact(E, R, args.delta, kappa=args.kappa, max_mem=args.max_mem)
+    order = rank(s, mask)
+    picks = order[:args.add] + 1
+    share = np.cumsum(s[order]) / max(s[order].sum(), 1e-300)
+
+    rest = np.empty(0, dtype=np.int64)
+    if args.keep_rest:
+        rest = itrain[labelled.size:][~np.isin(itrain[labelled.size:], picks)]
+    np.savetxt(args.out, np.concatenate([labelled, picks, rest]), fmt="%d")
+    np.savetxt(args.scores, np.column_stack([np.arange(1, order.size + 1), order + 1, s[order], share]),
+               fmt="%d %d %.6e %.6f", header="rank  index  score  cum_share")
+
+    print(f"委员会 {len(pairs)} 组预测，{N} 个几何，已标注 {int(mask.sum())}，候选 {order.size}")
+    print(f"谱分歧上界 sum(score) = {s.sum():.4e}（未标注部分 {s[order].sum():.4e}）；"
+          f"新增 {picks.size} 个覆盖未标注分歧的 {share[picks.size - 1] if picks.size else 0.0:.1%}")
+    if args.ref:
+        E_ref, I_ref = load_spectrum(args.ref, trim_zeros=False)
+        cands = [broaden(E[:, m], R[:, m], delta=args.delta, kappa=args.kappa, max_mem=args.max_mem)
+                 for m in range(E.shape[1])]
+        ric = compare(E_ref, I_ref, cands, norm="max")["Rel_change"]
+        for (e, _), v in zip(pairs, ric):
+            print(f"  RIC vs ref: {e} -> {v:.6e}")
+    print(f"写出: {args.out}, {args.scores}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""训练规模并行扫描：各 N 的 train/N 互不依赖，用有界进程池同时处理。
+
+  train   每个 N 跑一次 ML_train_one.sh（训练 E/f → 混合 → 速率表 → 出谱）
+  ml-ric  各 N 的 ML 谱：train/N/manifest.json 中仍然有效且 δ/ε 相同的直接用，否则并行另算一份
+          emission_spectrum_ric_eV.dat（不覆盖训练阶段的输出），再一次性批量计算 RIC → ML-RIC.result
+  td-ric  TD 子集学习曲线（td_ric_curve.py），前缀段并行卷积 → TD-RIC.result
+
+子进程的 OMP/OpenBLAS/MKL 线程数固定为 --threads（默认 核数/jobs），
+结果一律按 train_nums 顺序汇总，与完成先后无关。
+多个阶段可在一次调用中依次执行（如 ml-ric td-ric），共用一个解释器。
+--store 时各阶段的谱同时进入一个二进制谱库（emspec.store）：train 写 ml/<N>，
+td-ric 写 td/<N> 与 ref，ml-ric 写 ref 并直接从库中读取仍然有效的 ml/<N>。
+"""
+import argparse, os, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from emspec import runlog
+from emspec.kernel import METHODS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def read_nums(path):
+    with open(path) as f:
+        return [int(t) for t in f.read().split()]
+
+def run_train(args, nums, threads):
+    from emspec.parallel import pinned_env
+    env = pinned_env(threads)
+    one = os.path.join(HERE, "ML_train_one.sh")
+
+    def job(n):
+        wd = os.path.join(args.root, "train", str(n))
+        os.makedirs(wd, exist_ok=True)
+        # 开启 profiling 时每个 N 写自己的 train/N/profile.jsonl（各子进程阶段 + 整体墙钟）
+        prof = os.path.join(wd, "profile.jsonl") if runlog.enabled() else None
+        jenv = dict(env, EMSPEC_PROFILE=prof, EMSPEC_RUN_N=str(n)) if prof else dict(env)
+        if args.store:
+            jenv["STORE"] = args.store
+        t0 = time.perf_counter()
+        with open(os.path.join(wd, "sweep.log"), "w") as log:
+            rc = subprocess.run(["bash", one, str(n)], cwd=args.root, env=jenv,
+                                stdout=log, stderr=subprocess.STDOUT).returncode
+        if prof:
+            runlog.record("train", time.perf_counter() - t0, path=prof, N=n, returncode=rc)
+        return rc
+
+    # 每个任务本身就是独立子进程，线程池只负责限流
+    with ThreadPoolExecutor(max_workers=args.jobs) as ex:
+        futs = {n: ex.submit(job, n) for n in nums}
+    failed = []
+    for n in nums:
+        rc = futs[n].result()
+        if rc == 0:
+            print(f"[OK] train_set={n} -> spectrum/emission/emission_spectrum_eV.dat")
+        else:
+            print(f"[ERROR] train_set={n} 退出码 {rc}，见 train/{n}/sweep.log")
+            failed.append(n)
+    return 1 if failed else 0
+
+def _same_params(rec, delta, eps, kappa, method):
+    """spectrum 阶段记录的 DELTA/EPS/KAPPA/METHOD 与本次相同（未记录的 KAPPA/METHOD 按
+    ml_rate_spectrum.py 的默认值 3.0/window 比较）"""
+    p = rec["params"]
+    try:
+        return (float(p["DELTA"]) == delta and float(p["EPS"]) == eps
+                and float(p.get("KAPPA", 3.0)) == kappa and p.get("METHOD", "window") == method)
+    except (KeyError, ValueError):
+        return False
+
+RIC_SPECTRUM = "emission_spectrum_ric_eV.dat"
+
+def _ml_spectrum(workdir, delta, eps, kappa=3.0, method="window"):
+    """ML eV 谱；返回路径或 None。
+    train/N 清单中 spectrum 阶段仍然有效且 δ/ε/κ/方法都相同时直接用 emission_spectrum_eV.dat；
+    否则在同目录另写 emission_spectrum_ric_eV.dat（本函数自己的 ml-ric-spectrum 阶段），
+    由 spectrum 阶段记录的输入（all/E,f 预测）与 WEIGHT 按本次的 δ/ε/κ/方法重新卷积，
+    不改动 spectrum 阶段的输出。没有清单的旧目录退回 emission-rate-ML.dat（能量已按 %8.4f 舍入）。"""
+    import numpy as np
+    from emission_spectrum import emit_spectrum
+    from emspec import manifest
+    from emspec.tables import read_emission_table
+    from emspec.weights import clamp, load_column, parse_rule, weight_matrix
+    tdir = os.path.dirname(os.path.dirname(workdir))            # train/N
+    out = os.path.join(workdir, "emission_spectrum_eV.dat")
+    rec = manifest.verified(tdir, "spectrum")
+    if rec and _same_params(rec, delta, eps, kappa, method) and os.path.isfile(out):
+        return out
+    ric = os.path.join(workdir, RIC_SPECTRUM)
+    rec = manifest.load(tdir)["stages"].get("spectrum")
+    if rec:
+        inputs = [os.path.join(tdir, p) for p in rec["inputs"]]          # all/E*est.dat, all/f*est.dat
+        params = {"DELTA": delta, "EPS": eps, "KAPPA": kappa, "METHOD": method,
+                  "WEIGHT": rec["params"].get("WEIGHT", "E3")}
+        if not all(os.path.isfile(p) for p in inputs):
+            return out if os.path.isfile(out) else None
+    else:
+        rate = os.path.join(workdir, "emission-rate-ML.dat")
+        if not os.path.isfile(rate):
+            return out if os.path.isfile(out) else None         # 无速率表：只能沿用已有谱
+        inputs, params = [rate], {"DELTA": delta, "EPS": eps, "KAPPA": kappa, "METHOD": method}
+    stage = dict(inputs=inputs, params=params, outputs=[ric])
+    if manifest.fresh(tdir, "ml-ric-spectrum", **stage):
+        return ric
+    if rec:
+        E_file, f_file = sorted(inputs, key=lambda p: os.path.basename(p)[0] != "E")
+        E = clamp(load_column(E_file))
+        f = clamp(load_column(f_file))
+        n = min(E.size, f.size)
+        E, R = E[:n], weight_matrix(E[:n], f[:n], [parse_rule(params["WEIGHT"])])[:, 0]
+    else:
+        E, R = read_emission_table(rate)
+    grid, I = emit_spectrum(E, R, delta=delta, eps=eps, kappa=kappa, method=method)
+    np.savetxt(ric, np.column_stack([grid, I]), fmt="%.6f %.8e")
+    manifest.record(tdir, "ml-ric-spectrum", **stage)
+    return ric
+
+def _stored_ml(args, n):
+    """谱库中仍然有效的 ml/<N> 记录路径或 None：δ/ε/κ/方法相同，且输入与 train/N 清单中
+    spectrum 阶段当前（已核对）的输入内容哈希一致"""
+    from emspec import manifest, store
+    rec = store.index(args.store).get(f"ml/{n}")
+    if rec is None:
+        return None
+    man = manifest.verified(os.path.join(args.root, "train", str(n)), "spectrum")
+    p = rec["params"]
+    if (man and p.get("delta") == args.delta and p.get("eps") == args.eps
+            and p.get("kappa", 3.0) == args.kappa and p.get("method", "window") == args.method
+            and sorted(man["inputs"].values()) == sorted(p.get("inputs", {}).values())):
+        return f"{args.store}{store.SEP}ml/{n}"
+    return None
+
+def run_ml_ric(args, nums, threads):
+    import numpy as np
+    from emspec.metrics import KEYS, compare, write_table
+    from emspec.parallel import process_pool
+    from emspec.speccache import reference_spectrum
+    from emspec.tables import load_spectrum
+
+    grid, I = reference_spectrum(os.path.join(args.root, "data", "emission-rate.dat"),
+                                 delta=args.delta, eps=args.eps, kappa=args.kappa, method=args.method)
+    I = I / (I.max() if I.max() > 0 else 1.0)
+    ref = os.path.join(args.root, "emission_spectrum_ref_eV.dat")
+    np.savetxt(ref, np.column_stack([grid, I]), fmt="%.6f %.8e")
+    stored = {}
+    if args.store:
+        from emspec import store
+        store.append(args.store, "ref", grid, I, params={
+            "source": os.path.join(args.root, "data", "emission-rate.dat"),
+            "delta": args.delta, "eps": args.eps, "kappa": args.kappa, "method": args.method, "norm": True})
+        stored = {n: p for n in nums if (p := _stored_ml(args, n))}
+
+    dirs = {n: os.path.join(args.root, "train", str(n), "spectrum", "emission") for n in nums}
+    todo = [n for n in nums if os.path.isdir(dirs[n]) and n not in stored]
+    for n in nums:
+        if n not in todo and n not in stored:
+            print(f"[WARN] skip N={n}: {dirs[n]} not found")
+    if args.jobs > 1:
+        with process_pool(args.jobs, threads) as pool:
+            futs = {n: pool.submit(_ml_spectrum, dirs[n], args.delta, args.eps, args.kappa, args.method) for n in todo}
+            paths = {n: futs[n].result() for n in todo}
+    else:  # 单任务时在本进程内完成，不再启动解释器
+        paths = {n: _ml_spectrum(dirs[n], args.delta, args.eps, args.kappa, args.method) for n in todo}
+
+    paths.update(stored)
+    found = [n for n in nums if paths.get(n)]
+    for n in todo:
+        if not paths[n]:
+            print(f"[WARN] N={n}: no emission_spectrum_eV.dat nor emission-rate-ML.dat")
+    with open(os.path.join(args.root, "ML-RIC.result"), "w") as fo:
+        if not found:
+            return 0
+        res = compare(grid, I, [load_spectrum(paths[n], trim_zeros=False) for n in found])
+        for n, v in zip(found, res["Rel_change"]):
+            fo.write("nan\n" if np.isnan(v) else f"{v:.6e}\n")
+            print(f"[OK] N={n} -> RIC={v:.6e}")
+    write_table(os.path.join(args.root, "ML-RIC.metrics"), found, res, keys=KEYS)
+    return 0
+
+def run_td_ric(args, nums, threads):
+    import td_ric_curve
+    root = args.root
+    td_ric_curve.main([
+        os.path.join(root, "data", "emission-rate.dat"), os.path.join(root, "data", "itrain.dat"),
+        "--nums", args.nums, "--delta", str(args.delta), "--eps", str(args.eps),
+        "--kappa", str(args.kappa), "--method", args.method,
+        "--ref", os.path.join(root, "emission_spectrum_ref_eV.dat"),
+        "--out", os.path.join(root, "TD-RIC.result"),
+        "--save-pattern", os.path.join(root, "train", "{N}", "spectrum", "emission",
+                                       "emission_spectrum_ref_{N}_eV.dat"),
+        "--jobs", str(args.jobs), "--threads", str(threads),
+    ] + (["--store", args.store] if args.store else []) + (["--every", str(args.every), "--curve", os.path.join(root, "TD-RIC.curve")]
+         if args.every > 0 else []))
+    return 0
+
+STAGES = {"train": run_train, "ml-ric": run_ml_ric, "td-ric": run_td_ric}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="训练规模并行扫描（有界进程池）")
+    ap.add_argument("stage", nargs="+", choices=list(STAGES),
+                    help="可给多个，按顺序在同一进程内执行，如 'ml-ric td-ric'")
+    ap.add_argument("--root", default=".", help="工程根目录（含 data/ train/ train_nums）")
+    ap.add_argument("--nums", default=None, help="训练规模列表，默认 <root>/train_nums")
+    ap.add_argument("--jobs", type=int, default=1, help="同时处理的训练规模/任务数")
+    ap.add_argument("--threads", type=int, default=None, help="每个子进程的 BLAS/OpenMP 线程数")
+    ap.add_argument("--delta", type=float, default=0.06, help="高斯展宽(eV)")
+    ap.add_argument("--eps",   type=float, default=0.002, help="能量步长(eV)")
+    ap.add_argument("--kappa", type=float, default=3.0, help="参考谱的核截断/边界外扩(×delta)")
+    ap.add_argument("--method", choices=METHODS, default="window", help="参考谱/TD 子集谱的卷积方法")
+    ap.add_argument("--store", default=None, help="二进制谱库目录（如 spectra.store），见模块说明")
+    ap.add_argument("--every", type=int, default=0, help="td-ric: 另外每隔 k 个几何输出一次 RIC")
+    args = ap.parse_args(argv)
+
+    args.root = os.path.abspath(args.root)
+    args.store = args.store and os.path.abspath(args.store)
+    args.nums = args.nums or os.path.join(args.root, "train_nums")
+    args.jobs = max(args.jobs, 1)
+    from emspec.parallel import default_threads
+    threads = args.threads or default_threads(args.jobs)
+    nums = read_nums(args.nums)
+    for name in args.stage:
+        with runlog.stage(f"sweep:{name}", jobs=args.jobs, threads=threads) as rec:
+            rc = rec["returncode"] = STAGES[name](args, nums, threads)
+        if rc:
+            return rc
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""TD 子集学习曲线：一次读入速率表和 itrain，一次卷积算出所有 N 的 RIC。
+
+子集 N = itrain.dat 前 N 个索引（与 training_set_generator.sh 的 head -n 一致），
+谱在全参考网格上增量累加；RIC 只在子集自身网格范围 [min E - kappa*delta,
+max E + kappa*delta] 内积分，与 TD-RIC.sh 原先按子集网格取点的做法一致。
+"""
+import argparse, os
+import numpy as np
+from emspec.kernel import METHODS, make_grid, parse_mem
+from emspec.speccache import reference_spectrum
+from emspec.tables import read_emission_table
+from emspec.labels import load_indices
+from emspec.curve import first_occurrence, prefix_ranges, prefix_spectra
+from emspec.metrics import KEYS, align, batch_metrics
+from emspec.parallel import process_pool
+from emspec import runlog, store
+
+def load_nums(path):
+    with open(path) as f:
+        return [int(t) for t in f.read().split()]
+
+def norm_max(I):
+    m = I.max()
+    return I / m if m > 0 else I
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="TD 子集 RIC 学习曲线（单进程增量卷积）")
+    ap.add_argument("rate", help="全量 emission-rate.dat")
+    ap.add_argument("itrain", help="训练索引（1-based，对应速率表数据行）")
+    ap.add_argument("--nums", default="train_nums", help="训练规模列表文件（默认 train_nums）")
+    ap.add_argument("--every", type=int, default=0, help="另外每隔 k 个几何评估一次，得到稠密收敛曲线")
+    ap.add_argument("--delta", type=float, default=0.06, help="高斯展宽(eV)")
+    ap.add_argument("--eps",   type=float, default=0.002, help="能量步长(eV)")
+    ap.add_argument("--kappa", type=float, default=3.0, help="核截断/边界外扩(×delta)")
+    ap.add_argument("--method", choices=METHODS, default="window", help="卷积方法")
+    ap.add_argument("--max-mem", type=parse_mem, default=None, help="卷积分块内存预算")
+    ap.add_argument("--ref", default=None,
+                    help="同时把全参考谱（两列）写到此路径；参考谱本身取自谱缓存")
+    ap.add_argument("--out", default="TD-RIC.result", help="按 --nums 顺序每行一个 RIC")
+    ap.add_argument("--curve", default=None, help="输出曲线表: N RIC [其它指标]")
+    ap.add_argument("--metrics", action="store_true", help="曲线表附带全部差异指标（emspec.metrics.KEYS）")
+    ap.add_argument("--save-pattern", default=None,
+                    help="保存各 N 的两列谱，如 'train/{N}/spectrum/emission/emission_spectrum_ref_{N}_eV.dat'")
+    ap.add_argument("--store", default=None,
+                    help="把各 N 的子集谱（键 td/<N>）和全参考谱（键 ref）一次性追加到二进制谱库")
+    ap.add_argument("--jobs", type=int, default=1, help="各前缀段并行卷积的进程数")
+    ap.add_argument("--threads", type=int, default=None, help="每个进程的 BLAS 线程数（默认 核数/jobs）")
+    args = ap.parse_args(argv)
+
+    E, R = read_emission_table(args.rate)
+    E, R = np.asarray(E), np.asarray(R)
+    itrain = first_occurrence(load_indices(args.itrain))
+    bad = (itrain < 1) | (itrain > E.size)
+    if bad.any():
+        print(f"[warn] {int(bad.sum())} 个 itrain 索引超出速率表行数 {E.size}，已忽略。")
+        itrain = itrain[~bad]
+    order = itrain - 1
+    nums = load_nums(args.nums)
+    grid = make_grid(E, args.delta, args.eps, kappa=args.kappa)
+
+    n_train = order.size
+    ns = {min(n, n_train) for n in nums if n > 0}
+    if args.every > 0:
+        ns.update(range(args.every, n_train + 1, args.every))
+
+    # 全参考谱走内容寻址缓存；网格与 make_grid(E) 相同
+    with runlog.stage("td-reference", method=args.method, rows=E.size, Ng=grid.size):
+        _, ref = reference_spectrum(args.rate, delta=args.delta, eps=args.eps, kappa=args.kappa,
+                                    method=args.method, max_mem=args.max_mem)
+    ref = norm_max(ref)
+    if args.ref:
+        np.savetxt(args.ref, np.column_stack([grid, ref]), fmt="%.6f %.8e")
+    lo, hi = prefix_ranges(E, order)
+    pad = args.kappa * args.delta
+    keep = {min(n, n_train) for n in nums} if (args.save_pattern or args.store) else set()
+
+    # 各 N 的谱按块收集后一次性批量计算指标（emspec.metrics），候选范围即子集自身网格范围
+    rows, spectra, batch = {}, {}, []
+    def flush():
+        if not batch: return
+        _, A, B, mask = align(grid, ref, [(grid[m], I[m]) for _, I, m in batch], grid=grid)
+        res = batch_metrics(grid, A, B, mask)
+        for k, (n, _, _) in enumerate(batch):
+            rows[n] = [res["Rel_change"][k]] + ([res[key][k] for key in KEYS] if args.metrics else [])
+        batch.clear()
+
+    pool = process_pool(args.jobs, args.threads) if args.jobs > 1 else None
+    with runlog.stage("td-ric", method=args.method, rows=n_train, Ng=grid.size, spectra=len(ns)):
+        for n, I in prefix_spectra(E, R, order, ns, grid, args.delta, kappa=args.kappa,
+                                   method=args.method, max_mem=args.max_mem, executor=pool):
+            I = norm_max(I)
+            m = (grid >= lo[n-1] - pad) & (grid <= hi[n-1] + pad)
+            batch.append((n, I, m))
+            if n in keep:
+                spectra[n] = I
+            if len(batch) >= 256:
+                flush()
+        flush()
+    if pool is not None:
+        pool.shutdown()
+
+    with open(args.out, "w") as fo:
+        for n in nums:
+            ric = rows[min(n, n_train)][0] if n > 0 else float("nan")
+            fo.write("nan\n" if np.isnan(ric) else f"{ric:.6e}\n")
+            print(f"[OK] N={n} -> RIC={ric:.6e}")
+
+    if args.curve:
+        cols = ["N", "RIC"] + (KEYS if args.metrics else [])
+        np.savetxt(args.curve, np.array([[n] + rows[n] for n in sorted(rows)]),
+                   fmt=["%d"] + ["%.6e"] * (len(cols) - 1), header="  ".join(cols))
+
+    if args.store:
+        params = {"source": args.rate, "delta": args.delta, "eps": args.eps, "kappa": args.kappa,
+                  "method": args.method, "norm": True}
+        store.append_many(args.store, [("ref", grid, ref, dict(params, rows=int(E.size)), None)]
+                          + [(f"td/{n}", grid, spectra[min(n, n_train)], dict(params, N=n), None)
+                             for n in nums if n > 0])
+
+    if args.save_pattern:
+        for n in (n for n in nums if n > 0):
+            path = args.save_pattern.format(N=n)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            np.savetxt(path, np.column_stack([grid, spectra[min(n, n_train)]]), fmt="%.6f %.8e")
+
+if __name__ == "__main__":
+    main()
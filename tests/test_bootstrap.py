@@ -0,0 +1,19 @@
+import numpy as np
+from emspec import bootstrap
+
+
+def test_multinomial_counts():
+    C = bootstrap.multinomial_counts(500, 40, np.random.default_rng(0))
+    assert C.shape == (500, 40)
+    assert np.all(C.sum(axis=0) == 500)
+    assert np.all(C >= 0) and np.all(C == np.round(C))
+    assert abs(C.mean() - 1.0) < 1e-12 and 0.8 < C.var() < 1.2      # Multinomial(N, 1/N): 方差 ≈ 1
+
+
+def test_basic_interval_contains_point_at_boundary():
+    reps = np.random.default_rng(1).uniform(0.95, 0.98, 200)     # 相似度指标：重采样总是偏低
+    point = 1.0
+    lo, hi = bootstrap.percentile_band(reps)
+    assert not lo <= point <= hi
+    lo, hi = bootstrap.basic_interval(point, reps, bounds=(0.0, 1.0))
+    assert lo <= point <= hi
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from emspec import deltascan
+
+
+def test_parse_deltas_sorted():
+    np.testing.assert_allclose(deltascan.parse_deltas("0.06,0.02,0.04"), [0.02, 0.04, 0.06])
+
+
+def test_select_noise_unsorted():
+    deltas = np.array([0.06, 0.02, 0.04])
+    res = {"noise": np.array([0.01, 0.20, 0.03])}
+    assert deltascan.select(deltas, res, "noise", noise_tol=0.05) == 0.04
+    assert deltascan.select(deltas, res, "noise", noise_tol=0.001) == 0.06
+
+
+def test_scan_select_noise_order_independent():
+    rng = np.random.default_rng(1)
+    E = rng.normal(2.5, 0.1, 4000)
+    R = np.ones_like(E)
+    picks = []
+    for spec in ("0.02,0.04,0.06", "0.06,0.02,0.04"):
+        d = deltascan.parse_deltas(spec)
+        picks.append(deltascan.select(d, deltascan.scan(E, R, d), "noise", noise_tol=0.2))
+    assert picks[0] == picks[1]
+
+
+@pytest.mark.parametrize("spec", ["0.1:0.01:0.01", "0.05:0.05:0", "0.02:0.06:-0.01", "0,0.02",
+                                  "-0.02,0.04", "", " , ", "0.02:0.06", "a,b"])
+def test_parse_deltas_rejects_bad_specs(spec):
+    with pytest.raises(SystemExit, match=r"\[ERROR\]"):
+        deltascan.parse_deltas(spec)
+
+
+def test_parse_deltas_range():
+    d = deltascan.parse_deltas("0.02:0.06:0.02")
+    np.testing.assert_allclose(d, [0.02, 0.04, 0.06])
+    assert np.all(np.diff(d) > 0)
+    np.testing.assert_allclose(deltascan.parse_deltas("0.05:0.05:0.01"), [0.05])
@@ -0,0 +1,45 @@
+import threading
+import numpy as np
+from emspec import kernel
+
+
+def test_threads_bit_identical():
+    rng = np.random.default_rng(0)
+    E = rng.normal(2.5, 0.3, 20000)
+    R = rng.gamma(2.0, 0.05, 20000)
+    _, base = kernel.broaden(E, R, delta=0.06, max_mem=1 << 20)
+    for T in (2, 3, 5):
+        _, I = kernel.broaden(E, R, delta=0.06, max_mem=1 << 20, threads=T)
+        assert np.array_equal(I, base)
+
+
+class _Acc:
+    """记录累加顺序，并统计已算完但尚未累加的块数"""
+    def __init__(self, n, state, lock):
+        self.a, self.state, self.lock, self.order = np.zeros(n), state, lock, []
+
+    def __getitem__(self, sl):
+        return self.a[sl]
+
+    def __setitem__(self, sl, v):
+        with self.lock:
+            self.state["live"] -= 1
+        self.order.append(sl.start)
+        self.a[sl] = v
+
+
+def test_ordered_add_bounds_work_in_flight():
+    lock = threading.Lock()
+    state = {"live": 0, "peak": 0}
+
+    def part(k):
+        with lock:
+            state["live"] += 1
+            state["peak"] = max(state["peak"], state["live"])
+        return slice(k % 4, k % 4 + 1), np.array([float(k)])
+
+    acc = _Acc(4, state, lock)
+    kernel._ordered_add(acc, part, range(200), threads=3)
+    assert state["peak"] <= 2 * 3
+    assert acc.order == [k % 4 for k in range(200)]
+    np.testing.assert_array_equal(acc.a, [sum(range(j, 200, 4)) for j in range(4)])
@@ -0,0 +1,65 @@
+import importlib
+
+import pytest
+
+train_labels = importlib.import_module("train_labels")
+mix_labels = importlib.import_module("mix_labels")
+
+
+def legacy_mix(state_file, pred_file, out, itrain, n_train, target, N=None):
+    """最初 mix_labels.py 的逐行实现（原样移植），作为逐字节对照"""
+    idx = []
+    with open(itrain) as f:
+        for line in f:
+            s = line.strip()
+            if s:
+                idx.append(int(s))
+    train_idx = set(idx[:n_train])
+    col = 1 if target.lower().startswith("e") else 2
+    truth_map = {}
+    with open(state_file) as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) < 3:
+                continue
+            try:
+                truth_map[int(parts[0])] = parts[col]
+            except ValueError:
+                continue
+    with open(pred_file) as f:
+        ml_data = [ln.strip() for ln in f if ln.strip()]
+    N = min(N, len(ml_data)) if N is not None else len(ml_data)
+    with open(out, "w") as fo:
+        for i in range(1, N + 1):
+            if i in train_idx and i in truth_map:
+                fo.write(str(truth_map[i]) + "\n")
+            else:
+                fo.write(ml_data[i - 1] + "\n")
+
+
+@pytest.fixture
+def fixture(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("EMSPEC_CACHE", "0")
+    # 表头、缺失真值（7）、原文精度、负值；itrain 有重复和越界索引
+    (tmp_path / "state2.index.E.f").write_text(
+        "index E f\n1 2.1000 0.0123\n2 2.25 -0.001\n3 1.9999999 1e-3\n"
+        "4 2.0 0.5\n\n5 2.3100 0.0000\n6 -0.1 0.02\n8 2.40 0.031\n")
+    (tmp_path / "itrain.dat").write_text("3\n7\n1\n\n3\n12\n6\n8\n")
+    (tmp_path / "predE.dat").write_text("".join(f"{2 + 0.01 * i:.4f}\n" for i in range(1, 10)) + "\n")
+    (tmp_path / "predf.dat").write_text("".join(f"{0.001 * i - 0.002:.5f}\n" for i in range(1, 10)))
+    return tmp_path
+
+
+@pytest.mark.parametrize("n_train,N", [(5, None), (3, None), (6, 7), (6, 20)])
+def test_train_labels_mix_matches_legacy(fixture, n_train, N):
+    extra = [] if N is None else ["--N", str(N)]
+    train_labels.main(["state2.index.E.f", "itrain.dat", "--n_train", str(n_train),
+                       "--mix", "{t}2.dat", "--pred-E", "predE.dat", "--pred-f", "predf.dat"] + extra)
+    for t in ("E", "f"):
+        legacy_mix("state2.index.E.f", f"pred{t}.dat", f"legacy.{t}.dat", "itrain.dat", n_train, t, N)
+        mix_labels.main(["state2.index.E.f", f"pred{t}.dat", f"mix.{t}.dat", "--itrain", "itrain.dat",
+                         "--n_train", str(n_train), "--target", t] + extra)
+        want = (fixture / f"legacy.{t}.dat").read_bytes()
+        assert (fixture / f"{t}2.dat").read_bytes() == want
+        assert (fixture / f"mix.{t}.dat").read_bytes() == want
@@ -0,0 +1,28 @@
+import numpy as np
+from emspec import metrics
+
+
+def test_rounded_fine_grid_is_uniform():
+    for eps in (1.23456e-4, 3.33333e-5, 2e-3):
+        E = np.round(1.2345674 + eps * np.arange(5000), 6)     # 与 %.6f 文本输出相同的舍入
+        assert metrics.is_uniform(E)
+
+
+def test_nonuniform_grid_detected():
+    E = np.concatenate([np.arange(0, 1, 1e-3), 1 + np.arange(0, 1, 4e-3)])
+    assert not metrics.is_uniform(E)
+
+
+def test_disparity_emission_uses_batch_metrics(tmp_path, monkeypatch, capsys):
+    import disparity_emission
+    monkeypatch.chdir(tmp_path)
+    g1 = np.arange(1.5, 4.0, 0.002)
+    g2 = np.arange(1.6013, 4.2, 0.0017)
+    np.savetxt("a.dat", np.column_stack([g1, np.exp(-((g1 - 2.70) / 0.20) ** 2)]), fmt="%.6f %.8e")
+    np.savetxt("b.dat", np.column_stack([g2, np.exp(-((g2 - 2.72) / 0.21) ** 2)]), fmt="%.6f %.8e")
+    disparity_emission.main(["a.dat", "b.dat", "--norm", "max"])
+    out = capsys.readouterr().out
+    a, b = (np.loadtxt(p) for p in ("a.dat", "b.dat"))
+    res = metrics.compare(a[:, 0], a[:, 1], [(b[:, 0], b[:, 1])], norm="max")
+    assert f"Relative_change  = {res['Rel_change'][0]:.6f}" in out
+    assert f"RMSE             = {res['RMSE'][0]:.6e}" in out
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+import emission_spectrum
+import ml_rate_spectrum
+
+
+@pytest.fixture
+def ef(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("EMSPEC_CACHE", "0")
+    rng = np.random.default_rng(0)
+    np.savetxt("E.dat", rng.normal(3.0, 0.3, 5000), fmt="%.6f")
+    np.savetxt("f.dat", rng.uniform(0.0, 1.0, 5000), fmt="%.6f")
+    return tmp_path
+
+
+def test_matches_text_pipeline(ef):
+    """与 速率表 -> emission_spectrum.py 的旧流程一致；差异只来自速率表 E 的 %8.4f 舍入"""
+    ml_rate_spectrum.main(["E.dat", "f.dat", "--rate-out", "rate.dat"])
+    emission_spectrum.main(["rate.dat", "--out", "text.dat"])
+    a, b = np.loadtxt("emission_spectrum_eV.dat"), np.loadtxt("text.dat")
+    np.testing.assert_allclose(a[:, 0], b[:, 0], atol=1e-4)
+    assert np.abs(a[:, 1] - np.interp(a[:, 0], b[:, 0], b[:, 1])).max() < 1e-3
+
+
+def test_single_rule_equals_multi_rule_column(ef):
+    ml_rate_spectrum.main(["E.dat", "f.dat", "--weights", "E3"])
+    one = np.loadtxt("emission_spectrum_eV.dat")
+    ml_rate_spectrum.main(["E.dat", "f.dat", "--weights", "f,E3", "--primary", "E3"])
+    multi = np.loadtxt("emission_spectrum_weights.dat")
+    np.testing.assert_array_equal(one[:, 0], multi[:, 0])
+    np.testing.assert_allclose(one[:, 1], multi[:, 2], rtol=0, atol=1e-8)
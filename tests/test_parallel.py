@@ -0,0 +1,15 @@
+import os
+from emspec import parallel
+
+
+def _threads(_=None):
+    return os.environ.get("OMP_NUM_THREADS"), os.environ.get("MKL_NUM_THREADS")
+
+
+def test_process_pool_pins_children_only(monkeypatch):
+    monkeypatch.setenv("OMP_NUM_THREADS", "7")
+    monkeypatch.delenv("MKL_NUM_THREADS", raising=False)
+    with parallel.process_pool(2, 1) as pool:
+        got = list(pool.map(_threads, range(4)))
+    assert got == [("1", "1")] * 4
+    assert _threads() == ("7", None)
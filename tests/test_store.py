@@ -0,0 +1,31 @@
+import os
+import numpy as np
+from emspec import store
+
+
+def test_append_after_torn_index_line(tmp_path):
+    root = str(tmp_path / "s.store")
+    grid = np.linspace(1.0, 2.0, 5)
+    store.append(root, "ml/50", grid, grid ** 2)
+    store.append(root, "ml/100", grid, grid ** 3)
+    idx = os.path.join(root, store.INDEX)
+    with open(idx, "rb") as f:
+        raw = f.read()
+    with open(idx, "wb") as f:                 # 第二条索引行写到一半中断
+        f.write(raw[:len(raw) - len(raw.splitlines()[-1]) // 2 - 1])
+
+    store.append(root, "td/50", grid, grid + 1.0)
+    keys = set(store.index(root))
+    assert keys == {"ml/50", "td/50"}
+    E, I = store.load(f"{root}{store.SEP}td/50")
+    np.testing.assert_array_equal(I, grid + 1.0)
+    E, I = store.load(f"{root}{store.SEP}ml/50")
+    np.testing.assert_array_equal(I, grid ** 2)
+
+
+def test_load_column_by_name(tmp_path):
+    root = str(tmp_path / "s.store")
+    grid = np.arange(4.0)
+    store.append(root, "ml/50/weights", grid, np.column_stack([grid, 2 * grid]), cols=["f", "E3"])
+    _, I = store.load(f"{root}{store.SEP}ml/50/weights#E3")
+    np.testing.assert_array_equal(I, 2 * grid)
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pytest
+
+import sweep
+from emspec import manifest
+
+
+@pytest.fixture
+def train_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMSPEC_CACHE", "0")
+    tdir = tmp_path / "train" / "50"
+    (tdir / "all").mkdir(parents=True)
+    work = tdir / "spectrum" / "emission"
+    work.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    np.savetxt(tdir / "all" / "E2est.dat", rng.uniform(2.0, 3.0, 50), fmt="%.4f")
+    np.savetxt(tdir / "all" / "f2est.dat", rng.uniform(0.0, 0.1, 50), fmt="%.4f")
+    (work / "emission_spectrum_eV.dat").write_text("2.0 1.0\n2.1 0.5\n")
+    # 与 ML_train_one.sh 一致：记录 DELTA/EPS/KAPPA，不记录方法
+    manifest.record(str(tdir), "spectrum", inputs=["all/E2est.dat", "all/f2est.dat"],
+                    params={"WEIGHT": "E3", "DELTA": "0.06", "EPS": "0.002", "KAPPA": "3.0"},
+                    outputs=["spectrum/emission/emission_spectrum_eV.dat"])
+    return str(work)
+
+
+def test_same_params_reuses_spectrum(train_dir):
+    out = sweep._ml_spectrum(train_dir, 0.06, 0.002, 3.0, "window")
+    assert os.path.basename(out) == "emission_spectrum_eV.dat"
+
+
+@pytest.mark.parametrize("kappa,method", [(5.0, "window"), (3.0, "dense")])
+def test_kappa_or_method_change_reconvolves(train_dir, kappa, method):
+    out = sweep._ml_spectrum(train_dir, 0.06, 0.002, kappa, method)
+    assert os.path.basename(out) == sweep.RIC_SPECTRUM
+    rec = manifest.load(os.path.dirname(os.path.dirname(train_dir)))["stages"]["ml-ric-spectrum"]
+    assert float(rec["params"]["KAPPA"]) == kappa and rec["params"]["METHOD"] == method
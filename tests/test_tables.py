@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from emspec import tables
+
+
+@pytest.fixture(autouse=True)
+def _no_cache(monkeypatch):
+    monkeypatch.setenv("EMSPEC_CACHE", "0")
+
+
+def test_header_only_file(tmp_path):
+    p = tmp_path / "hdr.dat"
+    p.write_text("# E  rate\n  E(eV)  diff_rate\n")
+    assert tables.load_table(str(p)).shape[1] == 0
+    with pytest.raises(SystemExit):
+        tables.read_emission_table(str(p))
+    with pytest.raises(SystemExit):
+        tables.load_spectrum(str(p))
+
+
+def test_header_block_then_data(tmp_path):
+    p = tmp_path / "t.dat"
+    p.write_text("# a\n# b\n1 2 3\n4 5 6\n")
+    chunks = list(tables.iter_table_chunks(str(p), rows=2))
+    np.testing.assert_array_equal(np.concatenate(chunks), [[1, 2, 3], [4, 5, 6]])
+
+
+def test_table_cache_is_capped(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMSPEC_CACHE", "1")
+    monkeypatch.setenv("EMSPEC_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("EMSPEC_TABLES_CAP", "3K")
+    for k in range(6):
+        p = tmp_path / f"t{k}.dat"
+        np.savetxt(p, np.arange(100.0) + k)         # 每个缓存约 0.9K
+        np.testing.assert_array_equal(tables.load_table(str(p))[0], np.arange(100.0) + k)
+    files = list((tmp_path / "cache").glob("*.npy"))
+    assert sum(f.stat().st_size for f in files) <= 3 * 1024
+    assert any(f.name.startswith("t5.dat.") for f in files)
+
+
+def test_cold_and_warm_cache_return_same_kind(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMSPEC_CACHE", "1")
+    monkeypatch.setenv("EMSPEC_CACHE_DIR", str(tmp_path / "cache"))
+    p = tmp_path / "t.dat"
+    np.savetxt(p, np.column_stack([np.arange(10.0), np.arange(10.0) ** 2]))
+    cold = tables.load_table(str(p))
+    warm = tables.load_table(str(p))
+    assert type(cold) is type(warm)
+    assert not cold.flags.writeable and not warm.flags.writeable
+    np.testing.assert_array_equal(cold, warm)
+    with pytest.raises(ValueError):
+        cold[0, 0] = 1.0
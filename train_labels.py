@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""一次读入状态表，同时写出 E 和 f 的各类标签文件。
+
+  --full    全长 y 文件（训练位=真值，其它=--fill），同 make_train_labels.py
+  --subset  训练子集（itrain 顺序），同 extract_train_labels.py
+  --mix     真值+ML 预测混合，同 mix_labels.py（需 --pred-E/--pred-f）
+文件名模板中的 {t} 替换为 E / f。输出文本与三个单独脚本逐字节一致。
+"""
+import argparse
+from emspec.labels import (full_column, label_columns, load_indices, mix_column,
+                           subset_column, train_mask, write_lines)
+from emspec import runlog
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="一次读入 stateN.index.E.f，批量写出 E/f 的全长/子集/混合标签")
+    ap.add_argument("state_file", help="如 state2.index.E.f（含 index E f）")
+    ap.add_argument("itrain", help="训练索引文件（1-based）")
+    ap.add_argument("--n_train", type=int, default=None, help="只用 itrain 前 n_train 个（默认全部）")
+    ap.add_argument("--targets", default="E,f", help="写出哪些列")
+    ap.add_argument("--full", default=None, help="全长文件模板，如 'y.{t}.train.dat'")
+    ap.add_argument("--fill", choices=["nan","0"], default="nan", help="全长文件非训练位填充值")
+    ap.add_argument("--subset", default=None, help="训练子集文件模板，如 'S1_{t}_train.dat'")
+    ap.add_argument("--mix", default=None, help="混合文件模板，如 'y.{t}.em.dat'")
+    ap.add_argument("--pred-E", default=None, help="--mix 用的 E 预测文件")
+    ap.add_argument("--pred-f", default=None, help="--mix 用的 f 预测文件")
+    ap.add_argument("--N", type=int, default=None,
+                    help="总样本数；全长文件默认 max(索引, 真值索引)，混合文件默认预测行数")
+    args = ap.parse_args(argv)
+
+    targets = [t for t in args.targets.split(",") if t]
+    if any(t not in ("E", "f") for t in targets):
+        raise SystemExit(f"[ERROR] --targets 只能取 E/f: {args.targets}")
+    if not (args.full or args.subset or args.mix):
+        raise SystemExit("[ERROR] 至少指定 --full / --subset / --mix 之一")
+    preds = {"E": args.pred_E, "f": args.pred_f}
+    if args.mix and any(preds[t] is None for t in targets):
+        raise SystemExit("[ERROR] --mix 需要每个目标的预测文件（--pred-E / --pred-f）")
+
+    with runlog.stage("labels", targets=args.targets) as rec:
+        written = write_labels(args, targets, preds, rec)
+    print("写出: " + ", ".join(written))
+
+def write_labels(args, targets, preds, rec):
+    train = load_indices(args.itrain, n_use=args.n_train)
+    if not train.size:
+        raise SystemExit("itrain.dat 为空？")
+    cols = label_columns(args.state_file)   # 只读一次，E/f 共用
+    rec["rows"] = cols["has"].size - 1
+
+    written = []
+    if args.full:
+        N = args.N or max(int(train.max()), cols["has"].size - 1)
+        mask = train_mask(train, N)
+        for t in targets:
+            with open(args.full.format(t=t), "wb") as fo:
+                write_lines(fo, full_column(cols, t, mask, fill=args.fill.encode()))
+            written.append(args.full.format(t=t))
+    if args.subset:
+        for t in targets:
+            with open(args.subset.format(t=t), "wb") as fo:
+                write_lines(fo, subset_column(cols, t, train))
+            written.append(args.subset.format(t=t))
+    if args.mix:
+        mask = train_mask(train, int(train.max()))
+        for t in targets:
+            with open(args.mix.format(t=t), "wb") as fo:
+                _, total = mix_column(fo, cols, t, preds[t], mask, N=args.N)
+            if args.N is not None and args.N != total:
+                print(f"[warn] {preds[t]}: 预测行数={total} 与 N={args.N} 不一致，按较小者输出。")
+            written.append(args.mix.format(t=t))
+    return written
+
+if __name__ == "__main__":
+    main()